@@ -0,0 +1,33 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, for example:
+
+    uvicorn app.asgi:application --host 0.0.0.0 --port 8000
+
+Django still runs synchronously, in the bounded thread pools of
+core.asgi.ThreadPoolASGIHandler, while the event loop deals with the
+clients. Pool sizes are set with ASGI_READ_THREADS, ASGI_WRITE_THREADS
+and ASGI_MAX_PENDING; keep the threads at or below DB_POOL_MAX_SIZE, each
+may hold a database connection.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+wsgi_application = get_wsgi_application()
+
+from app.warmup import warm_up  # noqa: E402
+from core.asgi import ThreadPoolASGIHandler  # noqa: E402
+
+application = ThreadPoolASGIHandler(
+    wsgi_application,
+    read_threads=int(os.environ.get('ASGI_READ_THREADS', 6)),
+    write_threads=int(os.environ.get('ASGI_WRITE_THREADS', 4)),
+    max_pending=int(os.environ.get('ASGI_MAX_PENDING', 256)),
+    on_startup=warm_up,
+)
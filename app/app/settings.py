@@ -42,10 +42,16 @@ INSTALLED_APPS = [
     'core',
     'user', 
     'recipe',
+    'job',
+    'batch',
+    'bench',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.PoolTimeoutMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,18 +84,58 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Connections are kept in a pool (core.db.backends.postgresql_pool) and
+# handed back to it at the end of each request. Set DB_POOL=0 to use the
+# stock backend, optionally with persistent connections (DB_CONN_MAX_AGE).
+
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+
 DATABASES = {
     'default': {
         # 'ENGINE': 'django.db.backends.sqlite3',
         # 'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'MAX_AGE': float(os.environ.get('DB_POOL_MAX_AGE', 1800)),
+            'PING_AFTER': float(os.environ.get('DB_POOL_PING_AFTER', 5)),
+        },
     }
 }
 
+# Read replicas, as a comma separated list of host[:weight]. Safe requests
+# on the API views using core.mixins.ReplicaReadMixin read from one of them,
+# picked at random by weight among the healthy ones. Each replica is a
+# mirror of default in tests, so two aliases are enough to test locally.
+
+DATABASE_REPLICAS = {}
+
+for index, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, weight = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS[alias] = int(weight or 1)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Seconds a user keeps reading from the primary after a write. The pin is
+# kept in the "shared" cache and a signed cookie.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+# Seconds a failing replica is left out of the rotation
+REPLICA_DOWN_SECONDS = int(os.environ.get('REPLICA_DOWN_SECONDS', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -135,3 +181,200 @@ MEDIA_ROOT = 'vol/web/media'
 STATIC_ROOT = 'vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# API-only profile
+# Leaves out the admin, sessions, messages and the browsable API, which the
+# token authenticated API doesn't use, to cut the memory and start-up time
+# of every worker.
+
+API_ONLY = os.environ.get('DJANGO_API_ONLY', '0') == '1'
+
+# NUM_PROXIES is the number of proxies in front of the app, whose
+# X-Forwarded-For entries the throttles trust to find the client IP. Unset,
+# they use REMOTE_ADDR and ignore the header.
+
+REST_FRAMEWORK = {
+    'NUM_PROXIES': (
+        int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES')
+        else None
+    ),
+}
+
+if API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS if app not in (
+            'django.contrib.admin',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+        )
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE if middleware not in (
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        )
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove(
+        'django.contrib.messages.context_processors.messages'
+    )
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': (
+            'rest_framework.renderers.JSONRenderer',
+        ),
+        'DEFAULT_AUTHENTICATION_CLASSES': (
+            'rest_framework.authentication.TokenAuthentication',
+        ),
+    })
+
+
+# Response compression
+# Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as they are.
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+
+
+# Request profiling
+# Share of the requests (0.0 - 1.0) profiled by
+# core.middleware.ProfilingMiddleware, 0 turns profiling off.
+
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Metrics
+# /metrics/ requires "Authorization: Bearer <METRICS_TOKEN>" and is closed
+# while METRICS_TOKEN is empty.
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# Caches
+# The throttle state lives in the "throttle" cache. The default local
+# memory cache only limits each process on its own, point
+# THROTTLE_CACHE_BACKEND and THROTTLE_CACHE_LOCATION at a shared cache
+# (e.g. memcached) to limit across processes and hosts.
+# The "shared" cache holds the state every process must see, like the
+# primary pins of core.db.routers and the token keys of user.credentials.
+# Point SHARED_CACHE_BACKEND and SHARED_CACHE_LOCATION at memcached
+# whenever more than one process serves requests.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': os.environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+    'shared': {
+        'BACKEND': os.environ.get(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'shared'),
+    },
+}
+
+
+# Throttling
+# Token buckets per user (per client IP when anonymous) and throttle scope:
+# (sustained rate, burst size). A scope missing here is not throttled.
+# MAX_CONCURRENT_REQUESTS caps the in-flight requests of each user on the
+# throttled views, 0 turns the cap off.
+
+THROTTLE_CACHE = 'throttle'
+THROTTLE_BUCKETS = {
+    'recipes': (os.environ.get('THROTTLE_RECIPES_RATE', '10/s'), 30),
+    'recipe_attrs': (os.environ.get('THROTTLE_RECIPE_ATTRS_RATE', '20/s'), 40),
+    'token': (os.environ.get('THROTTLE_TOKEN_RATE', '10/min'), 10),
+}
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 4))
+
+
+# Pantry index
+# Users whose ingredient bitmasks each process keeps for the "what can I
+# cook" query, the least recently used are dropped first.
+
+PANTRY_INDEX_SIZE = int(os.environ.get('PANTRY_INDEX_SIZE', 1000))
+
+
+# Batch endpoint
+# Sub-requests per batch, and threads running them for all batches of a
+# process. Keep BATCH_WORKERS at most MAX_CONCURRENT_REQUESTS, the
+# sub-requests of a batch count against the user's in-flight limit.
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 10))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+
+
+# Delta sync
+# Changes are served once they are SYNC_LAG_SECONDS old, longer than any
+# write transaction or replica lag. Tombstones of deleted objects are kept
+# SYNC_TOMBSTONE_DAYS, clients with an older cursor sync everything again.
+
+SYNC_LAG_SECONDS = int(os.environ.get('SYNC_LAG_SECONDS', 5))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+
+
+# User provisioning
+# Processes hashing the passwords of bulk created users, 0 for one per
+# core, and the most users a CSV sent to /api/user/provision/ may hold.
+# Larger files go through the provision_users command. Uploaded files
+# wait for their job in PROVISION_UPLOAD_DIR, which run_worker must see
+# too when it runs on another host.
+
+PROVISION_WORKERS = int(os.environ.get('PROVISION_WORKERS', 0))
+PROVISION_MAX_ROWS = int(os.environ.get('PROVISION_MAX_ROWS', 5000))
+PROVISION_UPLOAD_DIR = os.environ.get(
+    'PROVISION_UPLOAD_DIR', 'vol/web/private/provisioning'
+)
+
+
+# Token endpoint
+# With TOKEN_VERIFY_WORKERS set, /api/user/token/ checks passwords on that
+# many threads of their own, at most TOKEN_VERIFY_QUEUE more wait and the
+# rest get a 503, and verified passwords are remembered TOKEN_VERIFIED_TTL
+# seconds. 0 workers checks them in the request thread. Token keys are
+# cached TOKEN_CACHE_TTL seconds in the "shared" cache. 0 turns either TTL
+# off.
+
+TOKEN_VERIFY_WORKERS = int(os.environ.get('TOKEN_VERIFY_WORKERS', 0))
+TOKEN_VERIFY_QUEUE = int(os.environ.get('TOKEN_VERIFY_QUEUE', 16))
+TOKEN_VERIFIED_TTL = int(os.environ.get('TOKEN_VERIFIED_TTL', 60))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+
+
+# Query cache
+# Expensive per-user queries (the recipe list and stats) are cached for
+# QUERY_CACHE_TIMEOUT seconds in the QUERY_CACHE cache, with the last
+# QUERY_CACHE_LOCAL_SIZE values of each process also kept in memory.
+# Requests wait at most QUERY_CACHE_WAIT seconds for another one
+# computing the same value before computing it themselves. A QUERY_CACHE
+# of None computes them on every request.
+
+QUERY_CACHE = 'default'
+QUERY_CACHE_TIMEOUT = int(os.environ.get('QUERY_CACHE_TIMEOUT', 300))
+QUERY_CACHE_LOCAL_SIZE = int(os.environ.get('QUERY_CACHE_LOCAL_SIZE', 256))
+QUERY_CACHE_WAIT = float(os.environ.get('QUERY_CACHE_WAIT', 5))
@@ -0,0 +1,110 @@
+"""
+Warm-up of a freshly started process.
+
+The first request served by a new worker otherwise pays for compiling the
+URL patterns, introspecting the models behind every serializer and
+opening the database connections. The production server configuration
+(gunicorn.conf.py) runs these steps once in the master before forking, so
+workers share the result, and again in every worker before it accepts
+traffic, for the per process database connections.
+"""
+import logging
+import resource
+import time
+
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework import serializers
+
+from core import health
+from core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = registry.gauge(
+    'process_warmup_seconds',
+    'Time spent warming up the process, by step',
+)
+MAX_RSS_BYTES = registry.gauge(
+    'process_max_rss_bytes',
+    'Peak resident memory of the process after warm-up',
+)
+
+
+def warm_url_resolvers():
+    """Compile every URL pattern and build the reverse lookup tables"""
+    def walk(resolver):
+        count = 0
+        for pattern in resolver.url_patterns:
+            pattern.pattern.regex
+            if isinstance(pattern, URLResolver):
+                count += walk(pattern)
+            else:
+                count += 1
+        return count
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    return walk(resolver)
+
+
+def _serializer_classes():
+    """Return the serializers used by the API views"""
+    from recipe import serializers as recipe_serializers
+    from user import serializers as user_serializers
+
+    classes = []
+    for module in (recipe_serializers, user_serializers):
+        for value in vars(module).values():
+            if (isinstance(value, type) and
+                    issubclass(value, serializers.Serializer) and
+                    value.__module__ == module.__name__):
+                classes.append(value)
+    return classes
+
+
+def warm_serializers():
+    """Build the field maps of every API serializer"""
+    classes = _serializer_classes()
+    for serializer_class in classes:
+        serializer_class(context={}).fields
+    return len(classes)
+
+
+def warm_databases():
+    """
+        Open a connection to every database.
+        With the pooled backend the connections stay open in the pool.
+    """
+    failed = health.run_parallel(health.check_database, connections)
+    for alias, error in failed.items():
+        logger.warning('Could not connect to %s during warm-up: %s',
+                       alias, error)
+    return len(failed)
+
+
+def max_rss_bytes():
+    """Return the peak resident memory of this process"""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def warm_up(databases=True):
+    """Run the warm-up steps, return the seconds spent in each of them"""
+    steps = [
+        ('url_resolvers', warm_url_resolvers),
+        ('serializers', warm_serializers),
+    ]
+    if databases:
+        steps.append(('databases', warm_databases))
+
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+        WARMUP_SECONDS.set(timings[name], step=name)
+
+    MAX_RSS_BYTES.set(max_rss_bytes())
+    return timings
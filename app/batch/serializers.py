@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import serializers
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """One GET request of a batch"""
+    method = serializers.ChoiceField(choices=('GET',), default='GET')
+    path = serializers.CharField(max_length=2000)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError('Must be an /api/ path.')
+        if value.split('?')[0] == reverse('batch:batch'):
+            raise serializers.ValidationError('Batches cannot be nested.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of API requests"""
+    requests = SubRequestSerializer(many=True)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError('No requests given.')
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.'
+            )
+        return value
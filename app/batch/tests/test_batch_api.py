@@ -0,0 +1,159 @@
+import re
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from batch import views
+from core.authentication import BATCH_AUTH
+from core.models import Tag, Ingredient, Recipe
+
+
+BATCH_URL = reverse('batch:batch')
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def batch(*paths):
+    return {'requests': [{'path': path} for path in paths]}
+
+
+class PublicBatchApiTests(TestCase):
+
+    def test_auth_required(self):
+        """Test that the batch needs authentication"""
+        res = APIClient().post(BATCH_URL, batch(TAGS_URL), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        recipe.tags.add(tag)
+
+    def test_batch(self):
+        """Test that every response comes back, in order"""
+        paths = (ME_URL, TAGS_URL, INGREDIENTS_URL,
+                 f'{RECIPES_URL}?filter=vegan')
+
+        res = self.client.post(BATCH_URL, batch(*paths), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data['responses']
+        self.assertEqual([item['path'] for item in responses], list(paths))
+        for item in responses:
+            self.assertEqual(item['status'], status.HTTP_200_OK)
+            self.assertEqual(item['body'], self.client.get(item['path']).data)
+        self.assertEqual(responses[0]['body']['email'], 'test@mail.com')
+        self.assertEqual(len(responses[3]['body']), 1)
+
+    def test_sub_requests_authenticated(self):
+        """Test that the batch is authenticated once for all requests"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(
+                BATCH_URL, batch(ME_URL, TAGS_URL, INGREDIENTS_URL),
+                format='json'
+            )
+
+        token_queries = [
+            query for query in queries
+            if re.search(r'FROM "authtoken_token"', query['sql'])
+        ]
+        self.assertEqual(len(token_queries), 1)
+        self.assertEqual(
+            res.data['responses'][0]['body']['email'], 'test@mail.com'
+        )
+
+    def test_authorization_not_forwarded(self):
+        """Test that sub-requests do not carry the batch credentials"""
+        request = APIClient().post(BATCH_URL).wsgi_request
+        request.META['HTTP_AUTHORIZATION'] = 'Token secret'
+        request.user, request.auth = self.user, 'token'
+
+        sub = views.sub_request(request, TAGS_URL)
+
+        self.assertNotIn('HTTP_AUTHORIZATION', sub.META)
+        self.assertEqual(sub.META[BATCH_AUTH], (self.user, 'token'))
+
+    def test_sub_request_errors(self):
+        """Test that failing sub-requests do not fail the batch"""
+        res = self.client.post(BATCH_URL, batch(
+            '/api/recipe/missing/', reverse('recipe:recipe-detail', args=[0])
+        ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in res.data['responses']],
+            [status.HTTP_404_NOT_FOUND, status.HTTP_404_NOT_FOUND]
+        )
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_invalid_batch(self):
+        """Test that only small batches of GET API requests are run"""
+        invalid = (
+            batch(),
+            batch(TAGS_URL, TAGS_URL, TAGS_URL),
+            batch('/admin/'),
+            batch(BATCH_URL),
+            {'requests': [{'path': TAGS_URL, 'method': 'POST'}]},
+        )
+        for payload in invalid:
+            with self.subTest(payload=payload):
+                res = self.client.post(BATCH_URL, payload, format='json')
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+
+class ParallelBatchApiTests(TransactionTestCase):
+
+    def test_parallel(self):
+        """Test that sub-requests run on the thread pool"""
+        user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        Tag.objects.create(user=user, name='Vegan')
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        threads = []
+        run = views.run
+
+        def recording_run(request, path):
+            threads.append(threading.current_thread().name)
+            return run(request, path)
+
+        with patch('batch.views.run', recording_run):
+            res = client.post(
+                BATCH_URL, batch(TAGS_URL, INGREDIENTS_URL), format='json'
+            )
+
+        self.assertEqual(
+            [item['status'] for item in res.data['responses']],
+            [status.HTTP_200_OK, status.HTTP_200_OK]
+        )
+        self.assertEqual(len(res.data['responses'][0]['body']), 1)
+        self.assertTrue(all(name.startswith('batch') for name in threads))
@@ -0,0 +1,123 @@
+"""
+    Several GET API requests in one round trip.
+    The batch is authenticated once: sub-requests carry the headers of
+    the batch, but its user and token instead of its Authorization
+    header, which views accept with
+    core.authentication.BatchAuthentication. Each view still checks its
+    own permissions and throttles. Sub-requests run on a shared
+    thread pool, each thread with its own database connection, unless
+    the batch runs inside a transaction whose changes the other threads
+    would not see.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connections
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from batch.serializers import BatchSerializer
+from core.authentication import BATCH_AUTH
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.BATCH_WORKERS, thread_name_prefix='batch'
+            )
+        return _executor
+
+
+def sub_request(request, path):
+    """
+        Return a GET request for path with the headers of request,
+        authenticated as request
+    """
+    url = urlsplit(path)
+    environ = dict(request.META)
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_LENGTH': '0',
+        'wsgi.input': io.BytesIO(),
+        BATCH_AUTH: (request.user, request.auth),
+    })
+    environ.pop('CONTENT_TYPE', None)
+    environ.pop('HTTP_AUTHORIZATION', None)
+    return WSGIRequest(environ)
+
+
+def run(request, path):
+    """Run one sub-request, return its status and data"""
+    sub = sub_request(request, path)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'}
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Batched request to %s failed', path)
+        return (status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {'detail': 'Server error.'})
+    return response.status_code, getattr(response, 'data', None)
+
+
+def _run_in_thread(request, path):
+    # Like a request of its own: the thread's connection is reused or
+    # closed according to CONN_MAX_AGE
+    close_old_connections()
+    try:
+        return run(request, path)
+    finally:
+        close_old_connections()
+
+
+class BatchView(APIView):
+    """
+        Run GET requests to other API endpoints and return all their
+        responses, in the order given.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        paths = [item['path'] for item in serializer.validated_data[
+            'requests'
+        ]]
+
+        in_transaction = any(
+            connection.in_atomic_block for connection in connections.all()
+        )
+        if len(paths) > 1 and settings.BATCH_WORKERS > 1 \
+                and not in_transaction:
+            results = list(get_executor().map(
+                lambda path: _run_in_thread(request, path), paths
+            ))
+        else:
+            results = [run(request, path) for path in paths]
+
+        return Response({'responses': [
+            {'path': path, 'status': code, 'body': body}
+            for path, (code, body) in zip(paths, results)
+        ]})
@@ -0,0 +1,126 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from bench import runner
+from bench.scenarios import build_scenarios
+from core import seeding, similarity
+
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'baselines.json'
+)
+
+
+class Command(BaseCommand):
+    """
+        Benchmark the hot API endpoints on a seeded dataset.
+        The dataset is created in a throwaway test database. Every
+        scenario runs through the test client, which also counts the
+        queries per request, and over HTTP against a live server. The
+        results are compared with the baseline and the command fails if
+        anything regressed by more than --max-regression, or has no
+        baseline. Latencies only compare on the machine the baseline was
+        recorded on, which is stored along with it.
+    """
+    help = 'Benchmark the API and compare the results with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', choices=sorted(seeding.SIZES), default='small'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--mode', choices=('client', 'http'), action='append',
+            dest='modes', help='Modes to run, both by default'
+        )
+        parser.add_argument('--output', help='Write the results as JSON')
+        parser.add_argument('--baseline', default=BASELINE_PATH)
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Store the results as the new baseline'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=0.2,
+            help='Allowed latency increase over the baseline, as a fraction'
+        )
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or ['client', 'http']
+        with runner.throwaway_database():
+            results = self._run(modes, options)
+            recorded_on = runner.machine(options)
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+        try:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = {}
+
+        if options['update_baseline']:
+            baseline[options['size']] = {'recorded_on': recorded_on, **results}
+            with open(options['baseline'], 'w') as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Baseline written to {options["baseline"]}')
+            return
+
+        if options['size'] not in baseline:
+            raise CommandError(
+                f'No {options["size"]} baseline to compare with, record '
+                'one with --update-baseline'
+            )
+        expected = baseline[options['size']]
+        recorded_on = expected.get('recorded_on', {})
+        self.stdout.write('Baseline recorded on ' + (', '.join(
+            f'{key} {value}' for key, value in sorted(recorded_on.items())
+        ) or 'an unknown machine'))
+        regressions = runner.compare(
+            results, expected, options['max_regression']
+        )
+        if regressions:
+            raise CommandError(
+                'Performance regressed:\n  ' + '\n  '.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def _run(self, modes, options):
+        self.stdout.write(f'Seeding the {options["size"]} dataset...')
+        created = seeding.seed(**seeding.SIZES[options['size']])
+        similarity.rebuild()
+        user = get_user_model().objects.get(id=created['busiest_user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        scenarios = build_scenarios(user, seeding.PASSWORD)
+
+        results = {}
+        if 'client' in modes:
+            results['client'] = runner.run_client(
+                scenarios, token.key, options['iterations']
+            )
+        if 'http' in modes:
+            results['http'] = runner.run_http(
+                scenarios, token.key, options['iterations'],
+                concurrency=options['concurrency']
+            )
+        return results
+
+    def _report(self, results):
+        for mode, scenarios in results.items():
+            self.stdout.write(mode)
+            for name, stats in scenarios.items():
+                queries = stats.get('queries')
+                self.stdout.write(
+                    f'  {name:<16} p50 {stats["p50_ms"]:>8.2f} ms  '
+                    f'p99 {stats["p99_ms"]:>8.2f} ms  '
+                    f'{stats["throughput_rps"]:>7.1f} req/s'
+                    + (f'  {queries} queries' if queries is not None else '')
+                )
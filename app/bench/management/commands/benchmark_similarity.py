@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bench import runner
+from bench.similarity import measure_recall
+from core import seeding, similarity
+
+
+class Command(BaseCommand):
+    """
+        Measure the recall and latency of the similar recipes lookup
+        against brute force exact Jaccard similarity, on the busiest user
+        of a seeded dataset in a throwaway test database. Fails when the
+        recall drops below --min-recall.
+    """
+    help = 'Benchmark the similar recipes lookup against brute force'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', choices=sorted(seeding.SIZES), default='small'
+        )
+        parser.add_argument('-k', type=int, default=10)
+        parser.add_argument('--sample', type=int, default=50)
+        parser.add_argument('--min-recall', type=float, default=0.8)
+
+    def handle(self, *args, **options):
+        with runner.throwaway_database():
+            self.stdout.write(f'Seeding the {options["size"]} dataset...')
+            created = seeding.seed(**seeding.SIZES[options['size']])
+            similarity.rebuild()
+            result = measure_recall(
+                created['busiest_user'], options['k'], options['sample']
+            )
+
+        self.stdout.write(
+            f'{result["queries"]} lookups  recall@{options["k"]} '
+            f'{result["recall"]}  lsh p50 {result["lsh_p50_ms"]:.2f} ms  '
+            f'brute force p50 {result["brute_p50_ms"]:.2f} ms'
+        )
+        if result['recall'] is not None and \
+                result['recall'] < options['min_recall']:
+            raise CommandError(
+                f'Recall {result["recall"]} is below {options["min_recall"]}'
+            )
@@ -0,0 +1,232 @@
+"""
+    Run benchmark scenarios through the Django test client or a real
+    HTTP server and compare the results with stored baselines.
+"""
+import contextlib
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler,
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+from core.perf import percentile
+from core.profiling import RequestProfile
+
+
+@contextlib.contextmanager
+def throwaway_database():
+    """
+        Run the block against fresh test databases and a temporary
+        MEDIA_ROOT, all dropped on the way out.
+    """
+    media_root = tempfile.mkdtemp(prefix='bench-media-')
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        # The live server is reached on 127.0.0.1, which the test
+        # environment's ALLOWED_HOSTS does not include. Throttling
+        # would only measure how fast requests get rejected, and every
+        # repeated request would be a query cache hit.
+        with override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=['testserver', '127.0.0.1'],
+            THROTTLE_BUCKETS={},
+            MAX_CONCURRENT_REQUESTS=0,
+            QUERY_CACHE=None,
+        ):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def summarize(timings, elapsed, queries=None):
+    """Return the statistics of one scenario"""
+    timings = sorted(timings)
+    result = {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'throughput_rps': round(len(timings) / elapsed, 1) if elapsed else 0,
+    }
+    if queries is not None:
+        result['queries'] = queries
+    return result
+
+
+def run_client(scenarios, token, iterations, warmup=5):
+    """
+        Run the scenarios in process with the test client.
+        The number of queries per request is only known in this mode.
+    """
+    client = APIClient()
+    results = {}
+    for scenario in scenarios:
+        if scenario.authenticated:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        else:
+            client.credentials()
+        call = getattr(client, scenario.method.lower())
+        kwargs = {'format': 'multipart'} if scenario.multipart else {}
+
+        for _ in range(warmup):
+            call(scenario.path, scenario.get_data(), **kwargs)
+
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            call(scenario.path, scenario.get_data(), **kwargs)
+
+        timings = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            data = scenario.get_data()
+            request_started = time.perf_counter()
+            res = call(scenario.path, data, **kwargs)
+            timings.append(time.perf_counter() - request_started)
+            if res.status_code >= 400:
+                raise RuntimeError(
+                    f'{scenario.name} failed with {res.status_code}'
+                )
+        results[scenario.name] = summarize(
+            timings, time.perf_counter() - started, profile.queries
+        )
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class LiveServer:
+    """Threaded WSGI server on a free local port"""
+
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(
+            ('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False
+        )
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}'
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _http_request(base_url, scenario, token):
+    """Send scenario to the server, return its latency in seconds"""
+    headers = {}
+    body = None
+    data = scenario.get_data()
+    if scenario.authenticated:
+        headers['Authorization'] = f'Token {token}'
+    if scenario.multipart:
+        body = encode_multipart(BOUNDARY, data)
+        headers['Content-Type'] = MULTIPART_CONTENT
+    elif data:
+        body = urllib.parse.urlencode(data).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+    request = urllib.request.Request(
+        base_url + scenario.path, data=body, headers=headers,
+        method=scenario.method
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as res:
+            res.read()
+    except urllib.error.HTTPError as exc:
+        raise RuntimeError(f'{scenario.name} failed with {exc.code}')
+    return time.perf_counter() - started
+
+
+def run_http(scenarios, token, iterations, warmup=5, concurrency=1):
+    """Run the scenarios over HTTP against a live server"""
+    results = {}
+    with LiveServer() as server:
+        for scenario in scenarios:
+            for _ in range(warmup):
+                _http_request(server.url, scenario, token)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                timings = list(executor.map(
+                    lambda _: _http_request(server.url, scenario, token),
+                    range(iterations)
+                ))
+            results[scenario.name] = summarize(
+                timings, time.perf_counter() - started
+            )
+    return results
+
+
+def compare(results, baseline, max_regression=0.2):
+    """
+        Return the regressions of results against baseline.
+        Latencies may grow by max_regression (a fraction) before they
+        count as a regression, query counts may not grow at all. A figure
+        missing from the baseline is reported too, so nothing passes
+        without being compared.
+    """
+    regressions = []
+    for mode, scenarios in results.items():
+        for name, stats in scenarios.items():
+            expected = baseline.get(mode, {}).get(name, {})
+            missing = [
+                key for key in ('p50_ms', 'p99_ms', 'queries')
+                if key in stats and key not in expected
+            ]
+            if missing:
+                regressions.append(
+                    f'{mode}/{name} has no baseline for '
+                    + ', '.join(missing)
+                )
+            for key in ('p50_ms', 'p99_ms'):
+                if key in expected and \
+                        stats[key] > expected[key] * (1 + max_regression):
+                    regressions.append(
+                        f'{mode}/{name} {key} {stats[key]} > '
+                        f'{expected[key]} (+{max_regression:.0%})'
+                    )
+            if 'queries' in expected and \
+                    stats.get('queries', 0) > expected['queries']:
+                regressions.append(
+                    f'{mode}/{name} queries {stats["queries"]} > '
+                    f'{expected["queries"]}'
+                )
+    return regressions
+
+
+def machine(options):
+    """Describe where and how a baseline was recorded"""
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'database': connection.vendor,
+        'iterations': options['iterations'],
+        'concurrency': options['concurrency'],
+    }
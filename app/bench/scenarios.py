@@ -0,0 +1,85 @@
+"""The hot endpoints exercised by the benchmark"""
+import io
+
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Ingredient, Recipe, Tag
+
+
+class Scenario:
+    """
+        One request to benchmark.
+        data may be a callable so every request gets fresh data, which
+        uploads need since a file can only be read once.
+    """
+
+    def __init__(self, name, method, path, data=None, multipart=False,
+                 authenticated=True):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.multipart = multipart
+        self.authenticated = authenticated
+
+    def get_data(self):
+        return self.data() if callable(self.data) else self.data
+
+
+def sample_image():
+    """Return a small JPEG file to upload"""
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(image, format='JPEG')
+    image.seek(0)
+    image.name = 'bench.jpg'
+    return image
+
+
+def build_scenarios(user, password):
+    """Return the scenarios for user, which should own some recipes"""
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)[:2]
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)[:10]
+    )
+    recipes_url = reverse('recipe:recipe-list')
+    tags = ','.join(str(tag_id) for tag_id in tag_ids)
+
+    return [
+        Scenario('recipe_list', 'GET', recipes_url),
+        Scenario('recipe_filter', 'GET', f'{recipes_url}?tags={tags}'),
+        Scenario(
+            'recipe_detail', 'GET',
+            reverse('recipe:recipe-detail', args=[recipe.id])
+        ),
+        Scenario(
+            'recipe_similar', 'GET',
+            reverse('recipe:recipe-similar', args=[recipe.id])
+        ),
+        Scenario(
+            'recipe_pantry', 'GET',
+            reverse('recipe:recipe-pantry') + '?ingredients='
+            + ','.join(str(ingredient_id) for ingredient_id in ingredient_ids)
+        ),
+        Scenario('recipe_stats', 'GET', reverse('recipe:recipe-stats')),
+        Scenario('tag_list', 'GET', reverse('recipe:tag-list')),
+        Scenario(
+            'ingredient_list', 'GET', reverse('recipe:ingredient-list')
+        ),
+        Scenario(
+            'token_auth', 'POST', reverse('user:token'),
+            data={'email': user.email, 'password': password},
+            authenticated=False
+        ),
+        Scenario(
+            'image_upload', 'POST',
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            data=lambda: {'image': sample_image()},
+            multipart=True
+        ),
+    ]
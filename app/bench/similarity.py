@@ -0,0 +1,82 @@
+"""
+    Recall of the LSH similar recipes lookup against brute force.
+    Brute force reads the tag and ingredient sets of every recipe of the
+    user and computes the exact Jaccard similarity to each, which is what
+    the endpoint would do without the index.
+"""
+import random
+import time
+
+from core import similarity
+from core.models import Tag, Ingredient, Recipe
+from core.perf import percentile
+
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def load_sets(user_id):
+    """Return the set of (kind, id) elements of each recipe of a user"""
+    sets = {
+        recipe_id: set()
+        for recipe_id in Recipe.objects.filter(
+            user_id=user_id
+        ).values_list('id', flat=True)
+    }
+    for model in (Tag, Ingredient):
+        kind = model._meta.model_name
+        rows = model._base_manager.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe', 'id')
+        for recipe_id, obj_id in rows:
+            sets[recipe_id].add((kind, obj_id))
+    return sets
+
+
+def brute_force(recipe_id, user_id, k):
+    """Return the exact similarity to every other recipe and the top k"""
+    sets = load_sets(user_id)
+    target = sets.pop(recipe_id)
+    scores = {other: jaccard(target, items) for other, items in sets.items()}
+    best = sorted(scores, key=lambda other: (-scores[other], -other))[:k]
+    return scores, best
+
+
+def measure_recall(user_id, k=10, sample=50, seed=0):
+    """
+        Look up sample recipes of user_id both ways and return the mean
+        recall@k of the lookup and the latency of both. A result counts
+        as a hit when its exact similarity is at least that of the k-th
+        best, so ties at the cut do not count as misses.
+    """
+    recipes = list(Recipe.objects.filter(user_id=user_id).order_by('id'))
+    rng = random.Random(seed)
+    recalls, lsh_timings, brute_timings = [], [], []
+    for recipe in rng.sample(recipes, min(sample, len(recipes))):
+        started = time.perf_counter()
+        scores, best = brute_force(recipe.id, user_id, k)
+        brute_timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        found = similarity.similar(recipe, k)
+        lsh_timings.append(time.perf_counter() - started)
+
+        relevant = [other for other in best if scores[other] > 0]
+        if not relevant:
+            continue
+        cut = scores[relevant[-1]]
+        hits = sum(
+            1 for other, _ in found if scores.get(other, 0) >= cut > 0
+        )
+        recalls.append(min(hits, len(relevant)) / len(relevant))
+
+    lsh_timings.sort()
+    brute_timings.sort()
+    return {
+        'queries': len(lsh_timings),
+        'recall': round(sum(recalls) / len(recalls), 3) if recalls else None,
+        'lsh_p50_ms': round(percentile(lsh_timings, 50) * 1000, 3),
+        'brute_p50_ms': round(percentile(brute_timings, 50) * 1000, 3),
+    }
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from bench.runner import compare, summarize
+
+
+class RunnerTests(SimpleTestCase):
+
+    def test_summarize(self):
+        """Test that latencies are reported in ms with the throughput"""
+        stats = summarize([0.002, 0.001, 0.004, 0.003], 0.5, queries=3)
+
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['p50_ms'], 3.0)
+        self.assertEqual(stats['p99_ms'], 4.0)
+        self.assertEqual(stats['throughput_rps'], 8.0)
+        self.assertEqual(stats['queries'], 3)
+
+    def test_compare_within_threshold(self):
+        """Test that latency inside the allowed regression passes"""
+        results = {'client': {'tag_list': {'p50_ms': 11.0, 'p99_ms': 20.0,
+                                           'queries': 2}}}
+        baseline = {'client': {'tag_list': {'p50_ms': 10.0, 'p99_ms': 20.0,
+                                            'queries': 2}}}
+
+        self.assertEqual(compare(results, baseline, 0.2), [])
+
+    def test_compare_reports_regressions(self):
+        """Test that slower latency and extra queries are regressions"""
+        results = {'client': {'tag_list': {'p50_ms': 13.0, 'p99_ms': 20.0,
+                                           'queries': 3}}}
+        baseline = {'client': {'tag_list': {'p50_ms': 10.0, 'p99_ms': 20.0,
+                                            'queries': 2}}}
+
+        regressions = compare(results, baseline, 0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('p50_ms', regressions[0])
+        self.assertIn('queries', regressions[1])
+
+    def test_compare_requires_baseline(self):
+        """Test that figures missing from the baseline fail the comparison"""
+        results = {'http': {'tag_list': {'p50_ms': 9.0, 'p99_ms': 9.0}}}
+        baseline = {'http': {'tag_list': {'p50_ms': 10.0}}}
+
+        self.assertEqual(
+            compare(results, baseline, 0.2),
+            ['http/tag_list has no baseline for p99_ms']
+        )
+        self.assertEqual(
+            compare(results, {}, 0.2),
+            ['http/tag_list has no baseline for p50_ms, p99_ms']
+        )
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from bench.similarity import jaccard, measure_recall
+from core.models import Ingredient, Recipe
+
+
+class SimilarityBenchmarkTests(TestCase):
+
+    def test_jaccard(self):
+        """Test the exact similarity"""
+        self.assertEqual(jaccard({1, 2, 3}, {2, 3, 4}), 0.5)
+        self.assertEqual(jaccard(set(), set()), 0.0)
+
+    def test_measure_recall(self):
+        """Test that the lookup finds the brute force neighbours"""
+        user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        ingredients = [
+            Ingredient.objects.create(user=user, name=f'Ingredient {i}')
+            for i in range(9)
+        ]
+        for start in range(4):
+            recipe = Recipe.objects.create(
+                user=user, title='Soup', time_minutes=5, price=1
+            )
+            recipe.ingredients.set(ingredients[start:start + 6])
+
+        result = measure_recall(user.id, k=2, sample=4)
+
+        self.assertEqual(result['queries'], 4)
+        self.assertEqual(result['recall'], 1.0)
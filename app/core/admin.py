@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
 
@@ -32,7 +34,76 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class BoundedCountPaginator(Paginator):
+    """
+        Paginator counting at most MAX_COUNT rows, with a LIMIT inside
+        the COUNT, so the count of a huge table or of a broad search
+        stops early. Pages past MAX_COUNT rows are not reachable, which
+        also keeps OFFSET small; narrow the search to get to them.
+    """
+    MAX_COUNT = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list.order_by()[:self.MAX_COUNT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+        Admin for tables too large to count, scan or list in a select.
+        Related users are picked by id and searches only use indexes:
+        an id, the exact email of the owner or a case sensitive prefix
+        of search_fields[0], which should have db_index (on PostgreSQL
+        that adds the pattern index LIKE 'prefix%' needs).
+    """
+    paginator = BoundedCountPaginator
+    # Skips the COUNT(*) of the whole table next to the filtered count
+    show_full_result_count = False
+    list_per_page = 50
+    list_max_show_all = 200
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    ordering = ('-id',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        if '@' in term:
+            return queryset.filter(user__email=term), False
+        return queryset.filter(
+            **{f'{self.search_fields[0]}__startswith': term}
+        ), False
+
+
+class TagAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'user', 'recipe_count')
+    search_fields = ('name',)
+
+
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'user', 'recipe_count')
+    search_fields = ('name',)
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'user', 'time_minutes', 'price')
+    search_fields = ('title',)
+    # Only the selected tags and ingredients are rendered, the rest are
+    # searched as the user types
+    autocomplete_fields = ('tags', 'ingredients')
+
+
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'status', 'user', 'attempts', 'run_at')
+    search_fields = ('name',)
+    list_filter = ('status',)
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Job, JobAdmin)
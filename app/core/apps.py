@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Connect the signal receivers
+        from core import counters, similarity, sync, versioning  # noqa: F401
+        # Register the background job tasks of every app
+        autodiscover_modules('tasks')
@@ -0,0 +1,287 @@
+"""
+    ASGI adapter for the Django WSGI application.
+    The event loop reads request bodies and writes responses, so slow
+    clients only hold a coroutine. Django itself runs in bounded thread
+    pools: safe requests (the list, retrieve and /me/ reads) get their own
+    pool, so a burst of slow uploads can't starve them and vice versa.
+    When too many requests of a pool are in progress, new ones are
+    rejected with 503 instead of queueing without bound.
+    A response is produced over several trips to its pool, which may each
+    land on another thread, so every trip hands the database connections
+    of its thread back before returning, like the end of a WSGI request.
+    Each Django thread may hold a pooled connection: keep read_threads
+    plus write_threads at or below the database pool size.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+from core.metrics import registry
+
+
+ASGI_PENDING = registry.gauge(
+    'asgi_pending_requests',
+    'Requests in progress, by pool',
+)
+ASGI_REJECTED = registry.counter(
+    'asgi_rejected_requests_total',
+    'Requests rejected because the pool was saturated, by pool',
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Request bodies larger than this are spooled to disk
+MAX_BODY_IN_MEMORY = 1024 * 1024
+# Response bytes produced per trip to the pool
+MAX_CHUNK_BUFFER = 64 * 1024
+
+
+class ThreadPoolASGIHandler:
+    """Serve a WSGI application over ASGI using bounded thread pools"""
+
+    def __init__(self, wsgi_application, read_threads=6, write_threads=4,
+                 max_pending=256, on_startup=None):
+        self.wsgi_application = wsgi_application
+        self.max_pending = max_pending
+        self.on_startup = on_startup
+        self.pools = {
+            'read': ThreadPoolExecutor(
+                read_threads, thread_name_prefix='asgi-read'
+            ),
+            'write': ThreadPoolExecutor(
+                write_threads, thread_name_prefix='asgi-write'
+            ),
+        }
+        self.pending = {'read': 0, 'write': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_event_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup is not None:
+                    await loop.run_in_executor(
+                        self.pools['write'], self.on_startup
+                    )
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in self.pools.values():
+                    pool.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        pool_name = 'read' if scope['method'] in SAFE_METHODS else 'write'
+        if self.pending[pool_name] >= self.max_pending:
+            ASGI_REJECTED.inc(pool=pool_name)
+            await self.send_response(
+                send, '503 Service Unavailable',
+                [('Content-Type', 'text/plain'), ('Retry-After', '1')],
+                [b'Server busy, retry later']
+            )
+            return
+        # Taken before the first await, so concurrent requests can't all
+        # pass the check above
+        self.pending[pool_name] += 1
+        ASGI_PENDING.set(self.pending[pool_name], pool=pool_name)
+        try:
+            body = await self.read_body(receive)
+            if body is None:
+                # The client went away before sending its whole body
+                return
+            await self.respond(pool_name, scope, body, send)
+        finally:
+            self.pending[pool_name] -= 1
+            ASGI_PENDING.set(self.pending[pool_name], pool=pool_name)
+
+    async def respond(self, pool_name, scope, body, send):
+        """
+            Run the application and stream its response. The body is
+            produced in the pool MAX_CHUNK_BUFFER bytes at a time and sent
+            from the event loop in between, so streamed responses and
+            media files are never held whole in memory, and a slow client
+            holds no thread while a chunk is sent.
+        """
+        loop = asyncio.get_event_loop()
+        pool = self.pools[pool_name]
+        status, headers, chunks, result = await loop.run_in_executor(
+            pool, self.in_thread, self.run_wsgi, scope, body
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ],
+        })
+        try:
+            while True:
+                for chunk in chunks:
+                    if chunk:
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                if result is None:
+                    break
+                chunks, result = await loop.run_in_executor(
+                    pool, self.in_thread, self.read_chunks, result
+                )
+        finally:
+            if result is not None:
+                # The client went away mid-response
+                await loop.run_in_executor(
+                    pool, self.in_thread, result.close
+                )
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def read_body(self, receive):
+        """Read the whole request body without holding a thread"""
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    async def send_response(self, send, status, headers, chunks):
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ],
+        })
+        for chunk in chunks:
+            if chunk:
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def build_environ(self, scope, body):
+        """Translate an ASGI HTTP scope to a WSGI environ"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI wants the UTF-8 bytes of the path as a latin1 string
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            if key in environ:
+                value = f'{environ[key]},{value}'
+            environ[key] = value
+        return environ
+
+    def in_thread(self, func, *args):
+        """
+            Call func in a pool thread, then release the connections the
+            thread checked out: the next trip of this response, and its
+            request_finished signal, may run on another thread
+        """
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    def run_wsgi(self, scope, body):
+        """
+            Run the WSGI application in a pool thread, return its status,
+            headers, first chunks and the rest of the response, None when
+            it is complete
+        """
+        environ = self.build_environ(scope, body)
+        response = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            return written.append
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+        except BaseException:
+            body.close()
+            raise
+        iterator = _Response(result, body)
+        chunks, rest = self.read_chunks(iterator)
+        return response['status'], response['headers'], \
+            written + chunks, rest
+
+    def read_chunks(self, response):
+        """
+            Read chunks of response up to MAX_CHUNK_BUFFER bytes, return
+            them and response, or None once it is complete and closed
+        """
+        chunks, size = [], 0
+        try:
+            while size < MAX_CHUNK_BUFFER:
+                chunk = next(response.iterator, None)
+                if chunk is None:
+                    response.close()
+                    return chunks, None
+                chunks.append(chunk)
+                size += len(chunk)
+        except BaseException:
+            response.close()
+            raise
+        return chunks, response
+
+
+class _Response:
+    """The body iterator of a WSGI response and what to close after it"""
+
+    def __init__(self, result, body):
+        self.result = result
+        self.iterator = iter(result)
+        self.body = body
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self.body.close()
@@ -0,0 +1,24 @@
+"""
+    Authentication of the sub-requests of the batch endpoint.
+    The batch authenticates once and stores its user and token in the
+    WSGI environ of each sub-request under BATCH_AUTH. Clients cannot set
+    that key: header names reach the environ as HTTP_*. Views list
+    BatchAuthentication before their own authenticators to accept it.
+"""
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication,
+)
+
+
+BATCH_AUTH = 'batch.auth'
+
+
+class BatchAuthentication(BaseAuthentication):
+    """Accept the (user, token) of the batch a sub-request belongs to"""
+
+    def authenticate(self, request):
+        return request._request.META.get(BATCH_AUTH)
+
+    def authenticate_header(self, request):
+        # What the view answers unauthenticated requests with
+        return TokenAuthentication().authenticate_header(request)
@@ -0,0 +1,202 @@
+"""
+    Caching of expensive per-user queries, safe against stampedes.
+    Values are stored with the data version of the user they were
+    computed from (core.versioning) in two tiers: an LRU of
+    QUERY_CACHE_LOCAL_SIZE entries per process in front of the shared
+    QUERY_CACHE cache.
+    Only one request computes a key at a time: the other threads of the
+    process wait for it, and other processes see a lock in the shared
+    cache. A value of the current version that is being refreshed is
+    still right, so it is served meanwhile; after a version change there
+    is nothing right to serve and the others wait, so users always read
+    their own writes.
+    Values are refreshed before they expire with a probability growing
+    as expiry comes closer and with the time they took to compute
+    (XFetch), so a popular key is refreshed by one request ahead of time
+    instead of by every request once it expires.
+    Cached values are shared between requests and must not be modified.
+    QUERY_CACHE set to None turns the cache off, every lookup computes.
+"""
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.metrics import registry
+
+
+LOOKUPS = registry.counter(
+    'query_cache_lookups_total',
+    'Cached query lookups, by query and where the value came from',
+)
+COALESCED = registry.counter(
+    'query_cache_coalesced_total',
+    'Lookups that waited for or got the previous value of another '
+    'request computing the same key, by query and outcome',
+)
+
+# XFetch aggressiveness, above 1 refreshes earlier
+BETA = 1.0
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class Entry:
+    """A cached value with its data version, compute time and expiry"""
+    __slots__ = ('version', 'value', 'delta', 'expires')
+
+    def __init__(self, version, value, delta, expires):
+        self.version = version
+        self.value = value
+        self.delta = delta
+        self.expires = expires
+
+    def __getstate__(self):
+        return (self.version, self.value, self.delta, self.expires)
+
+    def __setstate__(self, state):
+        self.version, self.value, self.delta, self.expires = state
+
+    def expiring(self, now):
+        """Whether this lookup should refresh the value, see XFetch"""
+        jitter = -self.delta * BETA * math.log(1.0 - random.random())
+        return now + jitter >= self.expires
+
+
+class _Flight:
+    """A computation other threads of the process can wait for"""
+
+    def __init__(self, version):
+        self.version = version
+        self.value = _MISSING
+        self.done = threading.Event()
+
+
+def get_cache():
+    return caches[settings.QUERY_CACHE]
+
+
+def _local_get(key):
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is not None:
+            _local.move_to_end(key)
+        return entry
+
+
+def _local_set(key, entry):
+    with _local_lock:
+        _local[key] = entry
+        _local.move_to_end(key)
+        while len(_local) > settings.QUERY_CACHE_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def clear():
+    """Drop the values cached by this process"""
+    with _local_lock:
+        _local.clear()
+
+
+def _lookup(key, version):
+    """Return the entry of key of version and the tier it came from"""
+    entry = _local_get(key)
+    if entry is not None and entry.version == version:
+        return entry, 'local'
+    entry = get_cache().get(key)
+    if entry is not None and entry.version == version:
+        _local_set(key, entry)
+        return entry, 'shared'
+    return None, None
+
+
+def get_or_compute(name, key, version, compute, timeout=None):
+    """
+        Return the value cached under key for version, calling compute()
+        to refresh it when missing, of another version or expiring.
+        name labels the metrics.
+    """
+    if settings.QUERY_CACHE is None:
+        LOOKUPS.inc(name=name, result='computed')
+        return compute()
+    entry, tier = _lookup(key, version)
+    if entry is not None and not entry.expiring(time.time()):
+        LOOKUPS.inc(name=name, result=tier)
+        return entry.value
+    stale = _MISSING if entry is None else entry.value
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight(version)
+    if not leader:
+        return _follow(name, flight, version, stale, compute)
+
+    try:
+        flight.value = _compute(name, key, version, compute, timeout, stale)
+        return flight.value
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _follow(name, flight, version, stale, compute):
+    """Wait for or skip the computation of another thread"""
+    if stale is not _MISSING:
+        COALESCED.inc(name=name, outcome='stale')
+        return stale
+    COALESCED.inc(name=name, outcome='waited')
+    if flight.done.wait(settings.QUERY_CACHE_WAIT) and \
+            flight.version == version and flight.value is not _MISSING:
+        return flight.value
+    # The other thread failed, is too slow or computes another version
+    LOOKUPS.inc(name=name, result='computed')
+    return compute()
+
+
+def _compute(name, key, version, compute, timeout, stale):
+    """Compute and store key, unless another process already does"""
+    if timeout is None:
+        timeout = settings.QUERY_CACHE_TIMEOUT
+    shared = get_cache()
+    lock_key = f'{key}:lock'
+    wait = settings.QUERY_CACHE_WAIT
+    if not shared.add(lock_key, True, wait):
+        if stale is not _MISSING:
+            COALESCED.inc(name=name, outcome='stale')
+            return stale
+        COALESCED.inc(name=name, outcome='waited')
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = shared.get(key)
+            if entry is not None and entry.version == version:
+                _local_set(key, entry)
+                return entry.value
+        lock_key = None
+
+    try:
+        started = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - started
+        LOOKUPS.inc(name=name, result='computed')
+        entry = Entry(version, value, delta, time.time() + timeout)
+        _local_set(key, entry)
+        # Kept past its expiry to be served while it is refreshed
+        shared.set(key, entry, timeout * 2)
+        return value
+    finally:
+        if lock_key is not None:
+            shared.delete(lock_key)
@@ -0,0 +1,79 @@
+"""
+    Keep Tag.recipe_count and Ingredient.recipe_count up to date.
+    The receivers below adjust the counts with UPDATE ... SET
+    recipe_count = recipe_count +/- n in the transaction that changes the
+    links, for add(), remove(), clear() and set() from either side and for
+    deleted recipes. Code writing the through tables directly (seeding,
+    core.deletion) calls refresh_recipe_counts() instead.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+
+
+RELATIONS = (
+    (Recipe.tags.through, Tag, 'tag_id'),
+    (Recipe.ingredients.through, Ingredient, 'ingredient_id'),
+)
+TARGETS = {through: target for through, _, target in RELATIONS}
+
+
+def _adjust(queryset, delta):
+    if delta:
+        queryset.update(recipe_count=F('recipe_count') + delta)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, reverse, pk_set, model,
+                  **kwargs):
+    if not reverse:
+        # instance is a recipe, pk_set holds tag or ingredient ids
+        if action == 'post_add':
+            _adjust(model._base_manager.filter(pk__in=pk_set), 1)
+        elif action == 'pre_remove':
+            # remove() passes the ids as given, only count real links
+            _adjust(model._base_manager.filter(
+                pk__in=pk_set, recipe=instance
+            ), -1)
+        elif action == 'pre_clear':
+            _adjust(model._base_manager.filter(recipe=instance), -1)
+        return
+
+    # instance is a tag or ingredient, pk_set holds recipe ids
+    target = TARGETS[sender]
+    counted = type(instance)._base_manager.filter(pk=instance.pk)
+    links = sender._base_manager.filter(**{target: instance.pk})
+    if action == 'post_add':
+        _adjust(counted, len(pk_set))
+    elif action == 'pre_remove':
+        _adjust(counted, -links.filter(recipe_id__in=pk_set).count())
+    elif action == 'pre_clear':
+        counted.update(recipe_count=0)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """The links of a deleted recipe go without m2m_changed"""
+    for _, model, _ in RELATIONS:
+        _adjust(model._base_manager.filter(recipe=instance), -1)
+
+
+def refresh_recipe_counts(queryset):
+    """
+        Recompute recipe_count of the tags or ingredients in queryset from
+        the through table with one UPDATE. Returns the number of rows
+        updated.
+    """
+    through, _, target = next(
+        relation for relation in RELATIONS if relation[1] is queryset.model
+    )
+    counts = through._base_manager.filter(
+        **{target: OuterRef('pk')}
+    ).order_by().values(target).annotate(count=Count('*')).values('count')
+    return queryset.update(recipe_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0
+    ))
@@ -0,0 +1,106 @@
+"""
+    PostgreSQL backend that keeps connections in a pool.
+    Closing a django connection hands the psycopg2 connection back to
+    the pool instead of closing the socket, so requests that run with
+    CONN_MAX_AGE = 0 skip the TCP and authentication handshake.
+    The pool is configured with the POOL key of the database settings:
+    MAX_SIZE, TIMEOUT, MAX_AGE and PING_AFTER (all in seconds).
+"""
+import functools
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    """Return True if the server still answers on connection"""
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+def reset_connection(connection):
+    """Roll back whatever the previous user left open"""
+    if connection.closed:
+        raise Database.InterfaceError('connection already closed')
+    status = connection.get_transaction_status()
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """Return the pool for these connection parameters"""
+    key = (alias, tuple(sorted(
+        (name, str(value)) for name, value in conn_params.items()
+    )))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL', {})
+            pool = ConnectionPool(
+                functools.partial(Database.connect, **conn_params),
+                check=check_connection,
+                reset=reset_connection,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30.0),
+                max_age=options.get('MAX_AGE'),
+                ping_after=options.get('PING_AFTER', 0.0),
+                name=alias,
+            )
+            pool.database = conn_params.get('database')
+            _pools[key] = pool
+        return pool
+
+
+def close_pools(database=None):
+    """Close the idle connections of every pool, or of one database"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        if database is None or pool.database == database:
+            pool.close_idle()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        # Remember the pool, the test runner renames the database while
+        # connections are open
+        self.pool = get_pool(self.alias, self.settings_dict, conn_params)
+        connection = self.pool.acquire()
+
+        # Same isolation level handling as the stock backend, but it has
+        # to run on every checkout since the connection may be reused.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -0,0 +1,22 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+        Test database handling for the pooled backend.
+        PostgreSQL refuses to drop or copy a database that has open
+        connections, so the idle pooled ones are closed first.
+    """
+
+    def _close_pooled(self, database_name):
+        from core.db.backends.postgresql_pool.base import close_pools
+        close_pools(database=database_name)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close()
+        self._close_pooled(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self._close_pooled(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
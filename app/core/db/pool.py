@@ -0,0 +1,208 @@
+import collections
+import os
+import threading
+import time
+
+from core.metrics import registry
+
+
+POOL_IDLE = registry.gauge(
+    'db_pool_idle_connections',
+    'Open connections waiting in the pool',
+)
+POOL_IN_USE = registry.gauge(
+    'db_pool_in_use_connections',
+    'Connections checked out of the pool',
+)
+POOL_WAIT = registry.gauge(
+    'db_pool_last_wait_seconds',
+    'Time the last checkout waited for a connection',
+)
+POOL_WAIT_TOTAL = registry.counter(
+    'db_pool_wait_seconds_total',
+    'Time spent waiting for a connection',
+)
+POOL_CHECKOUTS = registry.counter(
+    'db_pool_checkouts_total',
+    'Connections handed out by the pool',
+)
+POOL_TIMEOUTS = registry.counter(
+    'db_pool_timeouts_total',
+    'Checkouts that gave up waiting for a connection',
+)
+POOL_RECYCLED = registry.counter(
+    'db_pool_recycled_total',
+    'Connections closed because they were broken or too old',
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available in time"""
+
+
+class ConnectionPool:
+    """
+        Thread safe pool of database connections.
+        The pool does not know anything about the database driver, it
+        gets callables to open (connect), test (check) and clean up
+        (reset) connections. Idle connections are handed out most
+        recently used first so the pool shrinks back naturally when
+        max_age recycles the ones nobody needs.
+    """
+
+    def __init__(self, connect, check=None, reset=None, max_size=10,
+                 timeout=30.0, max_age=None, ping_after=0.0, name='default'):
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.name = name
+        self._cond = threading.Condition()
+        self._init_state()
+
+    def _init_state(self):
+        # Idle entries are (connection, created_at, released_at)
+        self._idle = collections.deque()
+        self._created_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        """
+            Forget the connections inherited from a parent process.
+            Their sockets are shared with the parent so they must not be
+            used, or even closed, by the child.
+        """
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._init_state()
+
+    def _expired(self, created_at, now):
+        return self.max_age is not None and now - created_at >= self.max_age
+
+    def _alive(self, connection, released_at, now):
+        if self.check is None or now - released_at < self.ping_after:
+            return True
+        try:
+            return self.check(connection)
+        except Exception:
+            return False
+
+    def _update_gauges(self):
+        POOL_IDLE.set(len(self._idle), pool=self.name)
+        POOL_IN_USE.set(self._in_use, pool=self.name)
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _give_back_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._update_gauges()
+            self._cond.notify()
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if needed"""
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    POOL_TIMEOUTS.inc(pool=self.name)
+                    raise PoolTimeout(
+                        f'No connection available in pool {self.name} '
+                        f'after {self.timeout} seconds'
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._update_gauges()
+
+        waited = time.monotonic() - started
+        POOL_WAIT.set(waited, pool=self.name)
+        POOL_WAIT_TOTAL.inc(waited, pool=self.name)
+        POOL_CHECKOUTS.inc(pool=self.name)
+
+        now = time.monotonic()
+        if entry is not None:
+            connection, created_at, released_at = entry
+            if (self._expired(created_at, now) or
+                    not self._alive(connection, released_at, now)):
+                POOL_RECYCLED.inc(pool=self.name)
+                self._close_quietly(connection)
+                entry = None
+
+        if entry is None:
+            try:
+                connection = self.connect()
+            except Exception:
+                self._give_back_slot()
+                raise
+            created_at = now
+
+        self._created_at[id(connection)] = created_at
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if it is unusable"""
+        self._check_fork()
+        created_at = self._created_at.pop(id(connection), None)
+        if created_at is None:
+            # Not ours, or opened before a fork
+            self._close_quietly(connection)
+            return
+
+        now = time.monotonic()
+        if not discard and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+        if discard or self._expired(created_at, now):
+            POOL_RECYCLED.inc(pool=self.name)
+            self._close_quietly(connection)
+            self._give_back_slot()
+            return
+
+        with self._cond:
+            self._idle.append((connection, created_at, now))
+            self._in_use -= 1
+            self._update_gauges()
+            self._cond.notify()
+
+    def close_idle(self):
+        """Close every idle connection"""
+        self._check_fork()
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._update_gauges()
+            self._cond.notify_all()
+        for connection, _, _ in idle:
+            self._close_quietly(connection)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def in_use(self):
+        return self._in_use
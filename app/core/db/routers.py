@@ -0,0 +1,144 @@
+"""
+    Send reads to replica databases.
+    Nothing is read from a replica unless the current thread asked for
+    it with use_replica(), which core.mixins.ReplicaReadMixin does for
+    safe requests. Replicas are listed in the DATABASE_REPLICAS setting
+    as a mapping of database alias to weight.
+"""
+import contextlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.utils import InterfaceError, OperationalError
+
+
+_state = threading.local()
+_down_until = {}
+_down_lock = threading.Lock()
+
+
+def get_replicas():
+    """Return the configured replica aliases and their weights"""
+    return getattr(settings, 'DATABASE_REPLICAS', {})
+
+
+def mark_down(alias, seconds=None):
+    """Stop sending reads to a replica for a while"""
+    if seconds is None:
+        seconds = getattr(settings, 'REPLICA_DOWN_SECONDS', 30)
+    with _down_lock:
+        _down_until[alias] = time.monotonic() + seconds
+
+
+def is_connection_error(exc):
+    """
+        Whether exc means the database could not be reached, rather than
+        that a query failed on it, like a statement timeout. Only the
+        former should take a replica out of rotation.
+    """
+    if isinstance(exc, InterfaceError):
+        return True
+    if not isinstance(exc, OperationalError):
+        return False
+    # No SQLSTATE when the connection failed or was closed, class 08 for
+    # connection exceptions and 57P01-57P03 while the server shuts down
+    # or starts up
+    code = getattr(exc.__cause__, 'pgcode', None)
+    return code is None or code.startswith('08') or \
+        code in ('57P01', '57P02', '57P03')
+
+
+def is_healthy(alias):
+    """Return False while a replica is marked down"""
+    with _down_lock:
+        until = _down_until.get(alias)
+        if until is not None and until <= time.monotonic():
+            del _down_until[alias]
+            until = None
+    return until is None
+
+
+def choose_replica(rng=random):
+    """Pick a healthy replica at random, respecting the weights"""
+    candidates = [
+        (alias, weight) for alias, weight in get_replicas().items()
+        if weight > 0 and is_healthy(alias)
+    ]
+    if not candidates:
+        return None
+    point = rng.uniform(0, sum(weight for _, weight in candidates))
+    for alias, weight in candidates:
+        point -= weight
+        if point <= 0:
+            return alias
+    return candidates[-1][0]
+
+
+def use_replica(alias):
+    """Route the reads of this thread to alias (None for the primary)"""
+    _state.replica = alias
+
+
+def current_replica():
+    """Return the replica this thread currently reads from, if any"""
+    return getattr(_state, 'replica', None)
+
+
+def get_pin_cache():
+    """The pins must be seen by every process, see the shared cache"""
+    return caches['shared']
+
+
+@contextlib.contextmanager
+def on_primary():
+    """
+        Read from the primary within the block, for values that must
+        match something already read from it, like a data version
+    """
+    previous = current_replica()
+    use_replica(None)
+    try:
+        yield
+    finally:
+        use_replica(previous)
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+        Keep the reads of a user on the primary for a while after they
+        wrote, so they see their own changes despite replication lag.
+    """
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+    get_pin_cache().set(_pin_key(user_id), True, seconds)
+
+
+def is_pinned(user_id):
+    """Return True if the user wrote recently"""
+    return bool(get_pin_cache().get(_pin_key(user_id)))
+
+
+class ReplicaRouter:
+    """Database router reading from the replica chosen for the thread"""
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in get_replicas():
+            return False
+        return None
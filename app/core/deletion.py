@@ -0,0 +1,134 @@
+"""
+    Set-based deletion of a user and their recipe data.
+    Deleting a user through the ORM collects every recipe, tag,
+    ingredient and link row in memory and deletes them in one long
+    transaction. Here the rows are deleted by id in batches, children
+    before parents, each batch in its own short transaction. Every step
+    only looks at what is left, so an interrupted run is resumed by
+    running it again. Signals are not sent for the batched rows, the
+    recipe counts of other users' linked tags and ingredients, and the
+    signatures of their recipes linked to the user's, are recomputed
+    instead.
+"""
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+
+from core.counters import refresh_recipe_counts
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeBucket, RecipeSignature,
+)
+from core.similarity import update_signatures
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _raw_delete(model, **filters):
+    """Delete the rows matching filters in one query, without loading them"""
+    model._base_manager.filter(**filters)._raw_delete(
+        router.db_for_write(model)
+    )
+
+
+def _delete_image_files(names):
+    """Delete recipe images, missing files were deleted by an earlier run"""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except FileNotFoundError:
+            pass
+
+
+def _batches(queryset, batch_size, fields=('id',)):
+    """Yield lists of values of the first batch_size rows until none left"""
+    while True:
+        rows = list(queryset.order_by('id').values_list(*fields)[:batch_size])
+        if not rows:
+            return
+        yield rows
+
+
+def _delete_recipes(user_id, batch_size, pause):
+    deleted = 0
+    for rows in _batches(Recipe.objects.filter(user_id=user_id), batch_size,
+                         ('id', 'image')):
+        ids = [recipe_id for recipe_id, _ in rows]
+        # Files go first: if the batch below fails, the next run deletes
+        # the rows of the already missing files, the other way around a
+        # failure would leave files nothing refers to any more
+        _delete_image_files(image for _, image in rows if image)
+        with transaction.atomic():
+            # The user's own tags and ingredients are deleted next, those
+            # of other users linked to these recipes need a new count
+            others = {
+                model: list(model._base_manager.filter(
+                    recipe__in=ids
+                ).exclude(user_id=user_id).values_list('id', flat=True))
+                for model in (Tag, Ingredient)
+            }
+            for related in (Recipe.tags.through, Recipe.ingredients.through,
+                            RecipeBucket, RecipeSignature):
+                _raw_delete(related, recipe_id__in=ids)
+            _raw_delete(Recipe, id__in=ids)
+            for model, other_ids in others.items():
+                if other_ids:
+                    refresh_recipe_counts(
+                        model._base_manager.filter(id__in=other_ids)
+                    )
+        deleted += len(ids)
+        time.sleep(pause)
+    return deleted
+
+
+def _delete_attributes(model, through, user_id, batch_size, pause):
+    """Delete the tags or ingredients of a user and any link to them"""
+    target = f'{model._meta.model_name}_id__in'
+    deleted = 0
+    for rows in _batches(model.objects.filter(user_id=user_id), batch_size):
+        ids = [obj_id for obj_id, in rows]
+        with transaction.atomic():
+            # Only recipes of other users are left to be linked
+            linked = list(through._base_manager.filter(
+                **{target: ids}
+            ).values_list('recipe_id', flat=True).distinct())
+            _raw_delete(through, **{target: ids})
+            _raw_delete(model, id__in=ids)
+            update_signatures(linked)
+        deleted += len(ids)
+        time.sleep(pause)
+    return deleted
+
+
+def delete_user(user_id, batch_size=BATCH_SIZE, pause=0.0):
+    """
+        Delete the user with user_id and everything they own.
+        The account is deactivated first so nothing new is created while
+        the data goes. pause is slept between batches to leave room for
+        other transactions. Returns the number of rows deleted per model.
+    """
+    user_model = get_user_model()
+    user_model._base_manager.filter(id=user_id).update(is_active=False)
+
+    deleted = {
+        'recipes': _delete_recipes(user_id, batch_size, pause),
+        'tags': _delete_attributes(
+            Tag, Recipe.tags.through, user_id, batch_size, pause
+        ),
+        'ingredients': _delete_attributes(
+            Ingredient, Recipe.ingredients.through, user_id, batch_size,
+            pause
+        ),
+    }
+
+    # What is left (token, groups, ...) is small, the collector handles
+    # it along with any relation added later on
+    _, rows = user_model._base_manager.filter(id=user_id).delete()
+    deleted['users'] = rows.get(user_model._meta.label, 0)
+    logger.info('Deleted user %s: %s', user_id, deleted)
+    return deleted
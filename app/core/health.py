@@ -0,0 +1,127 @@
+"""
+    Readiness checks shared by the wait_for_db command and the
+    /healthz and /readyz endpoints.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+
+_migrations_applied = False
+
+
+def check_database(alias):
+    """
+        Open a real connection to alias and run a trivial query.
+        Raises OperationalError when the database is not reachable.
+    """
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        connection.close()
+
+
+def wait_for_database(alias, deadline, initial_delay=0.1, max_delay=5.0,
+                      on_retry=None):
+    """
+        Retry check_database with exponential backoff until it succeeds
+        or the deadline (a time.monotonic() value) passes.
+        Returns the number of attempts, re-raises the last error when the
+        deadline is reached.
+    """
+    delay = initial_delay
+    attempt = 1
+    while True:
+        try:
+            check_database(alias)
+            return attempt
+        except OperationalError as exc:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            if on_retry is not None:
+                on_retry(alias, attempt, exc)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+            attempt += 1
+
+
+def run_parallel(func, aliases):
+    """Run func(alias) for every alias at once, return {alias: error}"""
+    aliases = list(aliases)
+    if not aliases:
+        return {}
+
+    def run(alias):
+        try:
+            func(alias)
+        except Exception as exc:
+            return exc
+        finally:
+            # Each worker thread has its own connections
+            connections.close_all()
+        return None
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        results = executor.map(run, aliases)
+        return {
+            alias: error for alias, error in zip(aliases, results) if error
+        }
+
+
+def check_migrations(alias=DEFAULT_DB_ALIAS):
+    """Raise RuntimeError if alias has unapplied migrations"""
+    global _migrations_applied
+    if _migrations_applied:
+        # Once applied, migrations don't go away while the process runs
+        return
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        pending = ', '.join(f'{m.app_label}.{m.name}' for m, _ in plan)
+        raise RuntimeError(f'Unapplied migrations: {pending}')
+    _migrations_applied = True
+
+
+def check_media_writable():
+    """Raise OSError if a file can't be written under MEDIA_ROOT"""
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT) as tmp:
+        tmp.write(b'ok')
+        tmp.flush()
+
+
+def readiness():
+    """
+        Run every readiness check once.
+        Returns a dict of check name to error message (None when the
+        check passed).
+    """
+    results = {}
+    db_errors = run_parallel(check_database, connections)
+    for alias in connections:
+        error = db_errors.get(alias)
+        results[f'database:{alias}'] = str(error) if error else None
+
+    try:
+        check_migrations()
+        results['migrations'] = None
+    except Exception as exc:
+        results['migrations'] = str(exc)
+
+    try:
+        check_media_writable()
+        results['media'] = None
+    except OSError as exc:
+        results['media'] = str(exc)
+
+    return results
@@ -0,0 +1,159 @@
+"""
+    Background jobs stored in the database.
+    Tasks are functions registered with @task, usually in the tasks.py
+    module of an app. enqueue() stores a Job, the run_worker command
+    claims queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+    number of workers can share the table without a broker, and runs
+    them. Failed jobs are retried with exponential backoff until
+    max_attempts is reached.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.metrics import registry
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JOBS_FINISHED = registry.counter(
+    'jobs_finished_total',
+    'Jobs run by the workers, by task and outcome',
+)
+
+_tasks = {}
+_finishers = {}
+
+
+def task(name, finish=None):
+    """
+        Register the decorated function as the task called name.
+        finish is called with the payload once the job is done or has
+        failed for good, to clean up what the payload points to.
+    """
+    def register(func):
+        _tasks[name] = func
+        if finish is not None:
+            _finishers[name] = finish
+        return func
+    return register
+
+
+def _finish(name, payload):
+    finish = _finishers.get(name)
+    if finish is None:
+        return
+    try:
+        finish(**json.loads(payload))
+    except Exception:
+        logger.exception('Cleaning up after a %s job failed', name)
+
+
+def get_task(name):
+    return _tasks[name]
+
+
+def enqueue(name, user=None, max_attempts=5, delay=0, **payload):
+    """
+        Queue task name to run with payload as its keyword arguments,
+        which must be JSON serializable. Returns the Job.
+    """
+    if name not in _tasks:
+        raise KeyError(f'Unknown task {name}')
+    return Job.objects.create(
+        name=name,
+        user=user,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts, base=2.0, cap=600.0):
+    """Return the delay in seconds before retrying a job, with jitter"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim():
+    """
+        Lock the next due job and mark it running, return None when
+        there is nothing to do. The row lock only lasts this short
+        transaction, locked rows are skipped instead of waited on.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=timezone.now())
+            .order_by('run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_at'])
+    return job
+
+
+def run(job):
+    """Run a claimed job and record the outcome"""
+    try:
+        result = get_task(job.name)(**json.loads(job.payload))
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            )
+            outcome = 'retried'
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            outcome = 'failed'
+        logger.warning('Job %s %s:\n%s', job, outcome, job.error)
+    else:
+        job.status = Job.DONE
+        job.result = json.dumps(result, default=str)
+        job.finished_at = timezone.now()
+        outcome = 'done'
+    job.locked_at = None
+    job.save(update_fields=[
+        'status', 'run_at', 'locked_at', 'finished_at', 'result', 'error',
+    ])
+    if job.status != Job.QUEUED:
+        _finish(job.name, job.payload)
+    JOBS_FINISHED.inc(task=job.name, outcome=outcome)
+    return job
+
+
+def requeue_stale(timeout):
+    """
+        Queue again the jobs that have been running for more than timeout
+        seconds, their worker died. The ones out of attempts fail instead.
+        Returns how many were requeued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout)
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts'))
+    finishing = list(
+        failed.filter(name__in=_finishers).values_list('name', 'payload')
+    )
+    failed.update(
+        status=Job.FAILED, locked_at=None, finished_at=now,
+        error='Worker lost while running the job'
+    )
+    for name, payload in finishing:
+        _finish(name, payload)
+    return stale.update(status=Job.QUEUED, locked_at=None, run_at=now)
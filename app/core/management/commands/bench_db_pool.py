@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db.pool import ConnectionPool
+from core.perf import percentile
+
+
+class Command(BaseCommand):
+    """
+        Compare the latency of opening a new database connection per
+        request with checking one out of a pool.
+        Each iteration runs SELECT 1, like a cheap endpoint would.
+    """
+    help = 'Benchmark new connections against pooled connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def _run(self, acquire, release, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            conn = acquire()
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            release(conn)
+            timings.append(time.perf_counter() - started)
+        return sorted(timings)
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f'{label:>8}: mean {statistics.mean(timings) * 1000:.3f} ms  '
+            f'p50 {percentile(timings, 50) * 1000:.3f} ms  '
+            f'p99 {percentile(timings, 99) * 1000:.3f} ms'
+        )
+
+    def handle(self, *args, **options):
+        wrapper = connections[options['database']]
+        if wrapper.vendor != 'postgresql':
+            raise CommandError('This benchmark needs a PostgreSQL database')
+
+        conn_params = wrapper.get_connection_params()
+        connect = wrapper.Database.connect
+        iterations = options['iterations']
+
+        direct = self._run(
+            lambda: connect(**conn_params),
+            lambda conn: conn.close(),
+            iterations
+        )
+        pool = ConnectionPool(
+            lambda: connect(**conn_params), max_size=1, name='benchmark'
+        )
+        pooled = self._run(pool.acquire, pool.release, iterations)
+        pool.close_idle()
+
+        self._report('direct', direct)
+        self._report('pooled', pooled)
+        speedup = statistics.mean(direct) / statistics.mean(pooled)
+        self.stdout.write(self.style.SUCCESS(
+            f'Pooling is {speedup:.1f}x faster per request'
+        ))
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import deletion
+
+
+class Command(BaseCommand):
+    """
+        Delete accounts with all their recipes, tags, ingredients and
+        recipe images, in short batched transactions. If a run is
+        interrupted, run the command again to finish the job.
+    """
+    help = 'Delete users and their recipe data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', nargs='+', help='User emails or ids')
+        parser.add_argument(
+            '--batch-size', type=int, default=deletion.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to wait between batches'
+        )
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        for value in options['users']:
+            lookup = {'id': value} if value.isdigit() else {'email': value}
+            user_id = user_model._base_manager.filter(
+                **lookup
+            ).values_list('id', flat=True).first()
+            if user_id is None:
+                raise CommandError(f'User {value} does not exist')
+
+            deleted = deletion.delete_user(
+                user_id, options['batch_size'], options['pause']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {value}: {deleted["recipes"]} recipes, '
+                f'{deleted["tags"]} tags, '
+                f'{deleted["ingredients"]} ingredients'
+            ))
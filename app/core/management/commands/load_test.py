@@ -0,0 +1,114 @@
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.perf import percentile
+
+
+class SlowClient(threading.Thread):
+    """
+        Client that sends its request headers one line at a time.
+        A synchronous worker is stuck reading them until they are
+        complete, an ASGI server only keeps a coroutine waiting.
+    """
+
+    def __init__(self, url, stop, interval=1.0):
+        super().__init__(daemon=True)
+        self.url = urllib.parse.urlsplit(url)
+        self.stop = stop
+        self.interval = interval
+
+    def run(self):
+        try:
+            sock = socket.create_connection(
+                (self.url.hostname, self.url.port or 80), timeout=5
+            )
+        except OSError:
+            return
+        with sock:
+            sock.sendall(
+                f'GET {self.url.path or "/"} HTTP/1.1\r\n'
+                f'Host: {self.url.netloc}\r\n'.encode('latin1')
+            )
+            line = 0
+            while not self.stop.is_set():
+                line += 1
+                try:
+                    sock.sendall(f'X-Padding-{line}: 1\r\n'.encode())
+                except OSError:
+                    return
+                self.stop.wait(self.interval)
+
+
+class Command(BaseCommand):
+    """
+        Measure how a running server copes with slow clients.
+        While --slow-clients connections trickle request headers, the
+        command sends --requests GETs to --url with --concurrency parallel
+        clients and reports latency, throughput and failures. Run it once
+        against gunicorn (app.wsgi) and once against uvicorn (app.asgi)
+        to compare the concurrency limits of both models.
+    """
+    help = 'Load test a running server in the presence of slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', required=True)
+        parser.add_argument('--token', help='API token to send')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--slow-clients', type=int, default=0)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def _fetch(self, url, token, timeout):
+        request = urllib.request.Request(url)
+        if token:
+            request.add_header('Authorization', f'Token {token}')
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as res:
+                res.read()
+                status = res.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except OSError:
+            status = None
+        return status, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        slow_clients = [
+            SlowClient(options['url'], stop)
+            for _ in range(options['slow_clients'])
+        ]
+        for client in slow_clients:
+            client.start()
+        # Give the slow clients time to occupy the server
+        time.sleep(1 if slow_clients else 0)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(
+                lambda _: self._fetch(
+                    options['url'], options['token'], options['timeout']
+                ),
+                range(options['requests'])
+            ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+
+        ok = sorted(t for status, t in results if status and status < 400)
+        failed = len(results) - len(ok)
+        self.stdout.write(
+            f'{len(slow_clients)} slow clients, '
+            f'{options["concurrency"]} concurrent requests\n'
+            f'  ok {len(ok)}  failed {failed}  '
+            f'throughput {len(ok) / elapsed:.1f} req/s\n'
+            f'  p50 {percentile(ok, 50) * 1000:.1f} ms  '
+            f'p99 {percentile(ok, 99) * 1000:.1f} ms'
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import provisioning
+
+
+class Command(BaseCommand):
+    """
+        Create the accounts listed in a CSV file with email, password and
+        optionally name columns. Passwords are hashed on every core,
+        emails already taken are skipped.
+    """
+    help = 'Create users in bulk from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path of the CSV file')
+        parser.add_argument('--batch-size', type=int,
+                            default=provisioning.BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing processes, one per core by default')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], newline='') as lines:
+                users = provisioning.read_users(lines)
+        except provisioning.ProvisioningError as error:
+            raise CommandError('\n'.join(error.errors))
+
+        created, skipped = provisioning.provision(
+            users, options['batch_size'], options['workers']
+        )
+        for email in skipped:
+            self.stdout.write(f'Skipped {email}, the email is taken')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(created)} users, skipped {len(skipped)}'
+        ))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    """
+        Delete the tombstones of the changes feed older than --days,
+        SYNC_TOMBSTONE_DAYS by default. Meant to run daily.
+    """
+    help = 'Delete old tombstones of deleted recipes, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.SYNC_TOMBSTONE_DAYS)
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(options['days'])
+        self.stdout.write(f'Deleted {deleted} tombstones')
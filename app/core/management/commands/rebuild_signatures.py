@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import similarity
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+        Recompute the MinHash signatures and LSH buckets of the recipes,
+        after loading links without signals or changing the parameters
+        in core.similarity. The hashing of each batch is vectorized.
+    """
+    help = 'Recompute the similarity signatures of the recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=similarity.BATCH_SIZE)
+        parser.add_argument('--user', type=int, action='append',
+                            dest='users', help='Only recipes of this user')
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['users']:
+            queryset = queryset.filter(user_id__in=options['users'])
+        stored = similarity.rebuild(queryset, options['batch_size'])
+        self.stdout.write(f'Stored {stored} signatures')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from core.counters import refresh_recipe_counts
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """
+        Recompute Tag.recipe_count and Ingredient.recipe_count from the
+        through tables, --batch-size rows per UPDATE so no transaction
+        holds many row locks for long.
+    """
+    help = 'Recompute the recipe counts of tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Tag, Ingredient):
+            last_id = model.objects.aggregate(Max('id'))['id__max'] or 0
+            updated = 0
+            for start in range(0, last_id, batch_size):
+                updated += refresh_recipe_counts(model.objects.filter(
+                    id__gt=start, id__lte=start + batch_size
+                ))
+            self.stdout.write(
+                f'Recounted {updated} {model._meta.verbose_name_plural}'
+            )
@@ -0,0 +1,63 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    """
+        Run background jobs with --concurrency threads.
+        Each thread claims one due job at a time and sleeps
+        --poll-interval seconds when the queue is empty. SIGTERM and
+        SIGINT let the running jobs finish before exiting. With --once
+        the worker exits as soon as the queue is empty.
+    """
+    help = 'Process queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--stale-after', type=float, default=3600,
+            help='Requeue jobs running for longer than this many seconds'
+        )
+        parser.add_argument('--once', action='store_true')
+
+    def _work(self, stop, options):
+        try:
+            while not stop.is_set():
+                job = jobs.claim()
+                if job is None:
+                    if options['once']:
+                        return
+                    stop.wait(options['poll_interval'])
+                    continue
+                job = jobs.run(job)
+                self.stdout.write(f'{job}')
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *args: stop.set())
+
+        requeued = jobs.requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        threads = [
+            threading.Thread(
+                target=self._work, args=(stop, options),
+                name=f'worker-{index}'
+            )
+            for index in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
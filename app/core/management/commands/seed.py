@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    """
+        Fill the database with a synthetic dataset for load and scale
+        testing. Start from a --size preset and override single counts
+        with the other options; the same --seed always gives the same
+        data. Every user's password is --password.
+    """
+    help = 'Generate users, tags, ingredients and recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', choices=sorted(seeding.SIZES), default='small'
+        )
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--recipes', type=int)
+        parser.add_argument('--tags', type=int, help='Tags per user')
+        parser.add_argument(
+            '--ingredients', type=int, help='Ingredients per user'
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent, 0 spreads everything evenly'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--password', default=seeding.PASSWORD)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        size = dict(seeding.SIZES[options['size']])
+        for key in size:
+            if options[key] is not None:
+                size[key] = options[key]
+        if any(value < 0 for value in size.values()):
+            raise CommandError('Counts cannot be negative')
+        if size['recipes'] and not size['users']:
+            raise CommandError('Recipes need at least one user')
+
+        started = time.perf_counter()
+        created = seeding.seed(
+            **size,
+            skew=options['skew'],
+            tags_per_recipe=options['tags_per_recipe'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            seed=options['seed'],
+            password=options['password'],
+            using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created["users"]} users, {created["tags"]} tags, '
+            f'{created["ingredients"]} ingredients and {created["recipes"]} '
+            f'recipes in {time.perf_counter() - started:.1f}s'
+        ))
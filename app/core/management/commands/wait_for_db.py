@@ -1,22 +1,74 @@
 import time
 
 from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core import health
 
 
 class Command(BaseCommand):
-    """Django command to pause execution until database is available"""
+    """
+        Django command to pause execution until the databases are available.
+        Every database is probed in parallel with real connections, retrying
+        with exponential backoff until the timeout is reached.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for, defaults to all of them',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up',
+        )
+        parser.add_argument(
+            '--migrations', action='store_true',
+            help='Also wait until all migrations are applied',
+        )
+        parser.add_argument(
+            '--media', action='store_true',
+            help='Also check that MEDIA_ROOT is writable',
+        )
+
+    def _on_retry(self, alias, attempt, exc):
+        self.stdout.write(
+            f'Database {alias} unavailable (attempt {attempt}), retrying...'
+        )
 
     def handle(self, *args, **options):
         """Handle the command"""
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        aliases = options['databases'] or list(connections)
+
+        errors = health.run_parallel(
+            lambda alias: health.wait_for_database(
+                alias, deadline, on_retry=self._on_retry
+            ),
+            aliases
+        )
+        if errors:
+            raise CommandError('; '.join(
+                f'Database {alias} unavailable: {error}'
+                for alias, error in errors.items()
+            ))
+
+        if options['migrations']:
+            self.stdout.write('Waiting for migrations...')
+            while True:
+                try:
+                    health.check_migrations()
+                    break
+                except RuntimeError as exc:
+                    if time.monotonic() >= deadline:
+                        raise CommandError(str(exc))
+                    time.sleep(1)
+
+        if options['media']:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                health.check_media_writable()
+            except OSError as exc:
+                raise CommandError(f'Media volume is not writable: {exc}')
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,104 @@
+import threading
+
+
+class Metric:
+    """A single named value, optionally split by labels"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def value(self, **labels):
+        """Return the current value for the given labels"""
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """Return a list of (labels, value) pairs"""
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def reset(self):
+        """Forget every recorded value"""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Registry:
+    """Holds the metrics of this process"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f'Metric {name} is already a {metric.kind}')
+            return metric
+
+    def counter(self, name, help_text=''):
+        """Return the counter called name, creating it if needed"""
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        """Return the gauge called name, creating it if needed"""
+        return self._get_or_create(Gauge, name, help_text)
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for metric in metrics:
+            if metric.help_text:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for labels, value in metric.samples():
+                label_str = ','.join(
+                    f'{key}="{val}"' for key, val in sorted(labels.items())
+                )
+                if label_str:
+                    label_str = '{' + label_str + '}'
+                lines.append(f'{metric.name}{label_str} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,244 @@
+import contextlib
+import json
+import logging
+import random
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core.db.pool import PoolTimeout
+from core.metrics import registry
+from core.profiling import RequestProfile
+
+
+profiling_logger = logging.getLogger('core.profiling')
+
+
+COMPRESSED_RESPONSES = registry.counter(
+    'http_compression_responses_total',
+    'Responses compressed, by encoding',
+)
+COMPRESSION_SKIPPED = registry.counter(
+    'http_compression_skipped_total',
+    'Responses left uncompressed, by reason',
+)
+COMPRESSION_BYTES_IN = registry.counter(
+    'http_compression_bytes_in_total',
+    'Response bytes before compression',
+)
+COMPRESSION_BYTES_OUT = registry.counter(
+    'http_compression_bytes_out_total',
+    'Response bytes after compression',
+)
+COMPRESSION_CPU_SECONDS = registry.counter(
+    'http_compression_cpu_seconds_total',
+    'CPU time spent compressing responses',
+)
+
+# zlib window bits for each supported content coding, in preference order
+ENCODINGS = (
+    ('gzip', 16 + zlib.MAX_WBITS),
+    ('deflate', zlib.MAX_WBITS),
+)
+
+# Content types that are already compressed, so compressing them again
+# only burns CPU
+INCOMPRESSIBLE_TYPES = (
+    'image/', 'video/', 'audio/',
+    'application/zip', 'application/gzip', 'application/x-gzip',
+    'application/pdf', 'application/octet-stream',
+)
+
+
+def parse_accept_encoding(header):
+    """Return a dict mapping each coding in header to its q-value"""
+    codings = {}
+    for item in header.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def choose_encoding(header):
+    """Pick the best supported coding allowed by an Accept-Encoding value"""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+    best = None
+    best_quality = 0.0
+    for name, wbits in ENCODINGS:
+        quality = codings.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = (name, wbits), quality
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+        Compress responses with gzip or deflate.
+        Unlike django's GZipMiddleware this one honours the q-values of
+        Accept-Encoding, only compresses bodies above COMPRESSION_MIN_SIZE,
+        never touches media files or already compressed content types
+        and records how much it saved and what it cost in core.metrics.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.level = getattr(settings, 'COMPRESSION_LEVEL', 6)
+
+    def _skip_reason(self, request, response):
+        """Return why the response should not be compressed, if it should"""
+        if response.has_header('Content-Encoding'):
+            return 'encoded'
+        if settings.MEDIA_URL and request.path.startswith(settings.MEDIA_URL):
+            return 'media'
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return 'content_type'
+        if not response.streaming and len(response.content) < self.min_size:
+            return 'too_small'
+        return None
+
+    def process_response(self, request, response):
+        reason = self._skip_reason(request, response)
+        if reason:
+            COMPRESSION_SKIPPED.inc(reason=reason)
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            COMPRESSION_SKIPPED.inc(reason='not_accepted')
+            return response
+        name, wbits = encoding
+
+        if response.streaming:
+            # The compressed size is only known once the stream is consumed
+            response.streaming_content = self._compress_stream(
+                response.streaming_content, wbits
+            )
+            del response['Content-Length']
+        else:
+            compressed = self._compress(response.content, wbits)
+            # Return the compressed content only if it's actually shorter.
+            if len(compressed) >= len(response.content):
+                COMPRESSION_SKIPPED.inc(reason='no_gain')
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        # If there is a strong ETag, make it weak to fulfill the requirements
+        # of RFC 7232 section-2.1 while also allowing conditional request
+        # matches on ETags.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = name
+        COMPRESSED_RESPONSES.inc(encoding=name)
+
+        return response
+
+    def _compress(self, content, wbits):
+        """Compress a whole body in one go"""
+        started = time.thread_time()
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+        compressed = compressor.compress(content) + compressor.flush()
+        self._record(len(content), len(compressed), started)
+        return compressed
+
+    def _compress_stream(self, chunks, wbits):
+        """
+            Compress a streaming body chunk by chunk.
+            Every chunk is sync-flushed so the client receives data as soon
+            as the view produces it instead of when the buffer fills up.
+        """
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            started = time.thread_time()
+            data = compressor.compress(chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._record(len(chunk), len(data), started)
+            if data:
+                yield data
+        started = time.thread_time()
+        data = compressor.flush()
+        self._record(0, len(data), started)
+        yield data
+
+    def _record(self, bytes_in, bytes_out, started):
+        COMPRESSION_BYTES_IN.inc(bytes_in)
+        COMPRESSION_BYTES_OUT.inc(bytes_out)
+        COMPRESSION_CPU_SECONDS.inc(time.thread_time() - started)
+
+
+class ProfilingMiddleware:
+    """
+        Profile a sample of the requests.
+        A PROFILING_SAMPLE_RATE share of the requests (0 turns profiling
+        off) records its query count, SQL time and slowest query, plus the
+        serializer and renderer time of views using ProfiledViewMixin.
+        The figures are sent back in a Server-Timing header and logged as
+        one JSON line on the core.profiling logger.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        request.profile = profile
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        profile.finish()
+
+        response['Server-Timing'] = profile.server_timing()
+        profiling_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **profile.as_dict(),
+        }))
+        return response
+
+
+class PoolTimeoutMiddleware(MiddlewareMixin):
+    """
+        Answer 503 with Retry-After when no database connection became
+        free within DB_POOL_TIMEOUT, the server is busy rather than broken
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, PoolTimeout):
+            return None
+        response = HttpResponse(
+            'Database busy, retry later', status=503,
+            content_type='text/plain'
+        )
+        response['Retry-After'] = '1'
+        return response
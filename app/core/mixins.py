@@ -0,0 +1,158 @@
+import time
+
+from django.conf import settings
+from django.db.utils import InterfaceError, OperationalError
+from rest_framework.exceptions import Throttled
+
+from core import throttling
+from core.db import routers
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaReadMixin:
+    """
+        Serve safe requests of an API view from a read replica.
+        Writes always go to the primary and pin the user to it for
+        REPLICA_PIN_SECONDS, so their next reads see what they wrote.
+        The pin is kept in the shared cache and in a signed cookie, so it
+        holds whichever process serves the next request.
+        If the chosen replica cannot be reached, it is marked down and
+        the request is retried on the primary. Query errors, like
+        statement timeouts, are raised as they are.
+    """
+    pin_cookie = 'primary_pin'
+
+    def _pinned(self, request, user_id):
+        pin = request.get_signed_cookie(
+            self.pin_cookie, default=None, salt=self.pin_cookie,
+            max_age=settings.REPLICA_PIN_SECONDS
+        )
+        return pin == str(user_id) or routers.is_pinned(user_id)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = getattr(request.user, 'pk', None)
+        if request.method not in SAFE_METHODS:
+            routers.use_replica(None)
+            if user_id is not None:
+                routers.pin_to_primary(user_id)
+                self._pin_user_id = user_id
+        elif getattr(self, '_retry_on_primary', False) or \
+                user_id is None or self._pinned(request, user_id):
+            routers.use_replica(None)
+        else:
+            routers.use_replica(routers.choose_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        user_id = getattr(self, '_pin_user_id', None)
+        if user_id is not None:
+            response.set_signed_cookie(
+                self.pin_cookie, str(user_id), salt=self.pin_cookie,
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True
+            )
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except (OperationalError, InterfaceError) as exc:
+            replica = routers.current_replica()
+            if replica is None or not routers.is_connection_error(exc):
+                raise
+            routers.mark_down(replica)
+            routers.use_replica(None)
+            # initial() runs again, it must not pick another replica
+            self._retry_on_primary = True
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            routers.use_replica(None)
+
+
+class ProfiledViewMixin:
+    """
+        Add view and renderer timings to the profile of sampled requests.
+        The serialize time is the time spent in the action handler minus
+        its SQL time, which for the API views is mostly building the
+        serializer data. The response is rendered here, instead of by
+        django later on, to time the renderer.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            self._profile_marks = (time.perf_counter(), profile.sql_time)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        profile = getattr(request, 'profile', None)
+        marks = getattr(self, '_profile_marks', None)
+        if profile is None or marks is None:
+            return response
+
+        started, sql_time = marks
+        handler_time = time.perf_counter() - started
+        profile.serialize_time += max(
+            0.0, handler_time - (profile.sql_time - sql_time)
+        )
+        if hasattr(response, 'render') and not response.is_rendered:
+            started = time.perf_counter()
+            response.render()
+            profile.render_time += time.perf_counter() - started
+        return response
+
+
+class ConcurrencyLimitMixin:
+    """
+        Cap the requests of one user in flight at the same time to
+        MAX_CONCURRENT_REQUESTS, the ones over it get a 429. The counter
+        lives in the throttle cache and expires after
+        inflight_timeout seconds, in case a process dies mid-request.
+    """
+    inflight_timeout = 300
+
+    def check_throttles(self, request):
+        super().check_throttles(request)
+        limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS', 0)
+        user_id = getattr(request.user, 'pk', None)
+        # The check runs again when ReplicaReadMixin retries a request
+        if not limit or user_id is None or \
+                getattr(self, '_inflight_key', None):
+            return
+
+        key = f'inflight:{user_id}'
+        cache = throttling.get_cache()
+        cache.add(key, 0, self.inflight_timeout)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.add(key, 1, self.inflight_timeout)
+            count = 1
+        self._inflight_key = key
+        if count > limit:
+            throttling.THROTTLED.inc(
+                scope=getattr(self, 'throttle_scope', ''),
+                reason='concurrency'
+            )
+            raise Throttled(wait=1, detail=(
+                f'Too many concurrent requests, at most {limit} at a time.'
+            ))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            key = getattr(self, '_inflight_key', None)
+            if key:
+                try:
+                    throttling.get_cache().decr(key)
+                except ValueError:
+                    pass
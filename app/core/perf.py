@@ -0,0 +1,9 @@
+"""Helpers shared by the benchmark and load test commands"""
+
+
+def percentile(samples, pct):
+    """Return the pct percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
@@ -0,0 +1,63 @@
+import time
+
+
+class RequestProfile:
+    """
+        Where the time of one request went.
+        It is installed as an execute wrapper on the database connections
+        to time every query; core.mixins.ProfiledViewMixin adds the time
+        spent in the view handler and in the renderer.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_sql_time = 0.0
+        self.slowest_sql = ''
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += duration
+            if duration > self.slowest_sql_time:
+                self.slowest_sql_time = duration
+                self.slowest_sql = sql
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Return the value of the Server-Timing header"""
+        def metric(name, seconds, desc=None):
+            value = f'{name};dur={seconds * 1000:.2f}'
+            if desc:
+                value += f';desc="{desc}"'
+            return value
+
+        return ', '.join([
+            metric('sql', self.sql_time, f'{self.queries} queries'),
+            metric('sql-max', self.slowest_sql_time),
+            metric('serialize', self.serialize_time),
+            metric('render', self.render_time),
+            metric('total', self.total_time),
+        ])
+
+    def as_dict(self):
+        """Return the profile as a dict for structured logging"""
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'slowest_sql_ms': round(self.slowest_sql_time * 1000, 2),
+            'slowest_sql': self.slowest_sql[:500],
+            'serialize_ms': round(self.serialize_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
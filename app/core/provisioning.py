@@ -0,0 +1,166 @@
+"""
+    Bulk creation of user accounts from a CSV file with an email, a
+    password and optionally a name column.
+    Hashing a password with PBKDF2 is slow on purpose and takes one core,
+    so the passwords are hashed in a process pool across every core, and
+    the users are inserted batch_size at a time instead of one INSERT
+    each. Emails already taken are found up front with a single query on
+    the unique email index and skipped, so an interrupted import can be
+    run again as is.
+    Uploaded files are provisioned by a job. The users are kept in a file
+    of PROVISION_UPLOAD_DIR readable by the owner only until the job is
+    over, so their passwords never reach the database.
+"""
+import contextlib
+import csv
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+
+BATCH_SIZE = 500
+MIN_PASSWORD_LENGTH = 3
+
+
+class ProvisioningError(ValueError):
+    """The CSV file is invalid, errors holds a message per bad line"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def read_users(lines, max_rows=None):
+    """
+        Return the (email, name, password) of every row of a CSV file
+        given as an iterable of lines, with normalized emails. Raises
+        ProvisioningError listing the bad lines, the file is taken whole
+        or not at all.
+    """
+    reader = csv.DictReader(lines)
+    if not {'email', 'password'} <= set(reader.fieldnames or ()):
+        raise ProvisioningError(['The header needs email and password'])
+
+    users, errors, seen = [], [], set()
+    for row in reader:
+        line = reader.line_num
+        if max_rows is not None and len(users) >= max_rows:
+            raise ProvisioningError([f'More than {max_rows} users'])
+        email = get_user_model().objects.normalize_email(
+            (row['email'] or '').strip()
+        )
+        password = row['password'] or ''
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append(f'Line {line}: invalid email')
+            continue
+        if email in seen:
+            errors.append(f'Line {line}: duplicate email {email}')
+            continue
+        if len(password) < MIN_PASSWORD_LENGTH:
+            errors.append(f'Line {line}: password too short')
+            continue
+        seen.add(email)
+        users.append((email, (row.get('name') or '').strip(), password))
+    if errors:
+        raise ProvisioningError(errors)
+    return users
+
+
+def _workers():
+    return settings.PROVISION_WORKERS or os.cpu_count() or 1
+
+
+def hash_passwords(passwords, workers=None):
+    """Return the hashes of passwords, computed by workers processes"""
+    passwords = list(passwords)
+    workers = min(workers or _workers(), len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    # Spawned, forking a threaded process like run_worker can deadlock
+    # on locks held by its other threads. They run django.setup() first.
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def save_upload(users):
+    """Write the users of read_users() to a private file, return its path"""
+    os.makedirs(settings.PROVISION_UPLOAD_DIR, mode=0o700, exist_ok=True)
+    # mkstemp creates the file with mode 0600
+    fd, path = tempfile.mkstemp(
+        suffix='.csv', dir=settings.PROVISION_UPLOAD_DIR
+    )
+    with open(fd, 'w', newline='') as upload:
+        writer = csv.writer(upload)
+        writer.writerow(('email', 'name', 'password'))
+        writer.writerows(users)
+    return path
+
+
+def load_upload(path):
+    """Return the users saved by save_upload()"""
+    with open(path, newline='') as lines:
+        return read_users(lines)
+
+
+def remove_upload(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _insert(users, hashes):
+    user_model = get_user_model()
+    with transaction.atomic():
+        user_model.objects.bulk_create(
+            user_model(email=email, name=name, password=hashed)
+            for (email, name, _), hashed in zip(users, hashes)
+        )
+
+
+def provision(users, batch_size=BATCH_SIZE, workers=None):
+    """
+        Create the users of read_users() whose email is not taken yet,
+        batch_size per transaction. Returns the emails created and the
+        emails skipped.
+    """
+    user_model = get_user_model()
+    taken = set(user_model.objects.filter(
+        email__in=[email for email, _, _ in users]
+    ).values_list('email', flat=True))
+    users = [user for user in users if user[0] not in taken]
+
+    hashes = hash_passwords([password for _, _, password in users], workers)
+    created = []
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        batch_hashes = hashes[start:start + batch_size]
+        try:
+            _insert(batch, batch_hashes)
+        except IntegrityError:
+            # Some signed up since the check above, skip them too
+            now_taken = set(user_model.objects.filter(
+                email__in=[email for email, _, _ in batch]
+            ).values_list('email', flat=True))
+            kept = [
+                (user, hashed) for user, hashed in zip(batch, batch_hashes)
+                if user[0] not in now_taken
+            ]
+            batch = [user for user, _ in kept]
+            _insert(batch, [hashed for _, hashed in kept])
+            taken |= now_taken
+        created.extend(email for email, _, _ in batch)
+    return created, sorted(taken)
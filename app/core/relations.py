@@ -0,0 +1,127 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+def sync_many_to_many(instance, name, objs):
+    """
+        Make the many to many field name of instance link exactly objs.
+        Unlike the manager's set(), the current links are read with one
+        query on the through table and nothing is written when they
+        already match. Otherwise the removed links are deleted and the
+        new ones inserted with one query each, in one transaction.
+        m2m_changed is sent like remove() and add() would.
+    """
+    field = instance._meta.get_field(name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    target_attname = through._meta.get_field(target).attname
+    using = router.db_for_write(through, instance=instance)
+
+    wanted = {getattr(obj, 'pk', obj) for obj in objs}
+    links = through._default_manager.using(using).filter(
+        **{source: instance.pk}
+    )
+    current = set(links.values_list(target_attname, flat=True))
+    removed = current - wanted
+    added = wanted - current
+    if not removed and not added:
+        return
+
+    def send(action, pk_set):
+        m2m_changed.send(
+            sender=through, action=action, instance=instance,
+            reverse=False, model=field.related_model, pk_set=pk_set,
+            using=using,
+        )
+
+    with transaction.atomic(using=using, savepoint=False):
+        if removed:
+            send('pre_remove', removed)
+            # delete() would collect the rows first when anything listens
+            # to m2m_changed, the through rows have nothing to cascade to
+            links.filter(
+                **{f'{target_attname}__in': removed}
+            )._raw_delete(using)
+            send('post_remove', removed)
+        if added:
+            send('pre_add', added)
+            through._default_manager.using(using).bulk_create([
+                through(**{
+                    through._meta.get_field(source).attname: instance.pk,
+                    target_attname: pk,
+                })
+                for pk in added
+            ])
+            send('post_add', added)
+
+    getattr(instance, '_prefetched_objects_cache', {}).pop(name, None)
+
+
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    """
+        ManyRelatedField looking up all the submitted pks in one query.
+        Every unknown pk is reported in the same error.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pks {pk_values} - objects do not exist.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                pk = pk_field.to_python(item)
+            except (DjangoValidationError, TypeError, ValueError):
+                pk = None
+            if pk is None or isinstance(item, bool):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            if pk not in pks:
+                pks.append(pk)
+
+        objs = queryset.in_bulk(pks) if pks else {}
+        missing = [pk for pk in pks if pk not in objs]
+        if missing:
+            self.fail(
+                'does_not_exist',
+                pk_values=', '.join(f'"{pk}"' for pk in missing)
+            )
+        return [objs[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+        PrimaryKeyRelatedField only accepting objects of the requesting
+        user. With many=True the ids are validated with a single
+        WHERE id IN (...) AND user_id = ... query and the fetched objects
+        are what ends up in validated_data.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=user)
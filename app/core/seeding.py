@@ -0,0 +1,245 @@
+"""
+    Synthetic datasets for load and scale testing.
+    Rows are generated in chunks and loaded with COPY on PostgreSQL and
+    bulk_create elsewhere, so millions of rows never sit in memory and
+    never go through model save(). Primary keys are assigned up front,
+    which lets the M2M links be generated without reading anything back.
+    Recipes are spread over the users, and tags and ingredients over the
+    recipes, with a Zipf-like skew so a few users and a few tags are much
+    more popular than the rest, like in production.
+"""
+import collections
+import csv
+import io
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.counters import refresh_recipe_counts
+from core.models import Tag, Ingredient, Recipe
+
+
+PASSWORD = 'seedpass123'
+
+SIZES = {
+    'small': {
+        'users': 20, 'recipes': 500, 'tags': 10, 'ingredients': 30,
+    },
+    'medium': {
+        'users': 200, 'recipes': 2000, 'tags': 20, 'ingredients': 60,
+    },
+    'large': {
+        'users': 1000, 'recipes': 10000, 'tags': 30, 'ingredients': 100,
+    },
+    'huge': {
+        'users': 100000, 'recipes': 2000000, 'tags': 30, 'ingredients': 100,
+    },
+}
+
+CHUNK_SIZE = 10000
+
+WORDS = (
+    'spicy', 'roasted', 'creamy', 'smoked', 'crispy', 'grilled', 'sweet',
+    'garlic', 'lemon', 'tomato', 'chicken', 'beef', 'tofu', 'rice',
+    'noodle', 'bean', 'salad', 'soup', 'curry', 'pie', 'stew', 'tacos',
+)
+
+
+def zipf_weights(count, skew):
+    """Return weights of a Zipf distribution over count items"""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _columns(model, with_pk=True):
+    return [
+        field for field in model._meta.concrete_fields
+        if with_pk or not field.primary_key
+    ]
+
+
+def _copy(connection, model, fields, rows):
+    """Load rows (tuples in fields order) with COPY FROM STDIN"""
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    sql = (
+        f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+        f"({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    with connection.cursor() as cursor:
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                ['\\N' if value is None else value for value in row]
+                for row in chunk
+            )
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+
+
+def _bulk_create(connection, model, fields, rows):
+    """Load rows (tuples in fields order) with bulk_create"""
+    names = [field.attname for field in fields]
+    batch_size = max(connection.ops.bulk_batch_size(fields, [None]), 1)
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        model.objects.using(connection.alias).bulk_create(
+            [model(**dict(zip(names, row))) for row in chunk],
+            batch_size=min(batch_size, CHUNK_SIZE)
+        )
+
+
+def load(connection, model, rows, with_pk=True):
+    """
+        Load rows, dicts of field attname to value, into model's table.
+        Fields missing from a row get their default. Without with_pk the
+        database assigns the primary keys.
+    """
+    fields = _columns(model, with_pk)
+    defaults = [(field.attname, field.get_default()) for field in fields]
+    rows = (
+        tuple(row.get(name, default) for name, default in defaults)
+        for row in rows
+    )
+    if connection.vendor == 'postgresql':
+        _copy(connection, model, fields, rows)
+    else:
+        _bulk_create(connection, model, fields, rows)
+
+
+def _next_id(model, using):
+    return (model.objects.using(using).aggregate(Max('id'))['id__max']
+            or 0) + 1
+
+
+def _title(rng):
+    return ' '.join(rng.sample(WORDS, 3)).capitalize()
+
+
+def seed(users, recipes, tags, ingredients, skew=1.1, tags_per_recipe=3,
+         ingredients_per_recipe=6, seed=0, password=PASSWORD,
+         using='default'):
+    """
+        Create the dataset, tags and ingredients are counts per user.
+        Recipes need an owner, without users none are created. The same
+        seed always creates the same dataset. Returns the number
+        of rows created per table and the id of the user with the most
+        recipes.
+    """
+    rng = random.Random(seed)
+    connection = connections[using]
+    user_model = get_user_model()
+    # Hashing is the slow part of creating users, every user gets the
+    # same password so it only has to be done once
+    password = make_password(password)
+    now = timezone.now()
+
+    with transaction.atomic(using=using):
+        user_base = _next_id(user_model, using)
+        load(connection, user_model, (
+            {
+                'id': user_base + index,
+                'password': password,
+                'email': f'seed{user_base + index}@example.com',
+                'name': f'Seed user {user_base + index}',
+                'is_active': True,
+            }
+            for index in range(users)
+        ))
+
+        tag_base = _next_id(Tag, using)
+        ingredient_base = _next_id(Ingredient, using)
+        for model, base, per_user in ((Tag, tag_base, tags),
+                                      (Ingredient, ingredient_base,
+                                       ingredients)):
+            load(connection, model, (
+                {
+                    'id': base + index * per_user + rank,
+                    'name': f'{rng.choice(WORDS)} {rank}',
+                    'user_id': user_base + index,
+                    'updated_at': now,
+                }
+                for index in range(users)
+                for rank in range(per_user)
+            ))
+
+        recipe_base = _next_id(Recipe, using)
+        owners = []
+        if users and recipes:
+            cum_weights = list(
+                itertools.accumulate(zipf_weights(users, skew))
+            )
+            owners = rng.choices(range(users), cum_weights=cum_weights,
+                                 k=recipes)
+        load(connection, Recipe, (
+            {
+                'id': recipe_base + index,
+                'user_id': user_base + owner,
+                'title': _title(rng),
+                'time_minutes': rng.randint(5, 180),
+                'price': f'{rng.uniform(1, 100):.2f}',
+                'updated_at': now,
+            }
+            for index, owner in enumerate(owners)
+        ))
+
+        for through, target, base, per_user, per_recipe in (
+                (Recipe.tags.through, 'tag_id', tag_base, tags,
+                 tags_per_recipe),
+                (Recipe.ingredients.through, 'ingredient_id',
+                 ingredient_base, ingredients, ingredients_per_recipe)):
+            if not per_user or not owners:
+                continue
+            ranks = list(range(per_user))
+            cum_weights = list(
+                itertools.accumulate(zipf_weights(per_user, skew))
+            )
+            load(connection, through, (
+                {
+                    'recipe_id': recipe_base + index,
+                    target: base + owner * per_user + rank,
+                }
+                for index, owner in enumerate(owners)
+                for rank in sorted(set(rng.choices(
+                    ranks, cum_weights=cum_weights, k=per_recipe
+                )))
+            ), with_pk=False)
+
+        for model in (Tag, Ingredient):
+            refresh_recipe_counts(
+                model._base_manager.using(using).filter(
+                    user_id__gte=user_base, user_id__lt=user_base + users
+                )
+            )
+
+        # The ids were assigned here, move the sequences past them
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), [user_model, Tag, Ingredient, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+    busiest = collections.Counter(owners).most_common(1)
+    return {
+        'users': users,
+        'tags': users * tags,
+        'ingredients': users * ingredients,
+        'recipes': len(owners),
+        'busiest_user': user_base + busiest[0][0] if busiest else None,
+    }
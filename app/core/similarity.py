@@ -0,0 +1,261 @@
+"""
+    Similar recipes by the Jaccard similarity of their tag and ingredient
+    sets, estimated with MinHash and found with locality sensitive hashing.
+    Every recipe gets a signature of NUM_PERM minimum hashes, the share of
+    equal positions in two signatures estimates the Jaccard similarity of
+    the sets. The signature is split in BANDS bands and each band hashed
+    to a RecipeBucket row, recipes sharing a bucket in any band are the
+    candidates, so a lookup reads a few index ranges instead of every
+    recipe of the user. With 32 bands of 2 rows, pairs 30% similar are
+    candidates 95% of the time; the best candidates by estimate are then
+    ranked by their exact similarity.
+    The receivers below recompute the signatures when the links change.
+    Code writing the through tables directly (seeding) runs the
+    rebuild_signatures command instead, recipes without a signature get
+    one the first time they are looked up.
+"""
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeBucket, RecipeSignature,
+)
+
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+PRIME = (1 << 31) - 1
+
+# Fixed seed: the stored signatures stay comparable across processes,
+# changing any of the above needs the signatures rebuilt
+_rng = np.random.RandomState(7)
+_A = _rng.randint(1, PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, PRIME, NUM_PERM).astype(np.uint64)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+SHORTLIST = 4
+BATCH_SIZE = 1000
+
+RELATIONS = (
+    (Recipe.ingredients.through, 'ingredient_id', 0),
+    (Recipe.tags.through, 'tag_id', 1),
+)
+
+
+def compute(recipe_ids, tokens):
+    """
+        Return the distinct recipe ids and their signatures, an (n,
+        NUM_PERM) uint32 array, from parallel arrays of recipe ids and
+        set elements. Every recipe is done at once with one reduceat.
+    """
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    tokens = np.asarray(tokens, dtype=np.uint64) % np.uint64(PRIME)
+    if not recipe_ids.size:
+        return recipe_ids, np.empty((0, NUM_PERM), dtype=np.uint32)
+    order = np.argsort(recipe_ids, kind='stable')
+    recipe_ids, tokens = recipe_ids[order], tokens[order]
+    starts = np.flatnonzero(
+        np.concatenate(([True], recipe_ids[1:] != recipe_ids[:-1]))
+    )
+    hashed = (_A[:, None] * tokens[None, :] + _B[:, None]) % np.uint64(PRIME)
+    signatures = np.minimum.reduceat(hashed, starts, axis=1).T
+    return recipe_ids[starts], signatures.astype(np.uint32)
+
+
+def band_buckets(signatures):
+    """
+        Return the (n, BANDS) bucket of every band of the signatures. The
+        band number is hashed in, so equal rows in different bands do not
+        collide and a lookup is one bucket IN (...) query.
+    """
+    bands = signatures.reshape(len(signatures), BANDS, ROWS)
+    buckets = np.tile(np.arange(BANDS, dtype=np.uint64),
+                      (len(signatures), 1))
+    with np.errstate(over='ignore'):
+        for row in range(ROWS):
+            buckets = (buckets ^ bands[:, :, row].astype(np.uint64)) * _MIX
+    # Fit in a signed 64 bit column
+    return (buckets >> np.uint64(1)).astype(np.int64)
+
+
+def estimate(signature, signatures):
+    """Return the estimated Jaccard similarity of signature to each row"""
+    return (signatures == signature).mean(axis=1)
+
+
+def _tokens(recipe_ids):
+    """Read the set elements of recipes, ingredient and tag ids apart"""
+    ids, tokens = [], []
+    for through, target, offset in RELATIONS:
+        rows = through._base_manager.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', target)
+        for recipe_id, obj_id in rows:
+            ids.append(recipe_id)
+            tokens.append(obj_id * 2 + offset)
+    return ids, tokens
+
+
+def update_signatures(recipe_ids):
+    """
+        Recompute and store the signatures and buckets of recipes, those
+        without tags and ingredients are left without. Returns the number
+        of signatures stored.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+    ids, signatures = compute(*_tokens(recipe_ids))
+    owners = dict(
+        Recipe._base_manager.filter(id__in=ids.tolist())
+        .values_list('id', 'user_id')
+    )
+    RecipeBucket._base_manager.filter(recipe_id__in=recipe_ids).delete()
+    RecipeSignature._base_manager.filter(recipe_id__in=recipe_ids).delete()
+
+    stored = [
+        (recipe_id, signature)
+        for recipe_id, signature in zip(ids.tolist(), signatures)
+        if recipe_id in owners
+    ]
+    if not stored:
+        return 0
+    RecipeSignature.objects.bulk_create(
+        RecipeSignature(recipe_id=recipe_id, signature=signature.tobytes())
+        for recipe_id, signature in stored
+    )
+    buckets = band_buckets(np.stack([signature for _, signature in stored]))
+    RecipeBucket.objects.bulk_create(
+        RecipeBucket(
+            recipe_id=recipe_id, user_id=owners[recipe_id], band=band,
+            bucket=bucket
+        )
+        for (recipe_id, _), row in zip(stored, buckets.tolist())
+        for band, bucket in enumerate(row)
+    )
+    return len(stored)
+
+
+def rebuild(queryset=None, batch_size=BATCH_SIZE):
+    """
+        Recompute the signatures of the recipes in queryset, all by
+        default, batch_size recipes per transaction. Returns the number
+        of signatures stored.
+    """
+    if queryset is None:
+        queryset = Recipe._base_manager.all()
+    stored, last_id = 0, 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list(
+            'id', flat=True
+        )[:batch_size])
+        if not ids:
+            return stored
+        with transaction.atomic():
+            stored += update_signatures(ids)
+        last_id = ids[-1]
+
+
+def _load(signature):
+    return np.frombuffer(bytes(signature), dtype=np.uint32)
+
+
+def get_signature(recipe):
+    """Return the signature of recipe, None when it has no set"""
+    stored = RecipeSignature.objects.filter(
+        recipe_id=recipe.id
+    ).values_list('signature', flat=True).first()
+    if stored is None:
+        ids, signatures = compute(*_tokens([recipe.id]))
+        if not len(ids):
+            return None
+        # Store it for the next lookups, but return what was computed:
+        # reading it back may hit a replica without the row yet
+        try:
+            with transaction.atomic():
+                update_signatures([recipe.id])
+        except IntegrityError:
+            # Stored at the same time by another request
+            pass
+        return signatures[0]
+    return _load(stored)
+
+
+def _sets(recipe_ids):
+    sets = {recipe_id: set() for recipe_id in recipe_ids}
+    for recipe_id, token in zip(*_tokens(recipe_ids)):
+        sets[recipe_id].add(token)
+    return sets
+
+
+def similar(recipe, k=10):
+    """
+        Return up to k (recipe id, Jaccard similarity) pairs of the
+        recipes of the same user most similar to recipe, best first.
+        The candidates sharing a bucket are narrowed down to SHORTLIST
+        times k by their estimated similarity, which are then ranked by
+        the exact one: the estimate alone is too noisy to order recipes
+        with close similarities.
+    """
+    signature = get_signature(recipe)
+    if signature is None:
+        return []
+    candidates = RecipeBucket.objects.filter(
+        user_id=recipe.user_id,
+        bucket__in=band_buckets(signature[None])[0].tolist()
+    ).exclude(recipe_id=recipe.id).values('recipe_id')
+    rows = list(RecipeSignature.objects.filter(
+        recipe_id__in=candidates
+    ).values_list('recipe_id', 'signature'))
+    if not rows:
+        return []
+
+    scores = estimate(signature, np.stack([_load(sig) for _, sig in rows]))
+    shortlist = [rows[i][0] for i in np.argsort(-scores)[:SHORTLIST * k]]
+    sets = _sets(shortlist + [recipe.id])
+    target = sets.pop(recipe.id)
+    exact = {
+        recipe_id: len(target & items) / len(target | items)
+        for recipe_id, items in sets.items()
+    }
+    # Ties go to the newest recipe
+    best = sorted(exact, key=lambda recipe_id: (-exact[recipe_id],
+                                                -recipe_id))[:k]
+    return [(recipe_id, round(exact[recipe_id], 3)) for recipe_id in best]
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_signatures([instance.id])
+        return
+
+    # instance is a tag or ingredient, pk_set holds recipe ids
+    if action == 'pre_clear':
+        instance._similarity_recipes = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        update_signatures(instance.__dict__.pop('_similarity_recipes', []))
+    elif action in ('post_add', 'post_remove'):
+        update_signatures(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attribute_deleting(sender, instance, **kwargs):
+    """The links of a deleted tag or ingredient go without m2m_changed"""
+    instance._similarity_recipes = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def attribute_deleted(sender, instance, **kwargs):
+    update_signatures(instance.__dict__.pop('_similarity_recipes', []))
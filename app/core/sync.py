@@ -0,0 +1,77 @@
+"""
+    Change tracking for the delta sync feed.
+    Recipes, tags and ingredients carry an updated_at moved by save(); the
+    receivers below also move it on recipes whose tags or ingredients
+    change, and leave a Tombstone for every deleted object. The derived
+    recipe_count of tags and ingredients does not count as a change, or
+    every link change would resend them.
+    Code deleting rows directly (core.deletion) deletes the whole user,
+    tombstones included.
+"""
+from datetime import timedelta
+
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+
+
+def touch(recipe_ids):
+    """Mark recipes as changed"""
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe._base_manager.filter(id__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch([instance.id])
+        return
+
+    # instance is a tag or ingredient, pk_set holds recipe ids
+    if action == 'pre_clear':
+        instance._sync_recipes = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        touch(instance.__dict__.pop('_sync_recipes', []))
+    elif action in ('post_add', 'post_remove'):
+        touch(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attribute_deleting(sender, instance, **kwargs):
+    """The links of a deleted tag or ingredient go without m2m_changed"""
+    instance._sync_recipes = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def object_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        kind=sender._meta.model_name,
+        object_id=instance.id,
+    )
+    touch(instance.__dict__.pop('_sync_recipes', []))
+
+
+def prune_tombstones(days):
+    """
+        Delete the tombstones older than days, returns how many. Clients
+        with an older cursor have to sync everything again.
+    """
+    deleted, _ = Tombstone.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
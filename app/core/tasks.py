@@ -0,0 +1,15 @@
+from core import deletion, provisioning
+from core.jobs import task
+
+
+@task('delete_user')
+def delete_user(user_id):
+    """Delete an account and its data, see core.deletion"""
+    return deletion.delete_user(user_id)
+
+
+@task('provision_users', finish=provisioning.remove_upload)
+def provision_users(path):
+    """Create the users of an uploaded file, see core.provisioning"""
+    created, skipped = provisioning.provision(provisioning.load_upload(path))
+    return {'created': len(created), 'skipped': skipped}
@@ -1,7 +1,14 @@
+from unittest.mock import patch
+
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
+from core.admin import BoundedCountPaginator
+from core.models import Tag, Recipe
+
 
 class AdminSiteTest(TestCase):
 
@@ -44,3 +51,75 @@ class AdminSiteTest(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='email_admin@mail.com',
+            password='user123'
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='email@mail.com',
+            password='password123'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def _queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_queries_independent_of_size(self):
+        """Test that list and change pages do not grow with the data"""
+        changelist = reverse('admin:core_recipe_changelist')
+        change = reverse('admin:core_recipe_change', args=[self.recipe.id])
+        # Warm the content type cache
+        self._queries(change)
+        before = (self._queries(changelist), self._queries(change))
+
+        for i in range(10):
+            user = get_user_model().objects.create_user(
+                email=f'user{i}@mail.com', password='password123'
+            )
+            Tag.objects.create(user=user, name=f'Tag {i}')
+            Recipe.objects.create(
+                user=user, title='Soup', time_minutes=5, price=1
+            )
+
+        self.assertEqual(
+            (self._queries(changelist), self._queries(change)), before
+        )
+
+    def test_search(self):
+        """Test searching by id, owner email and title prefix"""
+        other = Recipe.objects.create(
+            user=self.admin_user, title='Salad', time_minutes=5, price=1
+        )
+        url = reverse('admin:core_recipe_changelist')
+
+        for term, expected in ((str(other.id), [other]),
+                               ('email@mail.com', [self.recipe]),
+                               ('Sa', [other])):
+            with self.subTest(term=term):
+                res = self.client.get(url, {'q': term})
+                self.assertEqual(
+                    list(res.context['cl'].result_list), expected
+                )
+
+    def test_bounded_count(self):
+        """Test that the paginator stops counting at MAX_COUNT"""
+        for i in range(4):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        with patch.object(BoundedCountPaginator, 'MAX_COUNT', 3):
+            paginator = BoundedCountPaginator(Tag.objects.order_by('id'), 2)
+            self.assertEqual(paginator.count, 3)
+            self.assertEqual(paginator.num_pages, 2)
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+
+from core.asgi import MAX_CHUNK_BUFFER, ThreadPoolASGIHandler
+
+
+def http_scope(method='GET', path='/', query=b'', headers=()):
+    """Return an ASGI HTTP scope"""
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+def call(handler, scope, body_parts=(b'',)):
+    """Run one request through handler, return (status, headers, body)"""
+    messages = [
+        {'type': 'http.request', 'body': part,
+         'more_body': index < len(body_parts) - 1}
+        for index, part in enumerate(body_parts)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+    start = sent[0]
+    body = b''.join(m.get('body', b'') for m in sent[1:])
+    return start['status'], dict(start['headers']), body
+
+
+def echo_app(environ, start_response):
+    """WSGI app answering with the request line and body"""
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    line = f'{environ["REQUEST_METHOD"]} {environ["PATH_INFO"]}'
+    return [line.encode('latin1'), b' ', environ['QUERY_STRING'].encode(),
+            b' ', body, b' ', threading.current_thread().name.encode()]
+
+
+class ThreadPoolASGIHandlerTests(SimpleTestCase):
+
+    def test_request_translated_to_wsgi(self):
+        """Test that path, query string and chunked body reach the app"""
+        handler = ThreadPoolASGIHandler(echo_app)
+
+        status, headers, body = call(
+            handler,
+            http_scope('POST', '/api/recipe/recipes/', b'tags=1,2'),
+            [b'{"title": ', b'"Soup"}']
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'text/plain')
+        self.assertTrue(body.startswith(
+            b'POST /api/recipe/recipes/ tags=1,2 {"title": "Soup"}'
+        ))
+
+    def test_reads_and_writes_use_separate_pools(self):
+        """Test that safe requests run in the read pool"""
+        handler = ThreadPoolASGIHandler(echo_app)
+
+        _, _, read = call(handler, http_scope('GET'))
+        _, _, write = call(handler, http_scope('PATCH'))
+
+        self.assertIn(b'asgi-read', read)
+        self.assertIn(b'asgi-write', write)
+
+    def test_saturated_pool_rejects(self):
+        """Test that requests beyond max_pending get a 503"""
+        handler = ThreadPoolASGIHandler(echo_app, max_pending=0)
+
+        status, headers, _ = call(handler, http_scope('GET'))
+
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b'retry-after'], b'1')
+
+    def test_serves_django(self):
+        """Test that the Django application is served"""
+        handler = ThreadPoolASGIHandler(get_wsgi_application())
+
+        status, _, body = call(handler, http_scope('GET', '/healthz'))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'ok')
+
+    def test_response_streamed(self):
+        """Test that chunks are sent while the app still produces them"""
+        produced = []
+
+        def streaming_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            for index in range(3):
+                produced.append(index)
+                yield b'x' * MAX_CHUNK_BUFFER
+
+        handler = ThreadPoolASGIHandler(streaming_app)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message['body']:
+                sent.append(len(produced))
+
+        asyncio.run(handler(http_scope(), receive, send))
+
+        self.assertEqual(sent, [1, 2, 3])
+
+    def test_connections_released_on_each_thread(self):
+        """Test that every trip to the pool releases its connections"""
+        events = []
+
+        def streaming_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            for _ in range(3):
+                events.append(('produce', threading.current_thread()))
+                yield b'x' * MAX_CHUNK_BUFFER
+
+        def close_old_connections():
+            events.append(('release', threading.current_thread()))
+
+        handler = ThreadPoolASGIHandler(streaming_app, read_threads=4)
+        with patch('core.asgi.close_old_connections', close_old_connections):
+            status, _, body = call(handler, http_scope())
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body), 3 * MAX_CHUNK_BUFFER)
+        for index, (kind, thread) in enumerate(events):
+            if kind == 'produce':
+                self.assertEqual(events[index + 1], ('release', thread))
+        self.assertEqual(events[-1][0], 'release')
+
+    def test_pending_reserved_while_reading_body(self):
+        """Test that a request waiting for its body holds its slot"""
+        handler = ThreadPoolASGIHandler(echo_app, max_pending=1)
+        results = []
+
+        async def main():
+            first_body = asyncio.Event()
+
+            async def slow_receive():
+                await first_body.wait()
+                return {'type': 'http.request', 'body': b''}
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    results.append(message['status'])
+
+            first = asyncio.ensure_future(
+                handler(http_scope(), slow_receive, send)
+            )
+            await asyncio.sleep(0)
+            await handler(http_scope(), receive, send)
+            first_body.set()
+            await first
+
+        asyncio.run(main())
+
+        self.assertEqual(results, [503, 200])
@@ -0,0 +1,147 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core import caching
+
+
+@override_settings(QUERY_CACHE_TIMEOUT=60, QUERY_CACHE_WAIT=0.2)
+class CachingTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caching.clear()
+        self.addCleanup(caching.clear)
+
+    def counted(self, metric, **labels):
+        before = metric.value(name='test', **labels)
+        return lambda: metric.value(name='test', **labels) - before
+
+    def test_tiers(self):
+        """Test values come from memory, then the shared cache"""
+        compute = Mock(return_value=[1, 2])
+        local = self.counted(caching.LOOKUPS, result='local')
+        shared = self.counted(caching.LOOKUPS, result='shared')
+
+        for _ in range(3):
+            self.assertEqual(
+                caching.get_or_compute('test', 'key', 1, compute), [1, 2]
+            )
+        caching.clear()
+        caching.get_or_compute('test', 'key', 1, compute)
+
+        compute.assert_called_once_with()
+        self.assertEqual((local(), shared()), (2, 1))
+
+    @override_settings(QUERY_CACHE=None)
+    def test_disabled(self):
+        """Test that every lookup computes without a cache"""
+        compute = Mock(return_value=[1, 2])
+
+        for _ in range(2):
+            self.assertEqual(
+                caching.get_or_compute('test', 'key', 1, compute), [1, 2]
+            )
+
+        self.assertEqual(compute.call_count, 2)
+        self.assertIsNone(cache.get('key'))
+
+    def test_version_change(self):
+        """Test that a new data version is computed again"""
+        compute = Mock(side_effect=['old', 'new'])
+
+        caching.get_or_compute('test', 'key', 1, compute)
+        value = caching.get_or_compute('test', 'key', 2, compute)
+
+        self.assertEqual(value, 'new')
+        self.assertEqual(compute.call_count, 2)
+
+    def test_early_expiration(self):
+        """Test refreshing before expiry, more likely when slow"""
+        entry = caching.Entry(1, 'value', delta=0.5, expires=100.0)
+
+        with patch('random.random', return_value=0.5):
+            # Waits about 0.35s before expiry
+            self.assertFalse(entry.expiring(99.5))
+            self.assertTrue(entry.expiring(99.7))
+        with patch('random.random', return_value=0.0):
+            self.assertFalse(entry.expiring(99.99))
+            self.assertTrue(entry.expiring(100.0))
+
+    def _leader(self, version, value):
+        """Start computing key in another thread until released"""
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return value
+
+        thread = threading.Thread(
+            target=caching.get_or_compute,
+            args=('test', 'key', version, compute)
+        )
+        thread.start()
+        started.wait(5)
+        return release, thread
+
+    def test_followers_wait_after_version_change(self):
+        """Test that one thread computes a new version for everyone"""
+        caching.get_or_compute('test', 'key', 1, lambda: 'old')
+        waited = self.counted(caching.COALESCED, outcome='waited')
+        compute = Mock(return_value='other')
+
+        release, thread = self._leader(2, 'new')
+        threading.Timer(0.05, release.set).start()
+        value = caching.get_or_compute('test', 'key', 2, compute)
+        thread.join()
+
+        self.assertEqual(value, 'new')
+        compute.assert_not_called()
+        self.assertEqual(waited(), 1)
+
+    def test_followers_get_value_being_refreshed(self):
+        """Test that the expiring value is served during its refresh"""
+        caching.get_or_compute('test', 'key', 1, lambda: 'current')
+        stale = self.counted(caching.COALESCED, outcome='stale')
+
+        with patch.object(caching.Entry, 'expiring', return_value=True):
+            release, thread = self._leader(1, 'refreshed')
+            try:
+                value = caching.get_or_compute('test', 'key', 1, Mock())
+            finally:
+                release.set()
+                thread.join()
+
+        self.assertEqual(value, 'current')
+        self.assertEqual(stale(), 1)
+        self.assertEqual(
+            caching.get_or_compute('test', 'key', 1, Mock()), 'refreshed'
+        )
+
+    def test_other_process_computing(self):
+        """Test waiting on the shared lock of another process"""
+        cache.add('key:lock', True, 5)
+        waited = self.counted(caching.COALESCED, outcome='waited')
+
+        def other_process():
+            time.sleep(0.05)
+            cache.set('key', caching.Entry(1, 'theirs', 0.1, time.time() + 60))
+
+        threading.Thread(target=other_process).start()
+        value = caching.get_or_compute('test', 'key', 1, Mock())
+
+        self.assertEqual(value, 'theirs')
+        self.assertEqual(waited(), 1)
+
+    def test_other_process_too_slow(self):
+        """Test computing anyway when the lock is held too long"""
+        cache.add('key:lock', True, 5)
+
+        value = caching.get_or_compute('test', 'key', 1, lambda: 'mine')
+
+        self.assertEqual(value, 'mine')
+        self.assertTrue(cache.get('key:lock'))
@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -16,10 +17,10 @@ class CommandsTests(TestCase):
         Tests What happens when we call our command and the db is already
         available. Test waiting for db when db is available
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.health.check_database') as cd:
+            cd.return_value = None
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(cd.call_count, 1)
 
     @patch('time.sleep', return_value=None)
     def test_wait_for_db(self, ts):
@@ -29,7 +30,33 @@ class CommandsTests(TestCase):
         Test waiting for db
         """
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('core.health.check_database') as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cd.call_count, 6)
+
+    @patch('time.sleep', return_value=None)
+    def test_wait_for_db_backs_off(self, ts):
+        """Test that the delay between attempts doubles up to a cap"""
+        with patch('core.health.check_database') as cd:
+            cd.side_effect = [OperationalError] * 8 + [None]
+            call_command('wait_for_db')
+
+        delays = [c[0][0] for c in ts.call_args_list]
+        self.assertEqual(delays[:4], [0.1, 0.2, 0.4, 0.8])
+        self.assertEqual(max(delays), 5.0)
+
+    def test_wait_for_db_gives_up(self):
+        """Test that the command fails once the timeout is reached"""
+        with patch('core.health.check_database') as cd:
+            cd.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+    def test_wait_for_db_checks_every_database(self):
+        """Test that each configured database alias is probed"""
+        with patch('core.health.check_database') as cd:
+            call_command('wait_for_db', databases=['default', 'replica_1'])
+
+        probed = sorted(c[0][0] for c in cd.call_args_list)
+        self.assertEqual(probed, ['default', 'replica_1'])
@@ -0,0 +1,125 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import deletion
+from core.counters import refresh_recipe_counts
+from core.models import Tag, Ingredient, Recipe
+from core.relations import sync_many_to_many
+
+
+class RecipeCountTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+            for index in range(3)
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}', time_minutes=5,
+                price=1
+            )
+            for index in range(2)
+        ]
+
+    def assertCounts(self, *expected):
+        self.assertEqual(
+            [tag.recipe_count for tag in Tag.objects.order_by('id')],
+            list(expected)
+        )
+
+    def test_add_remove_clear(self):
+        """Test that the counts follow add(), remove() and clear()"""
+        first, second = self.recipes
+        first.tags.add(*self.tags[:2])
+        second.tags.add(self.tags[0])
+        second.tags.add(self.tags[0])
+        self.assertCounts(2, 1, 0)
+
+        first.tags.remove(self.tags[0], self.tags[2])
+        self.assertCounts(1, 1, 0)
+
+        first.tags.clear()
+        self.assertCounts(1, 0, 0)
+
+    def test_reverse_side(self):
+        """Test that changes made from the tag side are counted"""
+        tag = self.tags[0]
+        tag.recipe_set.add(*self.recipes)
+        self.assertCounts(2, 0, 0)
+
+        tag.recipe_set.remove(self.recipes[0])
+        self.assertCounts(1, 0, 0)
+
+        tag.recipe_set.clear()
+        self.assertCounts(0, 0, 0)
+
+    def test_set_and_sync(self):
+        """Test that set() and the diff-based sync are counted"""
+        first = self.recipes[0]
+        first.tags.set(self.tags[:2])
+        sync_many_to_many(first, 'tags', self.tags[1:])
+
+        self.assertCounts(0, 1, 1)
+
+    def test_recipe_deleted(self):
+        """Test that deleting a recipe releases its tags and ingredients"""
+        for recipe in self.recipes:
+            recipe.tags.add(self.tags[0])
+            recipe.ingredients.add(self.ingredient)
+
+        self.recipes[0].delete()
+
+        self.assertCounts(1, 0, 0)
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.ingredient.recipe_count, 1)
+
+    def test_deleting_user_updates_linked_tags_of_others(self):
+        """Test that the batched deletion recounts other users' tags"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        foreign = Recipe.objects.create(
+            user=other, title='Foreign', time_minutes=5, price=1
+        )
+        foreign.tags.add(self.tags[0])
+        other_tag = Tag.objects.create(user=other, name='Other')
+        self.recipes[0].tags.add(other_tag)
+
+        deletion.delete_user(self.user.id)
+
+        other_tag.refresh_from_db()
+        self.assertEqual(other_tag.recipe_count, 0)
+
+    def test_repair(self):
+        """Test that counts broken by direct writes are recomputed"""
+        self.recipes[0].tags.add(self.tags[0])
+        self.recipes[1].tags.add(self.tags[0])
+        Tag.objects.update(recipe_count=7)
+
+        self.assertEqual(refresh_recipe_counts(Tag.objects.all()), 3)
+        self.assertCounts(2, 0, 0)
+
+    def test_repair_command(self):
+        """Test that the command recounts in batches"""
+        self.recipes[0].ingredients.add(self.ingredient)
+        Tag.objects.update(recipe_count=7)
+        Ingredient.objects.update(recipe_count=7)
+
+        call_command(
+            'repair_recipe_counts', '--batch-size', '2',
+            stdout=io.StringIO()
+        )
+
+        self.assertCounts(0, 0, 0)
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.ingredient.recipe_count, 1)
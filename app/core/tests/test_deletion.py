@@ -0,0 +1,83 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core import deletion
+from core.models import Tag, Ingredient, Recipe
+
+
+class DeleteUserTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        Token.objects.create(user=self.user)
+        for user in (self.user, self.other):
+            tag = Tag.objects.create(user=user, name='Vegan')
+            ingredient = Ingredient.objects.create(user=user, name='Salt')
+            for index in range(5):
+                recipe = Recipe.objects.create(
+                    user=user, title=f'Recipe {index}', time_minutes=5,
+                    price=1
+                )
+                recipe.tags.add(tag)
+                recipe.ingredients.add(ingredient)
+
+        self.recipe = Recipe.objects.filter(user=self.user).first()
+        self.recipe.image.save('image.jpg', ContentFile(b'jpeg'))
+        self.image_path = self.recipe.image.path
+
+    def test_delete_user(self):
+        """Test that the user and their data go, other users' data stays"""
+        deleted = deletion.delete_user(self.user.id, batch_size=2)
+
+        self.assertEqual(deleted, {
+            'recipes': 5, 'tags': 1, 'ingredients': 1, 'users': 1,
+        })
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertFalse(Token.objects.exists())
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 5)
+        self.assertEqual(Recipe.tags.through.objects.count(), 5)
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertFalse(os.path.exists(self.image_path))
+
+    def test_resume(self):
+        """Test that a run over partly deleted data finishes the job"""
+        os.remove(self.image_path)
+        Recipe.objects.filter(user=self.user).exclude(
+            id=self.recipe.id
+        ).delete()
+
+        deleted = deletion.delete_user(self.user.id)
+
+        self.assertEqual(deleted['recipes'], 1)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_command(self):
+        """Test that the command accepts emails"""
+        out = io.StringIO()
+
+        call_command('delete_user', 'test@mail.com', stdout=out)
+
+        self.assertIn('5 recipes', out.getvalue())
+        self.assertEqual(get_user_model().objects.count(), 1)
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+HEALTHZ_URL = reverse('healthz')
+METRICS_URL = reverse('metrics')
+READYZ_URL = reverse('readyz')
+
+
+class HealthEndpointsTests(TestCase):
+
+    def test_healthz(self):
+        """Test that the liveness probe always answers"""
+        res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz_ready(self):
+        """Test that the readiness probe passes with a migrated database"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.json()['ready'])
+        self.assertEqual(res.json()['checks']['database:default'], 'ok')
+
+    @patch('core.health.check_database')
+    def test_readyz_database_down(self, cd):
+        """Test that the readiness probe fails when a database is down"""
+        cd.side_effect = OperationalError('connection refused')
+
+        with self.assertLogs('core.views', 'WARNING') as logs:
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(
+            res.json()['checks']['database:default'], 'failing'
+        )
+        self.assertIn('connection refused', logs.output[0])
+
+    @override_settings(METRICS_TOKEN='secret')
+    @patch('core.health.check_database')
+    def test_readyz_details_with_token(self, cd):
+        """Test that the errors are only shown with the metrics token"""
+        cd.side_effect = OperationalError('connection refused')
+
+        with self.assertLogs('core.views', 'WARNING'):
+            anonymous = self.client.get(READYZ_URL)
+            res = self.client.get(
+                READYZ_URL, HTTP_AUTHORIZATION='Bearer secret'
+            )
+
+        self.assertEqual(
+            anonymous.json()['checks']['database:default'], 'failing'
+        )
+        self.assertEqual(
+            res.json()['checks']['database:default'], 'connection refused'
+        )
+
+    @patch('core.health.check_media_writable')
+    def test_readyz_media_not_writable(self, cmw):
+        """Test that the readiness probe fails on a read only media volume"""
+        cmw.side_effect = PermissionError('read-only file system')
+
+        with self.assertLogs('core.views', 'WARNING'):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertFalse(res.json()['ready'])
+
+
+class MetricsEndpointTests(TestCase):
+
+    @override_settings(METRICS_TOKEN='')
+    def test_closed_without_token_setting(self):
+        """Test that metrics are not public when no token is set"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        """Test that only the scraper with the token gets the metrics"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 403)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'# TYPE', res.content)
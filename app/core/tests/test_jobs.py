@@ -0,0 +1,145 @@
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+
+@jobs.task('test_add')
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@jobs.task('test_fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+finished = []
+
+
+@jobs.task('test_finish', finish=lambda a: finished.append(a))
+def fail_with(a):
+    raise RuntimeError(a)
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        finished.clear()
+
+    def test_enqueue_unknown_task(self):
+        """Test that only registered tasks can be queued"""
+        with self.assertRaises(KeyError):
+            jobs.enqueue('missing')
+
+    def test_claim_and_run(self):
+        """Test that a due job is claimed, run and its result stored"""
+        job = jobs.enqueue('test_add', a=1, b=2)
+
+        claimed = jobs.claim()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertIsNone(jobs.claim())
+
+        jobs.run(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, '3')
+        self.assertEqual(calls, [(1, 2)])
+
+    def test_finish_after_last_attempt(self):
+        """Test that finish runs once the job has failed for good"""
+        job = jobs.enqueue('test_finish', max_attempts=2, a='file')
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim())
+        self.assertEqual(finished, [])
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.claim()
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=2)
+        )
+        self.assertEqual(jobs.requeue_stale(3600), 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(finished, ['file'])
+
+    def test_delayed_job_not_claimed(self):
+        """Test that jobs are only claimed once they are due"""
+        jobs.enqueue('test_add', delay=60, a=1, b=2)
+
+        self.assertIsNone(jobs.claim())
+
+    def test_retry_with_backoff(self):
+        """Test that failed jobs are retried later, then marked failed"""
+        job = jobs.enqueue('test_fail', max_attempts=2)
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_grows(self):
+        """Test that the retry delay doubles up to the cap"""
+        with patch('core.jobs.random.uniform', return_value=0):
+            self.assertEqual(jobs.backoff(1), 1)
+            self.assertEqual(jobs.backoff(3), 4)
+            self.assertEqual(jobs.backoff(20), 300)
+
+    def test_requeue_stale(self):
+        """Test that jobs of dead workers are queued again"""
+        job = jobs.enqueue('test_add', a=1, b=2)
+        jobs.claim()
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=2)
+        )
+
+        self.assertEqual(jobs.requeue_stale(3600), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+
+class RunWorkerTests(TransactionTestCase):
+
+    def test_run_worker_once(self):
+        """Test that the worker drains the queue and exits"""
+        user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        job = jobs.enqueue('delete_user', user=user, user_id=user.id)
+
+        call_command(
+            'run_worker', '--once', '--concurrency', '2',
+            stdout=io.StringIO()
+        )
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNone(job.user)
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,131 @@
+import gzip
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import middleware
+from core.db.pool import PoolTimeout
+from core.metrics import registry
+
+
+JSON_BODY = b'{"title": "Sample recipe", "price": "5.00"}' * 100
+
+
+def get_response_for(response):
+    """Return a get_response callable that always returns response"""
+    return lambda request: response
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, path='/api/recipe/recipes/', accept='gzip'):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept)
+        mw = middleware.CompressionMiddleware(get_response_for(response))
+        return mw(request)
+
+    def test_compresses_large_json(self):
+        """Test that a large JSON body is gzipped"""
+        res = self.process(
+            HttpResponse(JSON_BODY, content_type='application/json')
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), JSON_BODY)
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    @override_settings(COMPRESSION_MIN_SIZE=100000)
+    def test_small_body_not_compressed(self):
+        """Test that bodies below the threshold are left alone"""
+        res = self.process(
+            HttpResponse(JSON_BODY, content_type='application/json')
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, JSON_BODY)
+
+    def test_negotiates_q_values(self):
+        """Test that a coding refused with q=0 is not used"""
+        res = self.process(
+            HttpResponse(JSON_BODY, content_type='application/json'),
+            accept='gzip;q=0, deflate'
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(res.content), JSON_BODY)
+
+    def test_no_acceptable_encoding(self):
+        """Test that the body is untouched if the client accepts nothing"""
+        res = self.process(
+            HttpResponse(JSON_BODY, content_type='application/json'),
+            accept='br'
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_images_not_compressed(self):
+        """Test that images and media files are never compressed"""
+        image = self.process(
+            HttpResponse(JSON_BODY, content_type='image/jpeg'),
+            path='/api/recipe/recipes/1/'
+        )
+        media = self.process(
+            HttpResponse(JSON_BODY, content_type='text/plain'),
+            path='/media/uploads/recipe/file.txt'
+        )
+
+        self.assertFalse(image.has_header('Content-Encoding'))
+        self.assertFalse(media.has_header('Content-Encoding'))
+
+    def test_streaming_compressed_incrementally(self):
+        """Test that each streamed chunk is flushed as it is produced"""
+        chunks = [JSON_BODY, JSON_BODY, JSON_BODY]
+        res = self.process(
+            StreamingHttpResponse(iter(chunks), content_type='text/csv')
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        parts = list(res.streaming_content)
+        self.assertGreaterEqual(len(parts), len(chunks))
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+    def test_metrics_recorded(self):
+        """Test that bytes saved and CPU time are exposed as metrics"""
+        bytes_in = middleware.COMPRESSION_BYTES_IN.value()
+        bytes_out = middleware.COMPRESSION_BYTES_OUT.value()
+
+        res = self.process(
+            HttpResponse(JSON_BODY, content_type='application/json')
+        )
+
+        self.assertEqual(
+            middleware.COMPRESSION_BYTES_IN.value() - bytes_in,
+            len(JSON_BODY)
+        )
+        self.assertEqual(
+            middleware.COMPRESSION_BYTES_OUT.value() - bytes_out,
+            len(res.content)
+        )
+        self.assertIn('http_compression_cpu_seconds_total', registry.render())
+
+
+class PoolTimeoutMiddlewareTests(SimpleTestCase):
+
+    def test_pool_timeout_answers_503(self):
+        """Test that waiting too long for a connection is a 503"""
+        request = RequestFactory().get('/api/recipe/recipes/')
+        mw = middleware.PoolTimeoutMiddleware(
+            get_response_for(HttpResponse())
+        )
+
+        res = mw.process_exception(request, PoolTimeout('pool exhausted'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertIsNone(mw.process_exception(request, ValueError()))
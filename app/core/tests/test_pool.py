@@ -0,0 +1,119 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout, POOL_IDLE, POOL_IN_USE
+
+
+class FakeConnection:
+    """Stand in for a driver connection"""
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(conn):
+    return not conn.broken
+
+
+def reset(conn):
+    if conn.broken:
+        raise RuntimeError('connection lost')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool(
+            connect, check=check, reset=reset, max_size=2, timeout=0.05,
+            name='test'
+        )
+
+    def test_connections_are_reused(self):
+        """Test that a released connection is handed out again"""
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+
+        self.assertIs(self.pool.acquire(), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_pool_size_is_bounded(self):
+        """Test that checkouts time out once max_size are in use"""
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+
+    def test_waiting_checkout_gets_released_connection(self):
+        """Test that a blocked checkout wakes up when one is released"""
+        self.pool.timeout = 5
+        first = self.pool.acquire()
+        self.pool.acquire()
+        timer = threading.Timer(0.05, self.pool.release, [first])
+        timer.start()
+
+        self.assertIs(self.pool.acquire(), first)
+        timer.join()
+
+    def test_broken_connection_recycled_on_checkout(self):
+        """Test that a connection failing the liveness check is replaced"""
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        conn.broken = True
+
+        new_conn = self.pool.acquire()
+
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(len(self.opened), 2)
+
+    def test_broken_connection_dropped_on_release(self):
+        """Test that a connection that cannot be reset is not pooled"""
+        conn = self.pool.acquire()
+        conn.broken = True
+        self.pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.idle, 0)
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_old_connections_recycled(self):
+        """Test that connections older than max_age are closed"""
+        self.pool.max_age = 0
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.idle, 0)
+
+    def test_failed_connect_frees_slot(self):
+        """Test that a failing connect does not leak pool capacity"""
+        def connect():
+            raise RuntimeError('database down')
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                pool.acquire()
+
+    def test_gauges(self):
+        """Test that idle and in use gauges follow the pool"""
+        conn = self.pool.acquire()
+        self.assertEqual(POOL_IN_USE.value(pool='test'), 1)
+        self.assertEqual(POOL_IDLE.value(pool='test'), 0)
+
+        self.pool.release(conn)
+        self.assertEqual(POOL_IN_USE.value(pool='test'), 0)
+        self.assertEqual(POOL_IDLE.value(pool='test'), 1)
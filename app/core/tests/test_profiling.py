@@ -0,0 +1,83 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import caching, versioning
+from core.models import Tag, Recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def parse_server_timing(header):
+    """Return a dict of metric name to duration in milliseconds"""
+    timings = {}
+    for metric in header.split(','):
+        name, *params = [part.strip() for part in metric.split(';')]
+        for param in params:
+            if param.startswith('dur='):
+                timings[name] = float(param[4:])
+    return timings
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caching.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        """Test that unsampled requests carry no Server-Timing header"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_server_timing_header(self):
+        """Test that a sampled request reports its phases"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            res = self.client.get(TAGS_URL)
+
+        timings = parse_server_timing(res['Server-Timing'])
+        self.assertEqual(
+            set(timings), {'sql', 'sql-max', 'serialize', 'render', 'total'}
+        )
+        self.assertGreater(timings['render'], 0)
+        self.assertGreaterEqual(timings['total'], timings['sql'])
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['path'], TAGS_URL)
+        self.assertEqual(line['status'], 200)
+        self.assertGreaterEqual(line['queries'], 1)
+        self.assertIn('core_tag', line['slowest_sql'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_counts_queries(self):
+        """Test that every query of the request is counted"""
+        for title in ('Soup', 'Stew', 'Salad'):
+            Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=5
+            )
+        versioning.get_version(self.user.id)
+
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        line = json.loads(logs.records[0].getMessage())
+        # The data version, the recipes, their tags and their ingredients
+        self.assertEqual(line['queries'], 4)
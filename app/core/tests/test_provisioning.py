@@ -0,0 +1,137 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from core import provisioning
+
+
+def lines(*rows):
+    return ['email,password,name'] + list(rows)
+
+
+class ProvisioningTests(TestCase):
+
+    def test_read_users(self):
+        """Test that rows are read with normalized emails"""
+        users = provisioning.read_users(lines(
+            'ana@Mail.COM,secret,Ana', 'bob@mail.com,secret,'
+        ))
+
+        self.assertEqual(users, [
+            ('ana@mail.com', 'Ana', 'secret'),
+            ('bob@mail.com', '', 'secret'),
+        ])
+
+    def test_read_users_invalid(self):
+        """Test that every bad line is reported"""
+        with self.assertRaises(provisioning.ProvisioningError) as raised:
+            provisioning.read_users(lines(
+                'ana@mail.com,secret,', 'not an email,secret,',
+                'ana@mail.com,secret,', 'bob@mail.com,ab,'
+            ))
+
+        self.assertEqual(raised.exception.errors, [
+            'Line 3: invalid email',
+            'Line 4: duplicate email ana@mail.com',
+            'Line 5: password too short',
+        ])
+
+    def test_read_users_limits(self):
+        """Test the header and the row limit"""
+        with self.assertRaises(provisioning.ProvisioningError):
+            provisioning.read_users(['email,name', 'ana@mail.com,Ana'])
+        with self.assertRaises(provisioning.ProvisioningError):
+            provisioning.read_users(
+                lines('ana@mail.com,secret,', 'bob@mail.com,secret,'),
+                max_rows=1
+            )
+
+    def test_hash_passwords_pool(self):
+        """Test hashing the passwords in worker processes"""
+        hashes = provisioning.hash_passwords(['one', 'two', 'three'], 2)
+
+        user = get_user_model()(password=hashes[1])
+        self.assertTrue(user.check_password('two'))
+        self.assertEqual(len(set(hashes)), 3)
+
+    def test_upload_round_trip(self):
+        """Test saved uploads are private and read back as they were"""
+        users = [('ana@mail.com', 'Ana, Jr', 'sec"ret'),
+                 ('bob@mail.com', '', 'other')]
+        with tempfile.TemporaryDirectory() as upload_dir, \
+                override_settings(PROVISION_UPLOAD_DIR=upload_dir):
+            path = provisioning.save_upload(users)
+
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            self.assertEqual(provisioning.load_upload(path), users)
+            provisioning.remove_upload(path)
+            self.assertFalse(os.path.exists(path))
+            provisioning.remove_upload(path)
+
+    @patch('core.provisioning.hash_passwords',
+           side_effect=lambda passwords, workers: [
+               f'hash:{password}' for password in passwords
+           ])
+    def test_provision(self, hash_passwords):
+        """Test taken emails are skipped and the rest inserted in batches"""
+        get_user_model().objects.create_user('bob@mail.com', 'secret')
+        users = [(f'user{i}@mail.com', '', f'password{i}') for i in range(5)]
+        users.append(('bob@mail.com', '', 'other'))
+
+        with CaptureQueriesContext(connection) as queries:
+            created, skipped = provisioning.provision(users, batch_size=2)
+
+        self.assertEqual(len(created), 5)
+        self.assertEqual(skipped, ['bob@mail.com'])
+        hash_passwords.assert_called_once_with(
+            [f'password{i}' for i in range(5)], None
+        )
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            get_user_model().objects.get(email='user3@mail.com').password,
+            'hash:password3'
+        )
+
+    def test_provision_signup_race(self):
+        """Test emails taken after the check are skipped, not an error"""
+        def hash_passwords(passwords, workers):
+            get_user_model().objects.create_user('user1@mail.com', 'secret')
+            return [f'hash:{password}' for password in passwords]
+        users = [(f'user{i}@mail.com', '', f'password{i}') for i in range(4)]
+
+        with patch('core.provisioning.hash_passwords', hash_passwords):
+            created, skipped = provisioning.provision(users, batch_size=2)
+
+        self.assertEqual(
+            created, ['user0@mail.com', 'user2@mail.com', 'user3@mail.com']
+        )
+        self.assertEqual(skipped, ['user1@mail.com'])
+        self.assertEqual(
+            get_user_model().objects.get(email='user0@mail.com').password,
+            'hash:password0'
+        )
+
+    def test_command(self):
+        """Test the provision_users command"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv',
+                                         delete=False) as csv_file:
+            csv_file.write('\n'.join(lines('ana@mail.com,secret,Ana')))
+        self.addCleanup(os.remove, csv_file.name)
+
+        call_command('provision_users', csv_file.name, workers=1)
+        user = get_user_model().objects.get(email='ana@mail.com')
+        self.assertEqual(user.name, 'Ana')
+        self.assertTrue(user.check_password('secret'))
+
+        with open(csv_file.name, 'a') as extra:
+            extra.write('\nbad,secret,')
+        with self.assertRaises(CommandError):
+            call_command('provision_users', csv_file.name, workers=1)
@@ -0,0 +1,160 @@
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import m2m_changed
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Recipe
+from core.relations import UserPrimaryKeyRelatedField, sync_many_to_many
+
+
+class TagsSerializer(serializers.Serializer):
+    tags = UserPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+
+
+class SyncManyToManyTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+            for index in range(3)
+        ]
+        self.signals = []
+        m2m_changed.connect(self._record, sender=Recipe.tags.through)
+        self.addCleanup(
+            m2m_changed.disconnect, self._record, sender=Recipe.tags.through
+        )
+
+    def _record(self, action, pk_set, **kwargs):
+        self.signals.append((action, pk_set))
+
+    def test_unchanged_links_are_not_written(self):
+        """Test that matching links cost a single read"""
+        self.recipe.tags.set(self.tags[:2])
+        self.signals.clear()
+
+        with self.assertNumQueries(1):
+            sync_many_to_many(self.recipe, 'tags', self.tags[:2])
+
+        self.assertEqual(self.signals, [])
+
+    def test_links_replaced(self):
+        """
+            Test that changes take one read, one delete and one insert on
+            the through table, the signal receivers add their own queries
+        """
+        self.recipe.tags.set(self.tags[:2])
+        self.signals.clear()
+
+        # The similarity receiver reads the through table back
+        with patch('core.similarity.update_signatures'), \
+                CaptureQueriesContext(connection) as queries:
+            sync_many_to_many(
+                self.recipe, 'tags', [self.tags[1], self.tags[2]]
+            )
+
+        through_queries = [
+            query['sql'].split()[0] for query in queries
+            if re.search(r'(FROM|INTO) "core_recipe_tags"', query['sql'])
+        ]
+        self.assertEqual(through_queries, ['SELECT', 'DELETE', 'INSERT'])
+
+        self.assertEqual(
+            set(self.recipe.tags.all()), {self.tags[1], self.tags[2]}
+        )
+        self.assertEqual(self.signals, [
+            ('pre_remove', {self.tags[0].id}),
+            ('post_remove', {self.tags[0].id}),
+            ('pre_add', {self.tags[2].id}),
+            ('post_add', {self.tags[2].id}),
+        ])
+
+    def test_links_cleared(self):
+        """Test that an empty list removes every link"""
+        self.recipe.tags.set(self.tags)
+
+        sync_many_to_many(self.recipe, 'tags', [])
+
+        self.assertFalse(self.recipe.tags.exists())
+
+    def test_prefetch_cache_refreshed(self):
+        """Test that prefetched links are not served stale"""
+        recipe = Recipe.objects.prefetch_related('tags').get(
+            id=self.recipe.id
+        )
+
+        sync_many_to_many(recipe, 'tags', [self.tags[0]])
+
+        self.assertEqual(list(recipe.tags.all()), [self.tags[0]])
+
+
+class UserPrimaryKeyRelatedFieldTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {index}')
+            for index in range(3)
+        ]
+        self.foreign_tag = Tag.objects.create(user=self.other, name='Other')
+        self.request = APIRequestFactory().post('/')
+        self.request.user = self.user
+
+    def _serializer(self, tags):
+        return TagsSerializer(
+            data={'tags': tags}, context={'request': self.request}
+        )
+
+    def test_validated_in_one_query(self):
+        """Test that all ids are fetched with one query, in order"""
+        ids = [self.tags[2].id, self.tags[0].id, self.tags[2].id]
+        serializer = self._serializer(ids)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(
+            serializer.validated_data['tags'], [self.tags[2], self.tags[0]]
+        )
+
+    def test_other_users_objects_rejected(self):
+        """Test that another user's objects are reported as unknown"""
+        serializer = self._serializer(
+            [self.tags[0].id, self.foreign_tag.id, 9999]
+        )
+
+        self.assertFalse(serializer.is_valid())
+        error = str(serializer.errors['tags'][0])
+        self.assertIn(f'"{self.foreign_tag.id}"', error)
+        self.assertIn('"9999"', error)
+        self.assertNotIn(f'"{self.tags[0].id}"', error)
+
+    def test_incorrect_type(self):
+        """Test that ids which are not pks are rejected"""
+        serializer = self._serializer(['abc'])
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('Incorrect type', str(serializer.errors['tags'][0]))
+
+    def test_anonymous_request(self):
+        """Test that nothing is accepted without an authenticated user"""
+        self.request.user = None
+        serializer = self._serializer([self.tags[0].id])
+
+        self.assertFalse(serializer.is_valid())
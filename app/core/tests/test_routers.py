@@ -0,0 +1,174 @@
+import random
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.utils import InterfaceError, OperationalError
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+REPLICAS = {'replica_1': 3, 'replica_2': 1}
+
+
+def db_error(pgcode, error_class=OperationalError):
+    """Return error_class as django raises it for a psycopg2 error"""
+    cause = Exception('database error')
+    cause.pgcode = pgcode
+    error = error_class('database error')
+    error.__cause__ = cause
+    return error
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaSelectionTests(SimpleTestCase):
+
+    def tearDown(self):
+        routers._down_until.clear()
+        routers.use_replica(None)
+
+    def test_selection_is_weighted(self):
+        """Test that replicas are picked in proportion to their weight"""
+        rng = random.Random(42)
+        picks = [routers.choose_replica(rng) for _ in range(4000)]
+
+        share = picks.count('replica_1') / len(picks)
+        self.assertAlmostEqual(share, 0.75, delta=0.05)
+
+    def test_down_replica_skipped(self):
+        """Test that a replica marked down is not picked"""
+        routers.mark_down('replica_1')
+
+        picks = {routers.choose_replica() for _ in range(50)}
+
+        self.assertEqual(picks, {'replica_2'})
+
+    def test_replica_comes_back(self):
+        """Test that a replica is used again after its cool down"""
+        routers.mark_down('replica_1', seconds=0)
+
+        self.assertTrue(routers.is_healthy('replica_1'))
+
+    def test_no_healthy_replica_reads_primary(self):
+        """Test that reads fall back to the primary"""
+        routers.mark_down('replica_1')
+        routers.mark_down('replica_2')
+
+        self.assertIsNone(routers.choose_replica())
+
+    def test_router_follows_thread_state(self):
+        """Test that only reads of a thread using a replica are routed"""
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+
+        routers.use_replica('replica_2')
+
+        self.assertEqual(router.db_for_read(Tag), 'replica_2')
+        self.assertEqual(router.db_for_write(Tag), 'default')
+        self.assertFalse(router.allow_migrate('replica_2', 'core'))
+
+    def test_is_connection_error(self):
+        """Test telling unreachable databases from failed queries"""
+        self.assertTrue(routers.is_connection_error(db_error(None)))
+        self.assertTrue(routers.is_connection_error(db_error('08006')))
+        self.assertTrue(routers.is_connection_error(
+            db_error(None, InterfaceError)
+        ))
+        self.assertFalse(routers.is_connection_error(db_error('57014')))
+        self.assertFalse(routers.is_connection_error(ValueError()))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaReadMixinTests(TestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        routers._down_until.clear()
+
+    @patch('core.db.routers.choose_replica', return_value=None)
+    def test_safe_request_uses_replica(self, choose):
+        """Test that a GET picks a replica and resets afterwards"""
+        self.client.get(TAGS_URL)
+
+        choose.assert_called_once()
+        self.assertIsNone(routers.current_replica())
+
+    @patch('core.db.routers.choose_replica', return_value=None)
+    def test_write_pins_user_to_primary(self, choose):
+        """Test that reads following a write stay on the primary"""
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.client.get(TAGS_URL)
+
+        self.assertTrue(routers.is_pinned(self.user.pk))
+        choose.assert_not_called()
+
+    def test_failing_replica_retried_on_primary(self):
+        """Test that a replica error marks it down and reads the primary"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        real_router = routers.ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            if routers.current_replica() == 'replica_1':
+                raise OperationalError('replica down')
+            return real_router(router, model, **hints)
+
+        with patch('core.db.routers.choose_replica',
+                   side_effect=['replica_1', 'replica_2']) as choose, \
+                patch.object(routers.ReplicaRouter, 'db_for_read',
+                             db_for_read):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 1)
+        self.assertFalse(routers.is_healthy('replica_1'))
+        # The retry reads the primary, not another replica
+        choose.assert_called_once()
+
+    @patch('core.db.routers.choose_replica', return_value='replica_1')
+    def test_query_error_not_retried(self, choose):
+        """Test that a failed query does not take the replica down"""
+        with patch.object(routers.ReplicaRouter, 'db_for_read',
+                          side_effect=db_error('57014')):
+            with self.assertRaises(OperationalError):
+                self.client.get(TAGS_URL)
+
+        self.assertTrue(routers.is_healthy('replica_1'))
+
+    @patch('core.db.routers.choose_replica', return_value=None)
+    def test_pin_cookie(self, choose):
+        """Test that the pin holds in a process that did not see the write"""
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertIn('primary_pin', res.cookies)
+        caches['shared'].clear()
+
+        self.client.get(TAGS_URL)
+
+        choose.assert_not_called()
+
+    @patch('core.db.routers.choose_replica', return_value=None)
+    def test_pin_cookie_of_other_user_ignored(self, choose):
+        """Test that a pin cookie only pins the user it was issued to"""
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        caches['shared'].clear()
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'password123'
+        )
+        self.client.force_authenticate(other)
+
+        self.client.get(TAGS_URL)
+
+        choose.assert_called_once()
@@ -0,0 +1,107 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core import seeding
+from core.models import Tag, Ingredient, Recipe
+
+
+class SeedingTests(TestCase):
+
+    def test_seed(self):
+        """Test that the dataset is created and skewed to the busiest user"""
+        created = seeding.seed(users=5, recipes=50, tags=4, ingredients=6)
+
+        self.assertEqual(created['recipes'], 50)
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(Tag.objects.count(), 20)
+        self.assertEqual(Ingredient.objects.count(), 30)
+        self.assertEqual(Recipe.objects.count(), 50)
+        busiest = get_user_model().objects.get(id=created['busiest_user'])
+        counts = [
+            Recipe.objects.filter(user=user).count()
+            for user in get_user_model().objects.all()
+        ]
+        self.assertEqual(busiest.recipe_set.count(), max(counts))
+        self.assertTrue(busiest.check_password(seeding.PASSWORD))
+
+    def test_links_stay_with_owner(self):
+        """Test that recipes only link tags and ingredients of their user"""
+        seeding.seed(users=3, recipes=20, tags=3, ingredients=3)
+
+        for recipe in Recipe.objects.prefetch_related('tags', 'ingredients'):
+            self.assertTrue(recipe.tags.all())
+            self.assertTrue(recipe.ingredients.all())
+            for obj in [*recipe.tags.all(), *recipe.ingredients.all()]:
+                self.assertEqual(obj.user_id, recipe.user_id)
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+
+    def test_deterministic(self):
+        """Test that the same seed creates the same data"""
+        def snapshot():
+            return list(Recipe.objects.order_by('id').values_list(
+                'user_id', 'title', 'time_minutes', 'price'
+            ))
+
+        seeding.seed(users=3, recipes=10, tags=2, ingredients=2, seed=7)
+        first = snapshot()
+        Recipe.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        seeding.seed(users=3, recipes=10, tags=2, ingredients=2, seed=7)
+        second = snapshot()
+
+        offset = second[0][0] - first[0][0]
+        self.assertEqual(
+            [(user + offset, *rest) for user, *rest in first],
+            second
+        )
+
+    def test_seed_appends(self):
+        """Test that seeding twice keeps the existing rows"""
+        seeding.seed(users=2, recipes=5, tags=1, ingredients=1)
+        seeding.seed(users=2, recipes=5, tags=1, ingredients=1)
+
+        self.assertEqual(get_user_model().objects.count(), 4)
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_seed_empty(self):
+        """Test that seeding no users or no recipes creates no recipes"""
+        created = seeding.seed(users=0, recipes=10, tags=2, ingredients=2)
+
+        self.assertEqual(created['recipes'], 0)
+        self.assertIsNone(created['busiest_user'])
+
+        created = seeding.seed(users=3, recipes=0, tags=2, ingredients=2)
+
+        self.assertEqual(created['recipes'], 0)
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_load_by_field_name(self):
+        """Test that rows are loaded by name and missing fields defaulted"""
+        user = get_user_model().objects.create_user('test@mail.com', 'pass')
+
+        seeding.load(connection, Tag, [
+            {'updated_at': timezone.now(), 'user_id': user.id, 'name': 'A'},
+        ], with_pk=False)
+
+        tag = Tag.objects.get()
+        self.assertEqual((tag.name, tag.user, tag.recipe_count),
+                         ('A', user, 0))
+
+    def test_seed_command(self):
+        """Test that the command overrides the preset counts"""
+        call_command(
+            'seed', '--users', '3', '--recipes', '12', '--tags', '2',
+            '--ingredients', '2', stdout=io.StringIO()
+        )
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
@@ -0,0 +1,151 @@
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import similarity
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeBucket, RecipeSignature,
+)
+
+
+class MinHashTests(TestCase):
+
+    def test_estimate_close_to_jaccard(self):
+        """Test that signatures estimate the Jaccard similarity"""
+        ids, signatures = similarity.compute(
+            [1] * 100 + [2] * 100, list(range(100)) + list(range(50, 150))
+        )
+
+        self.assertEqual(ids.tolist(), [1, 2])
+        self.assertEqual(signatures.shape, (2, similarity.NUM_PERM))
+        estimate = similarity.estimate(signatures[0], signatures[1:])[0]
+        # 50 shared out of 150
+        self.assertAlmostEqual(estimate, 1 / 3, delta=0.15)
+
+    def test_same_set_same_buckets(self):
+        """Test that equal sets get equal signatures in any order"""
+        _, signatures = similarity.compute([1, 1, 1, 2, 2, 2],
+                                           [3, 5, 8, 8, 3, 5])
+
+        np.testing.assert_array_equal(signatures[0], signatures[1])
+        buckets = similarity.band_buckets(signatures)
+        self.assertEqual(buckets.shape, (2, similarity.BANDS))
+        np.testing.assert_array_equal(buckets[0], buckets[1])
+        self.assertTrue((buckets >= 0).all())
+
+
+class SignatureTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(4)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(6)
+        ]
+
+    def _recipe(self, tags, ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        recipe.tags.set(self.tags[:tags])
+        recipe.ingredients.set(self.ingredients[:ingredients])
+        return recipe
+
+    def _signature(self, recipe):
+        stored = RecipeSignature.objects.filter(recipe=recipe).first()
+        return stored and bytes(stored.signature)
+
+    def test_updated_on_link_changes(self):
+        """Test that the signature follows the links from either side"""
+        recipe = self._recipe(2, 3)
+        first = self._signature(recipe)
+        self.assertIsNotNone(first)
+        self.assertEqual(
+            RecipeBucket.objects.filter(recipe=recipe).count(),
+            similarity.BANDS
+        )
+
+        self.ingredients[5].recipe_set.add(recipe)
+        second = self._signature(recipe)
+        self.assertNotEqual(first, second)
+
+        self.ingredients[5].recipe_set.clear()
+        self.assertEqual(self._signature(recipe), first)
+
+        self.tags[1].delete()
+        self.assertNotEqual(self._signature(recipe), first)
+
+        recipe.tags.clear()
+        recipe.ingredients.clear()
+        self.assertIsNone(self._signature(recipe))
+        self.assertFalse(RecipeBucket.objects.filter(recipe=recipe).exists())
+
+    def test_similar(self):
+        """Test that recipes are ranked by similarity"""
+        recipe = self._recipe(4, 6)
+        close = self._recipe(4, 5)
+        further = self._recipe(2, 2)
+        self._recipe(0, 0)
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        copy = Recipe.objects.create(
+            user=other, title='Soup', time_minutes=5, price=1
+        )
+        copy.tags.set(self.tags)
+        copy.ingredients.set(self.ingredients)
+
+        matches = similarity.similar(recipe, k=5)
+
+        self.assertEqual(matches[0][0], close.id)
+        self.assertGreater(matches[0][1], 0.6)
+        self.assertNotIn(copy.id, [recipe_id for recipe_id, _ in matches])
+        self.assertLessEqual(
+            {recipe_id for recipe_id, _ in matches}, {close.id, further.id}
+        )
+
+    def test_missing_signature_computed_on_lookup(self):
+        """Test that a recipe loaded without signals gets a signature"""
+        recipe = self._recipe(2, 2)
+        RecipeSignature.objects.all().delete()
+        RecipeBucket.objects.all().delete()
+
+        self.assertIsNotNone(similarity.get_signature(recipe))
+        self.assertIsNotNone(self._signature(recipe))
+
+    def test_missing_signature_not_read_back(self):
+        """Test the lookup does not need the row it stored, see replicas"""
+        recipe = self._recipe(2, 2)
+        expected = similarity.get_signature(recipe)
+        RecipeSignature.objects.all().delete()
+
+        with patch('core.similarity.update_signatures') as update:
+            signature = similarity.get_signature(recipe)
+
+        update.assert_called_once_with([recipe.id])
+        self.assertEqual(signature.tolist(), expected.tolist())
+
+    def test_rebuild_command(self):
+        """Test that the command recomputes every signature"""
+        recipes = [self._recipe(2, i) for i in range(1, 4)]
+        self._recipe(0, 0)
+        expected = [self._signature(recipe) for recipe in recipes]
+        RecipeSignature.objects.all().delete()
+        RecipeBucket.objects.all().delete()
+
+        call_command('rebuild_signatures', '--batch-size', '2')
+
+        self.assertEqual(
+            [self._signature(recipe) for recipe in recipes], expected
+        )
+        self.assertEqual(RecipeSignature.objects.count(), 3)
+        self.assertEqual(RecipeBucket.objects.count(), 3 * similarity.BANDS)
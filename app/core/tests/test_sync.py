@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Tag, Recipe, Tombstone
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def _updated_at(self):
+        return Recipe.objects.values_list('updated_at', flat=True).get(
+            id=self.recipe.id
+        )
+
+    def _check_touched(self, change):
+        Recipe.objects.filter(id=self.recipe.id).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        before = self._updated_at()
+        change()
+        self.assertGreater(self._updated_at(), before)
+
+    def test_links_touch_recipe(self):
+        """Test that link changes from either side move updated_at"""
+        self._check_touched(lambda: self.recipe.tags.add(self.tag))
+        self._check_touched(lambda: self.tag.recipe_set.clear())
+        self.recipe.tags.add(self.tag)
+        self._check_touched(lambda: self.tag.delete())
+
+    def test_tombstones(self):
+        """Test that deleted objects leave a tombstone"""
+        expected = [(self.user.id, 'tag', self.tag.id),
+                    (self.user.id, 'recipe', self.recipe.id)]
+        self.tag.delete()
+        self.recipe.delete()
+
+        self.assertEqual(
+            list(Tombstone.objects.order_by('id').values_list(
+                'user', 'kind', 'object_id'
+            )),
+            expected
+        )
+
+    def test_prune_tombstones(self):
+        """Test that only old tombstones are pruned"""
+        old = Tombstone.objects.create(
+            user=self.user, kind='tag', object_id=1,
+            deleted_at=timezone.now() - timedelta(days=40)
+        )
+        recent = Tombstone.objects.create(
+            user=self.user, kind='tag', object_id=2
+        )
+
+        call_command('prune_tombstones', '--days', '30')
+
+        self.assertFalse(Tombstone.objects.filter(id=old.id).exists())
+        self.assertTrue(Tombstone.objects.filter(id=recent.id).exists())
@@ -0,0 +1,133 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        throttling.get_cache().clear()
+        self.addCleanup(throttling.get_cache().clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_parse_rate(self):
+        """Test that DRF style rates are converted to requests per second"""
+        self.assertEqual(throttling.parse_rate('10/s'), 10)
+        self.assertEqual(throttling.parse_rate('120/min'), 2)
+        self.assertEqual(throttling.parse_rate('36/hour'), 0.01)
+
+    @override_settings(THROTTLE_BUCKETS={'recipes': ('1/min', 2)})
+    def test_bucket_allows_burst_then_rejects(self):
+        """Test that requests beyond the burst get a 429 with Retry-After"""
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(res['Retry-After']), 60)
+
+    @override_settings(THROTTLE_BUCKETS={'recipes': ('1/s', 1)})
+    def test_bucket_refills(self):
+        """Test that tokens come back with time"""
+        with patch('core.throttling.time.time', return_value=1000.0):
+            self.client.get(RECIPES_URL)
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, 429)
+
+        with patch('core.throttling.time.time', return_value=1001.0):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_BUCKETS={'recipes': ('1/min', 1)})
+    def test_buckets_per_user(self):
+        """Test that users don't share a bucket"""
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_BUCKETS={'token': ('1/min', 1)})
+    def test_token_throttled_by_ip(self):
+        """Test that anonymous token requests are bucketed by client IP"""
+        client = APIClient()
+        payload = {'email': 'test@mail.com', 'password': 'testpass'}
+
+        self.assertEqual(client.post(TOKEN_URL, payload).status_code, 200)
+        res = client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        THROTTLE_BUCKETS={'token': ('1/min', 1)}, REST_FRAMEWORK={}
+    )
+    def test_forwarded_for_ignored_without_proxies(self):
+        """Test that rotating X-Forwarded-For doesn't give a new bucket"""
+        client = APIClient()
+        payload = {'email': 'test@mail.com', 'password': 'testpass'}
+
+        client.post(TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='1.1.1.1')
+        res = client.post(
+            TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='2.2.2.2'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(
+        THROTTLE_BUCKETS={'token': ('1/min', 1)},
+        REST_FRAMEWORK={'NUM_PROXIES': 1},
+    )
+    def test_forwarded_for_behind_proxy(self):
+        """Test that the client IP comes from the header behind a proxy"""
+        client = APIClient()
+        payload = {'email': 'test@mail.com', 'password': 'testpass'}
+
+        client.post(TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='1.1.1.1')
+        res = client.post(
+            TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='2.2.2.2'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_BUCKETS={}, MAX_CONCURRENT_REQUESTS=1)
+    def test_concurrency_cap(self):
+        """Test that a second request in flight is rejected"""
+        # Occupy the only slot by hand, as a request in flight would
+        throttling.get_cache().set(f'inflight:{self.user.pk}', 1)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(
+            throttling.get_cache().get(f'inflight:{self.user.pk}'), 1
+        )
+        throttling.get_cache().set(f'inflight:{self.user.pk}', 0)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            throttling.get_cache().get(f'inflight:{self.user.pk}'), 0
+        )
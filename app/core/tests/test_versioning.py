@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import versioning
+from core.models import DataVersion, Tag, Recipe
+
+
+class DataVersionTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+
+    def test_bumped_on_changes(self):
+        """Test that recipe, tag and link changes bump the version"""
+        seen = [versioning.get_version(self.user.id)]
+
+        def changed():
+            version = versioning.get_version(self.user.id)
+            self.assertGreater(version, seen[-1])
+            seen.append(version)
+
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        changed()
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        changed()
+        recipe.tags.add(tag)
+        changed()
+        tag.recipe_set.clear()
+        changed()
+        recipe.delete()
+        changed()
+
+    def test_bump_before_first_read(self):
+        """Test that bumping a user without a version creates nothing"""
+        versioning.bump(self.user.id)
+
+        self.assertFalse(DataVersion.objects.exists())
+        self.assertEqual(versioning.get_version(self.user.id), 0)
+
+    def test_versions_per_user(self):
+        """Test that changes only bump the version of their user"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        version = versioning.get_version(other.id)
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(versioning.get_version(other.id), version)
@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from app import warmup
+
+
+class WarmUpTests(TestCase):
+
+    def test_url_resolvers_compiled(self):
+        """Test that the URL patterns of the api apps are walked"""
+        self.assertGreater(warmup.warm_url_resolvers(), 10)
+
+    def test_serializer_field_maps_built(self):
+        """Test that the recipe and user serializers are warmed up"""
+        names = {cls.__name__ for cls in warmup._serializer_classes()}
+
+        self.assertIn('RecipeSerializer', names)
+        self.assertIn('UserSerializer', names)
+        self.assertEqual(warmup.warm_serializers(), len(names))
+
+    def test_warm_up_reports_timings_and_memory(self):
+        """Test that each step is timed and memory use is recorded"""
+        timings = warmup.warm_up()
+
+        self.assertEqual(
+            set(timings), {'url_resolvers', 'serializers', 'databases'}
+        )
+        self.assertGreater(warmup.MAX_RSS_BYTES.value(), 0)
+        self.assertNotIn('databases', warmup.warm_up(databases=False))
@@ -0,0 +1,83 @@
+"""
+    Throttling of the API views.
+    TokenBucketThrottle refills each (scope, user) bucket continuously
+    instead of counting requests in fixed windows, so clients can burst a
+    little but not sustain more than the rate. The state lives in the
+    THROTTLE_CACHE cache; its read-modify-write is not atomic, so under
+    contention from many processes a few extra requests may get through.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.metrics import registry
+
+
+THROTTLED = registry.counter(
+    'http_throttled_total',
+    'Requests rejected by throttling, by scope and reason',
+)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def parse_rate(rate):
+    """Return the requests per second of a DRF style rate like 100/min"""
+    num, period = rate.split('/')
+    return int(num) / PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+        Token bucket per user and view throttle_scope, configured by the
+        THROTTLE_BUCKETS setting. Anonymous requests are bucketed by
+        client IP.
+    """
+
+    def __init__(self):
+        self.wait_time = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        bucket = getattr(settings, 'THROTTLE_BUCKETS', {}).get(scope)
+        if bucket is None:
+            return True
+        rate, burst = parse_rate(bucket[0]), bucket[1]
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        key = f'throttle:{scope}:{ident}'
+
+        cache = get_cache()
+        now = time.time()
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.wait_time = (1 - tokens) / rate
+            THROTTLED.inc(scope=scope, reason='rate')
+            return False
+        # Keep the bucket until it would be full again anyway
+        cache.set(key, (tokens - 1, now), int(burst / rate) + 1)
+        return True
+
+    def get_ident(self, request):
+        """
+            Take the client IP from X-Forwarded-For only behind the
+            NUM_PROXIES proxies we know of, clients could rotate the header
+            to get a new bucket otherwise.
+        """
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,45 @@
+"""
+    Per-user data versions.
+    Every change to a user's recipes, tags, ingredients or their links
+    bumps the user's DataVersion, so values computed from that data can be
+    cached under a key including the version and never need to be
+    invalidated by hand.
+"""
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import DataVersion, Tag, Ingredient, Recipe
+
+
+def get_version(user_id):
+    """Return the current data version of a user"""
+    # The row is created on first read: bump() only updates, so it
+    # never creates rows for users being deleted
+    version, _ = DataVersion.objects.get_or_create(user_id=user_id)
+    return version.version
+
+
+def bump(user_id):
+    """Mark the data of a user as changed"""
+    DataVersion.objects.filter(user_id=user_id).update(
+        version=F('version') + 1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def data_changed(sender, instance, **kwargs):
+    bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, **kwargs):
+    # Tags and ingredients are only linked to recipes of their user
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump(instance.user_id)
@@ -0,0 +1,67 @@
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core import health
+from core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+
+def _has_metrics_token(request):
+    """Whether request carries METRICS_TOKEN as a bearer token"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and constant_time_compare(auth, f'Bearer {token}')
+
+
+@require_GET
+def metrics(request):
+    """
+        Expose the process metrics in the Prometheus text format. The
+        scraper has to send METRICS_TOKEN as a bearer token, nobody gets
+        them while it is not set.
+    """
+    if not _has_metrics_token(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@require_GET
+def healthz(request):
+    """Liveness probe, answers as long as the process serves requests"""
+    return HttpResponse('ok', content_type='text/plain')
+
+
+@require_GET
+def readyz(request):
+    """
+        Readiness probe, checks the databases, the migrations and the
+        media volume. Answers 503 with the failing checks until they pass.
+        The errors, which name hosts and paths, are logged and only shown
+        to requests with the METRICS_TOKEN.
+    """
+    checks = health.readiness()
+    ready = not any(checks.values())
+    for name, error in checks.items():
+        if error:
+            logger.warning('Readiness check %s failed: %s', name, error)
+    detailed = _has_metrics_token(request)
+    return JsonResponse(
+        {
+            'ready': ready,
+            'checks': {
+                name: (error if detailed else 'failing') if error else 'ok'
+                for name, error in checks.items()
+            },
+        },
+        status=200 if ready else 503
+    )
@@ -0,0 +1,60 @@
+"""
+Production server configuration.
+
+    gunicorn -c gunicorn.conf.py app.wsgi
+
+The application is loaded once in the master (preload_app) and shared
+copy-on-write by the forked workers. Every worker warms up before it
+accepts requests and logs how long it took and how much memory it uses.
+Set DJANGO_API_ONLY=1 to leave out the admin, sessions, messages and the
+browsable API.
+"""
+import multiprocessing
+import os
+import time
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = '-'
+
+_started = time.perf_counter()
+
+
+def when_ready(server):
+    """Warm up the master so the workers inherit compiled URLs"""
+    from app.warmup import warm_up, max_rss_bytes
+
+    timings = warm_up(databases=False)
+    server.log.info(
+        'Application loaded in %.0f ms (warm-up %.0f ms), master RSS %.1f MiB',
+        (time.perf_counter() - _started) * 1000,
+        sum(timings.values()) * 1000,
+        max_rss_bytes() / 2 ** 20,
+    )
+
+
+def post_fork(server, worker):
+    worker.started_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Warm up the worker before it accepts requests"""
+    from app.warmup import warm_up, max_rss_bytes
+
+    timings = warm_up()
+    worker.log.info(
+        'Worker %s ready in %.0f ms (%s), RSS %.1f MiB',
+        worker.pid,
+        (time.perf_counter() - worker.started_at) * 1000,
+        ', '.join(f'{name} {secs * 1000:.0f} ms'
+                  for name, secs in timings.items()),
+        max_rss_bytes() / 2 ** 20,
+    )
@@ -0,0 +1,37 @@
+import json
+
+from django.core import signing
+from django.urls import reverse
+from rest_framework import serializers
+
+from core.models import Job
+
+
+STATUS_SALT = 'job-status'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of background jobs"""
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'max_attempts', 'run_at',
+            'created_at', 'finished_at', 'result',
+        )
+        read_only_fields = fields
+
+    def get_result(self, obj):
+        return json.loads(obj.result) if obj.result else None
+
+
+def status_url(request, job):
+    """
+        Return a URL showing the status of job without credentials, for
+        jobs that outlive the access of their user like account deletion
+    """
+    token = signing.dumps(job.id, salt=STATUS_SALT)
+    return request.build_absolute_uri(
+        reverse('job:job-status', args=[token])
+    )
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job
+
+
+JOBS_URL = reverse('job:job-list')
+ME_URL = reverse('user:me')
+
+
+def detail_url(job_id):
+    """Return job detail URL"""
+    return reverse('job:job-detail', args=[job_id])
+
+
+class PublicJobApiTests(TestCase):
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateJobApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_jobs_limited_to_user(self):
+        """Test that only the user's own jobs are listed"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        jobs.enqueue('delete_user', user=other, user_id=other.id)
+        job = jobs.enqueue('delete_user', user=self.user, user_id=1)
+
+        res = self.client.get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [job.id])
+        res = self.client.get(detail_url(job.id + 1))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_job_status(self):
+        """Test that the job status and result are returned"""
+        job = jobs.enqueue('delete_user', user=self.user, user_id=1)
+        Job.objects.filter(id=job.id).update(
+            status=Job.DONE, result='{"recipes": 3}'
+        )
+
+        res = self.client.get(detail_url(job.id))
+
+        self.assertEqual(res.data['status'], Job.DONE)
+        self.assertEqual(res.data['result'], {'recipes': 3})
+
+    def test_delete_account_queued(self):
+        """Test that deleting the account queues a job"""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.name, 'delete_user')
+        self.assertEqual(job.user, self.user)
+        self.assertTrue(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+
+    def test_delete_account_deactivates(self):
+        """Test that the account stops working before the job runs"""
+        Token.objects.create(user=self.user)
+
+        self.client.delete(ME_URL)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    def test_delete_account_followed_without_token(self):
+        """Test that the deletion is followed at its signed status URL"""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            client.delete(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        status_url = res.data['status_url']
+        res = APIClient().get(status_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+
+        jobs.run(jobs.claim())
+
+        res = APIClient().get(status_url)
+        self.assertEqual(res.data['status'], Job.DONE)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+
+    def test_status_url_tampered(self):
+        """Test that only signed job ids are shown"""
+        job = jobs.enqueue('delete_user', user=self.user, user_id=1)
+        url = reverse('job:job-status', args=[f'{job.id}:forged'])
+
+        res = APIClient().get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_account_racing_queued_job(self):
+        """Test that a request racing a queued deletion gets its job"""
+        token = Token.objects.create(user=self.user)
+        queued = jobs.enqueue(
+            'delete_user', user=self.user, user_id=self.user.id
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['id'], queued.id)
+        self.assertEqual(Job.objects.filter(name='delete_user').count(), 1)
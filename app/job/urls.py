@@ -0,0 +1,16 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from job import views
+
+
+router = DefaultRouter()
+router.register('jobs', views.JobViewSet)
+
+app_name = 'job'
+
+urlpatterns = [
+    path('jobs/status/<str:token>/', views.JobStatusView.as_view(),
+         name='job-status'),
+    path('', include(router.urls))
+]
@@ -0,0 +1,49 @@
+from django.core import signing
+from django.http import Http404
+from rest_framework import generics, viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import AllowAny, IsAuthenticated
+
+from core.authentication import BatchAuthentication
+from core.mixins import ReplicaReadMixin
+from core.models import Job
+from job import serializers
+
+
+class JobViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """Status of the background jobs of the authenticated user"""
+    serializer_class = serializers.JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        """Retrieve the jobs for the authenticated user, newest first"""
+        queryset = self.queryset.filter(user=self.request.user)
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset.order_by('-id')
+
+
+class JobStatusView(generics.RetrieveAPIView):
+    """
+        Status of the job signed into the URL by serializers.status_url(),
+        for STATUS_URL_SECONDS
+    """
+    serializer_class = serializers.JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    STATUS_URL_SECONDS = 7 * 24 * 3600
+
+    def get_object(self):
+        try:
+            job_id = signing.loads(
+                self.kwargs['token'], salt=serializers.STATUS_SALT,
+                max_age=self.STATUS_URL_SECONDS
+            )
+        except signing.BadSignature:
+            raise Http404
+        return generics.get_object_or_404(self.get_queryset(), id=job_id)
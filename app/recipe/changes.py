@@ -0,0 +1,109 @@
+"""
+    Delta sync feed: the recipes, tags and ingredients of a user created,
+    updated or deleted after a cursor.
+    The feed is ordered by (timestamp, kind, id) over the three tables and
+    the tombstones, so the cursor is the last position returned and a page
+    reads at most limit + 1 rows of each table through its (user,
+    timestamp) index, however large the library is. Rows are only served
+    once they are SYNC_LAG_SECONDS old: a transaction committing, or a
+    replica catching up, after a client synced cannot then hide a change
+    stamped before the client's cursor.
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+from recipe import serializers
+
+
+STREAMS = (
+    ('recipes', Recipe, 'updated_at'),
+    ('tags', Tag, 'updated_at'),
+    ('ingredients', Ingredient, 'updated_at'),
+    ('deleted', Tombstone, 'deleted_at'),
+)
+SERIALIZERS = {
+    'recipes': serializers.RecipeSerializer,
+    'tags': serializers.TagSerializer,
+    'ingredients': serializers.IngredientSerializer,
+}
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or older than the kept tombstones"""
+
+
+def encode_cursor(position):
+    stamp, stream, obj_id = position
+    raw = f'{stamp.isoformat()}|{stream}|{obj_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (timestamp, stream, id) position of a cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        stamp, stream, obj_id = raw.split('|')
+        position = (parse_datetime(stamp), int(stream), int(obj_id))
+    except (ValueError, UnicodeError):
+        raise CursorError('Invalid cursor.')
+    if position[0] is None or not 0 <= position[1] < len(STREAMS):
+        raise CursorError('Invalid cursor.')
+    kept = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    if position[0] < kept:
+        raise CursorError('Cursor expired, sync everything again.')
+    return position
+
+
+def _after(stream, field, position):
+    """Condition of the rows of a stream after position"""
+    stamp, cursor_stream, obj_id = position
+    after = Q(**{f'{field}__gt': stamp})
+    if stream > cursor_stream:
+        after |= Q(**{field: stamp})
+    elif stream == cursor_stream:
+        after |= Q(**{field: stamp, 'id__gt': obj_id})
+    return after
+
+
+def changes(user_id, cursor=None, limit=100):
+    """
+        Return the changes of a user after cursor, None for all of them,
+        at most limit rows: the serialized objects per kind, deleted
+        (kind, id) pairs, the cursor to continue from and whether there
+        is more.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    until = timezone.now() - timedelta(seconds=settings.SYNC_LAG_SECONDS)
+
+    entries = []
+    for stream, (name, model, field) in enumerate(STREAMS):
+        queryset = model._base_manager.filter(
+            user_id=user_id, **{f'{field}__lte': until}
+        )
+        if position is not None:
+            queryset = queryset.filter(_after(stream, field, position))
+        if model is Recipe:
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+        for obj in queryset.order_by(field, 'id')[:limit + 1]:
+            entries.append((getattr(obj, field), stream, obj.id, obj))
+    entries.sort(key=lambda entry: entry[:3])
+    page = entries[:limit]
+
+    result = {name: [] for name, _, _ in STREAMS}
+    for _, stream, _, obj in page:
+        name = STREAMS[stream][0]
+        if name == 'deleted':
+            result[name].append({'type': obj.kind, 'id': obj.object_id})
+        else:
+            result[name].append(SERIALIZERS[name](obj).data)
+    if page:
+        cursor = encode_cursor(page[-1][:3])
+    result['cursor'] = cursor
+    result['more'] = len(entries) > limit
+    return result
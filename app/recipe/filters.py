@@ -0,0 +1,202 @@
+"""
+    Boolean filter expressions over the tags and ingredients of recipes,
+    like ?filter=(vegan AND quick) OR dessert, NOT nuts
+
+        query := any (',' any)*         comma separated parts must all hold
+        any   := all ('OR' all)*
+        all   := unary ('AND' unary)*
+        unary := 'NOT' unary | '(' query ')' | term
+        term  := [('tag' | 'ingredient') ':'] (id | name | "quoted name")
+
+    A term without a kind matches a tag or an ingredient. Names match
+    case insensitively. Every distinct term becomes one EXISTS subquery on
+    a through table, so recipes are never multiplied by joins and need no
+    DISTINCT. Expressions are limited in length, terms and nesting, so a
+    crafted filter cannot produce an arbitrarily expensive query.
+"""
+import functools
+import re
+
+from django.db.models import Exists, OuterRef, Q
+
+from core.models import Recipe
+
+
+MAX_LENGTH = 500
+MAX_TERMS = 20
+MAX_DEPTH = 6
+
+KINDS = {
+    'tag': (Recipe.tags.through, 'tag'),
+    'ingredient': (Recipe.ingredients.through, 'ingredient'),
+}
+KEYWORDS = ('AND', 'OR', 'NOT')
+
+TOKEN_RE = re.compile(
+    r'\s*(?:(?P<symbol>[(),])'
+    r'|(?:(?P<kind>[a-z]+):)?(?:"(?P<quoted>[^"]*)"|(?P<word>[^\s(),"]+)))',
+    re.IGNORECASE
+)
+
+
+class FilterError(ValueError):
+    """The filter expression is invalid or too large"""
+
+
+def tokenize(text):
+    """Return the tokens of text: symbols, keywords and term tuples"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise FilterError(f'Unexpected character at {position}')
+        position = match.end()
+        if match.group('symbol'):
+            tokens.append(match.group('symbol'))
+            continue
+        kind, quoted, word = match.group('kind', 'quoted', 'word')
+        if kind is None and quoted is None and word.upper() in KEYWORDS:
+            tokens.append(word.upper())
+            continue
+        if kind is not None:
+            kind = kind.lower()
+            if kind not in KINDS:
+                raise FilterError(f'Unknown kind {kind}')
+        if quoted is None and word.isdigit():
+            tokens.append(('term', kind, int(word)))
+            continue
+        value = (word if quoted is None else quoted).strip()
+        if not value:
+            raise FilterError('Empty name')
+        tokens.append(('term', kind, value))
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser of the grammar above"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.terms = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.query(0)
+        if self.peek() is not None:
+            raise FilterError(f'Unexpected {self.peek()!r}')
+        return node
+
+    def _sequence(self, op, separator, child, depth):
+        nodes = [child(depth)]
+        while self.peek() == separator:
+            self.take()
+            nodes.append(child(depth))
+        return nodes[0] if len(nodes) == 1 else (op, tuple(nodes))
+
+    def query(self, depth):
+        return self._sequence('and', ',', self.disjunction, depth)
+
+    def disjunction(self, depth):
+        return self._sequence('or', 'OR', self.conjunction, depth)
+
+    def conjunction(self, depth):
+        return self._sequence('and', 'AND', self.unary, depth)
+
+    def unary(self, depth):
+        if depth >= MAX_DEPTH:
+            raise FilterError(f'Nested deeper than {MAX_DEPTH}')
+        token = self.take()
+        if token == 'NOT':
+            return ('not', self.unary(depth + 1))
+        if token == '(':
+            node = self.query(depth + 1)
+            if self.take() != ')':
+                raise FilterError('Missing )')
+            return node
+        if isinstance(token, tuple):
+            self.terms += 1
+            if self.terms > MAX_TERMS:
+                raise FilterError(f'More than {MAX_TERMS} terms')
+            return token
+        raise FilterError(
+            'Unexpected end' if token is None else f'Unexpected {token!r}'
+        )
+
+
+@functools.lru_cache(maxsize=256)
+def parse(text):
+    """Return the syntax tree of a filter expression"""
+    if len(text) > MAX_LENGTH:
+        raise FilterError(f'Longer than {MAX_LENGTH} characters')
+    return Parser(tokenize(text)).parse()
+
+
+def _exists(kind, **lookup):
+    through, field = KINDS[kind]
+    lookup = {f'{field}{name}': value for name, value in lookup.items()}
+    return Exists(through.objects.filter(recipe_id=OuterRef('pk'), **lookup))
+
+
+class Compiler:
+    """Turn a syntax tree into EXISTS annotations and a Q over them"""
+
+    def __init__(self):
+        self.annotations = {}
+        self.names = {}
+
+    def _flag(self, kind, value):
+        if isinstance(value, tuple):
+            key, lookup = (kind, 'in', value), {'_id__in': value}
+        elif isinstance(value, int):
+            key, lookup = (kind, value), {'_id': value}
+        else:
+            key, lookup = (kind, value.lower()), {'__name__iexact': value}
+        if key not in self.names:
+            name = f'_filter_{len(self.names)}'
+            self.names[key] = name
+            self.annotations[name] = _exists(kind, **lookup)
+        return Q(**{self.names[key]: True})
+
+    def compile(self, node):
+        op = node[0]
+        if op == 'in':
+            return self._flag(node[1], tuple(node[2]))
+        if op == 'term':
+            _, kind, value = node
+            if kind is not None:
+                return self._flag(kind, value)
+            return self._flag('tag', value) | self._flag('ingredient', value)
+        if op == 'not':
+            return ~self.compile(node[1])
+        children = [self.compile(child) for child in node[1]]
+        combined = children[0]
+        for child in children[1:]:
+            combined = combined & child if op == 'and' else combined | child
+        return combined
+
+
+def apply(queryset, *nodes):
+    """Filter a recipe queryset by parsed expressions that must all hold"""
+    compiler = Compiler()
+    condition = compiler.compile(
+        nodes[0] if len(nodes) == 1 else ('and', nodes)
+    )
+    # Django 2.1 can only filter on an Exists through an annotation
+    return queryset.annotate(**compiler.annotations).filter(condition)
+
+
+def any_of(kind, ids):
+    """Return the tree matching any of ids of one kind, in one EXISTS"""
+    return ('in', kind, tuple(ids))
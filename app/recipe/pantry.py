@@ -0,0 +1,119 @@
+"""
+    "What can I cook": the recipes whose ingredients a user has.
+    In SQL this is a relational division over the ingredients through
+    table. Instead each process keeps the recipes of a user as bitmasks
+    of their ingredients, so checking a recipe against a pantry is one
+    AND NOT. The index of a user is built on first use with one
+    query and kept under the user's data version, so the first query
+    after any write rebuilds it. At most PANTRY_INDEX_SIZE users are
+    kept, the least recently used go first.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from core import versioning
+from core.db import routers
+from core.models import Recipe
+
+
+class PantryIndex:
+    """
+        Ingredient bitmasks of the recipes of one user, a (words, n)
+        uint64 array so a search is a few vectorized operations over
+        contiguous rows however many ingredients the user has.
+    """
+
+    def __init__(self, links):
+        """Build the index from (recipe id, ingredient id) pairs"""
+        links = np.array(list(links), dtype=np.int64).reshape(-1, 2)
+        # Recipes without ingredients are left out, they need nothing
+        recipe_ids, rows = np.unique(links[:, 0], return_inverse=True)
+        self.ingredients, bits = np.unique(links[:, 1], return_inverse=True)
+        self.bits = {
+            ingredient_id: bit
+            for bit, ingredient_id in enumerate(self.ingredients.tolist())
+        }
+        words = max(1, -(-len(self.ingredients) // 64))
+        masks = np.zeros((words, len(recipe_ids)), dtype=np.uint64)
+        np.bitwise_or.at(
+            masks, (bits // 64, rows),
+            np.left_shift(np.uint64(1), (bits % 64).astype(np.uint64))
+        )
+        # Newest recipes first
+        self.recipe_ids = np.ascontiguousarray(recipe_ids[::-1])
+        self.masks = np.ascontiguousarray(masks[:, ::-1])
+
+    @classmethod
+    def build(cls, user_id):
+        return cls(Recipe.ingredients.through.objects.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe_id', 'ingredient_id'))
+
+    def mask(self, ingredient_ids):
+        """Return the bitmask of ingredient_ids, unknown ids are ignored"""
+        words = [0] * len(self.masks)
+        for ingredient_id in ingredient_ids:
+            bit = self.bits.get(ingredient_id)
+            if bit is not None:
+                words[bit // 64] |= 1 << bit % 64
+        return np.array(words, dtype=np.uint64)
+
+    def search(self, ingredient_ids, missing_one=True):
+        """
+            Return the ids of the recipes with all their ingredients in
+            ingredient_ids and, with missing_one, (recipe id, ingredient
+            id) pairs of those missing just that ingredient. Newest
+            recipes first.
+        """
+        missing = self.masks & ~self.mask(ingredient_ids)[:, None]
+        lacking = missing != 0
+        counts = lacking.sum(axis=0)
+        covered = self.recipe_ids[counts == 0].tolist()
+        if not missing_one:
+            return covered, []
+
+        # One word with a single bit left
+        word = missing.max(axis=0)
+        almost = (counts == 1) & (word & (word - np.uint64(1)) == 0)
+        bits = (lacking[:, almost].argmax(axis=0) * 64
+                + np.log2(word[almost].astype(float)).astype(int))
+        return covered, list(zip(
+            self.recipe_ids[almost].tolist(),
+            self.ingredients[bits].tolist()
+        ))
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def get_index(user_id):
+    """Return the index of a user, building it when missing or stale"""
+    # Read before building: a write in between makes the index newer
+    # than its version, which only costs an extra rebuild
+    version = versioning.get_version(user_id)
+    with _lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    # The version comes from the primary, a lagging replica would store
+    # its older links under the newer version
+    with routers.on_primary():
+        index = PantryIndex.build(user_id)
+    with _lock:
+        _indexes[user_id] = (version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.PANTRY_INDEX_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear():
+    """Drop every index of this process"""
+    with _lock:
+        _indexes.clear()
@@ -1,5 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
+
 from core.models import Tag, Ingredient, Recipe
+from core.relations import UserPrimaryKeyRelatedField, sync_many_to_many
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -7,8 +10,8 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = ('id', 'name',)
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count',)
+        read_only_fields = ('id', 'recipe_count',)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -16,17 +19,17 @@ class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name', 'user',)
-        read_only_fields = ('id', 'user',)
+        fields = ('id', 'name', 'user', 'recipe_count',)
+        read_only_fields = ('id', 'user', 'recipe_count',)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Serialize a recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -39,6 +42,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
+    def update(self, instance, validated_data):
+        """
+            Update a recipe, writing only the tags and ingredients
+            links that actually changed
+        """
+        relations = {
+            name: validated_data.pop(name)
+            for name in ('ingredients', 'tags') if name in validated_data
+        }
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            for name, objs in relations.items():
+                sync_many_to_many(instance, name, objs)
+        return instance
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """
@@ -0,0 +1,76 @@
+"""
+    Recipe statistics of a user for the dashboard.
+    The numeric columns are fetched with one narrow query and summarized
+    with NumPy. Results are cached with the user's data version, so
+    they are computed again only after the recipes change, and by one
+    request at a time (core.caching). The version is read from the
+    primary, so the statistics are computed there too: a lagging replica
+    would cache its older data under the newer version.
+"""
+import numpy as np
+
+from core import caching, versioning
+from core.db import routers
+from core.models import Tag, Recipe
+
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+TOP_TAGS = 10
+CACHE_TIMEOUT = 24 * 3600
+
+
+def summarize(values, bins):
+    """Return the distribution of a 1-d array"""
+    if not values.size:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': round(float(values.mean()), 2),
+        'percentiles': {
+            f'p{pct}': round(float(value), 2)
+            for pct, value in zip(
+                PERCENTILES, np.percentile(values, PERCENTILES)
+            )
+        },
+        'histogram': {
+            'edges': [round(float(edge), 2) for edge in edges],
+            'counts': counts.tolist(),
+        },
+    }
+
+
+def compute(user_id, bins=10):
+    """Compute the statistics of the recipes of a user"""
+    rows = Recipe.objects.filter(user_id=user_id).values_list(
+        'price', 'time_minutes'
+    )
+    data = np.array(
+        [(float(price), minutes) for price, minutes in rows],
+        dtype=float
+    ).reshape(-1, 2)
+
+    top_tags = Tag.objects.filter(
+        user_id=user_id, recipe_count__gt=0
+    ).order_by('-recipe_count', 'name').values(
+        'id', 'name', 'recipe_count'
+    )[:TOP_TAGS]
+    return {
+        'recipe_count': len(data),
+        'price': summarize(data[:, 0], bins),
+        'time_minutes': summarize(data[:, 1], bins),
+        'top_tags': list(top_tags),
+    }
+
+
+def get_stats(user_id, bins=10):
+    """Return the statistics of a user, from the cache when up to date"""
+    def compute_on_primary():
+        with routers.on_primary():
+            return compute(user_id, bins)
+
+    return caching.get_or_compute(
+        'recipe_stats', f'recipe-stats:{user_id}:{bins}',
+        versioning.get_version(user_id), compute_on_primary, CACHE_TIMEOUT
+    )
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import changes
+
+
+CHANGES_URL = reverse('recipe:changes')
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class PrivateChangesApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        self.recipe.tags.add(self.tag)
+
+    def _sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        res = self.client.get(CHANGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync(self):
+        """Test that without a cursor everything is returned"""
+        data = self._sync()
+
+        self.assertEqual([item['id'] for item in data['recipes']],
+                         [self.recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [self.tag.id])
+        self.assertEqual([item['id'] for item in data['tags']],
+                         [self.tag.id])
+        self.assertEqual([item['id'] for item in data['ingredients']],
+                         [self.ingredient.id])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['more'])
+
+    def test_only_changes_after_cursor(self):
+        """Test that a cursor skips what was already synced"""
+        cursor = self._sync()['cursor']
+
+        self.assertEqual(self._sync(cursor)['recipes'], [])
+
+        self.ingredient.name = 'Sea salt'
+        self.ingredient.save()
+        tag_id = self.tag.id
+        self.tag.delete()
+        data = self._sync(cursor)
+
+        self.assertEqual([item['name'] for item in data['ingredients']],
+                         ['Sea salt'])
+        # Unlinking the tag changed the recipe
+        self.assertEqual([item['tags'] for item in data['recipes']], [[]])
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(data['deleted'], [{'type': 'tag', 'id': tag_id}])
+        self.assertEqual(self._sync(data['cursor'])['deleted'], [])
+
+    def test_paginated(self):
+        """Test that pages continue where the previous one stopped"""
+        for i in range(4):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        seen = []
+        cursor = None
+        for _ in range(10):
+            data = self._sync(cursor, limit=2)
+            for name in ('recipes', 'tags', 'ingredients'):
+                seen.extend((name, item['id']) for item in data[name])
+            cursor = data['cursor']
+            if not data['more']:
+                break
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_other_users_changes(self):
+        """Test that only the user's own changes are returned"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        data = self._sync()
+
+        self.assertEqual(
+            (data['recipes'], data['tags'], data['ingredients']),
+            ([], [], [])
+        )
+
+    @override_settings(SYNC_LAG_SECONDS=60)
+    def test_recent_changes_held_back(self):
+        """Test that changes younger than the lag are not served yet"""
+        self.assertEqual(self._sync()['tags'], [])
+
+    def test_invalid_cursor(self):
+        """Test that bad and expired cursors are rejected"""
+        expired = changes.encode_cursor(
+            (timezone.now() - timedelta(days=365), 0, 0)
+        )
+        for cursor in ('nonsense', expired):
+            res = self.client.get(CHANGES_URL, {'since': cursor})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,152 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Ingredient, Recipe
+from recipe import pantry
+
+
+PANTRY_URL = reverse('recipe:recipe-pantry')
+
+
+class PantryIndexTests(TestCase):
+
+    def test_search(self):
+        """Test covered and one missing recipes are told apart"""
+        index = pantry.PantryIndex([
+            (1, 10), (1, 11),
+            (2, 10), (2, 12),
+            (3, 11), (3, 12), (3, 13),
+        ])
+
+        covered, almost = index.search([10, 11, 99])
+
+        self.assertEqual(covered, [1])
+        self.assertEqual(almost, [(2, 12)])
+        self.assertEqual(index.search([10, 11], missing_one=False),
+                         ([1], []))
+        self.assertEqual(index.search([]), ([], []))
+
+
+class PrivatePantryApiTests(TestCase):
+
+    def setUp(self):
+        pantry.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Rice', 'Egg')
+        ]
+        self.omelette = self._recipe('Omelette', self.ingredients[::2])
+        self.rice = self._recipe('Fried rice', self.ingredients)
+
+    def _recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=5, price=1
+        )
+        recipe.ingredients.set(ingredients)
+        return recipe
+
+    def _ids(self, *ingredients):
+        return ','.join(str(ingredient.id) for ingredient in ingredients)
+
+    def test_pantry(self):
+        """Test that covered recipes come before those missing one"""
+        salt, rice, egg = self.ingredients
+
+        res = self.client.get(PANTRY_URL, {
+            'ingredients': self._ids(salt, egg),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['id'], item['missing']) for item in res.data],
+            [(self.omelette.id, []), (self.rice.id, [rice.id])]
+        )
+
+        res = self.client.get(PANTRY_URL, {
+            'ingredients': self._ids(salt, egg), 'missing': 0,
+        })
+        self.assertEqual([item['id'] for item in res.data],
+                         [self.omelette.id])
+
+    def test_pantry_follows_writes(self):
+        """Test that changed recipes are seen by the next query"""
+        salt, rice, egg = self.ingredients
+        params = {'ingredients': self._ids(salt, rice), 'missing': 0}
+        self.client.get(PANTRY_URL, params)
+
+        self.omelette.ingredients.remove(egg)
+        with self.assertNumQueries(2):
+            # One query for the version, one to rebuild
+            pantry.get_index(self.user.id)
+
+        res = self.client.get(PANTRY_URL, params)
+        self.assertEqual([item['id'] for item in res.data],
+                         [self.omelette.id])
+
+    def test_pantry_cached(self):
+        """Test that the index is only built once"""
+        pantry.get_index(self.user.id)
+
+        with self.assertNumQueries(1):
+            pantry.get_index(self.user.id)
+
+    @override_settings(PANTRY_INDEX_SIZE=1)
+    def test_pantry_lru(self):
+        """Test that only the most recently used indexes are kept"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        first = pantry.get_index(self.user.id)
+        pantry.get_index(other.id)
+
+        self.assertIsNot(pantry.get_index(self.user.id), first)
+
+    def test_pantry_other_user(self):
+        """Test that recipes of other users are not returned"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(PANTRY_URL, {
+            'ingredients': self._ids(*self.ingredients),
+        })
+
+        self.assertEqual(res.data, [])
+
+    def test_pantry_invalid(self):
+        """Test that the ingredient ids are validated"""
+        res = self.client.get(PANTRY_URL, {'ingredients': 'salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_built_on_primary(self):
+        """Test that the index matches the version read from the primary"""
+        aliases = []
+        build = pantry.PantryIndex.build
+
+        def build_recording(user_id):
+            aliases.append(routers.current_replica())
+            return build(user_id)
+
+        routers.use_replica('replica_1')
+        try:
+            with patch.object(pantry.PantryIndex, 'build', build_recording):
+                pantry.get_index(self.user.id)
+        finally:
+            routers.use_replica(None)
+
+        self.assertEqual(aliases, [None])
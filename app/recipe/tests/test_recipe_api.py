@@ -1,17 +1,22 @@
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import caching
+from core.db import routers
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewSet
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -68,6 +73,10 @@ class PrivateRecipeApiTest(TestCase):
     """Test athenticated recipe API access"""
 
     def setUp(self):
+        cache.clear()
+        caching.clear()
+        # Primary pins of earlier tests' users
+        caches['shared'].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'test@mail.com',
@@ -106,6 +115,54 @@ class PrivateRecipeApiTest(TestCase):
         self.assertEqual(len(res.data), 1)
         self.assertEqual(res.data, serializer.data)
 
+    def test_recipe_list_cached(self):
+        """Test that the list is cached until the recipes change"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 1)
+
+        sample_recipe(user=self.user, title='Stew')
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 2)
+
+    @override_settings(QUERY_CACHE=None)
+    def test_recipe_list_queries(self):
+        """Test that the tags and ingredients are fetched once per list"""
+        for title in ('Soup', 'Stew', 'Pie'):
+            recipe = sample_recipe(user=self.user, title=title)
+            recipe.tags.add(sample_tag(user=self.user, name=title))
+            recipe.ingredients.add(sample_ingredient(user=self.user))
+        self.client.get(RECIPES_URL)
+
+        # The version, the recipes, their tags and their ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data[0]['tags']), 1)
+
+    @override_settings(DATABASE_REPLICAS={'replica_1': 1})
+    @patch('core.db.routers.choose_replica', return_value='replica_1')
+    def test_recipe_list_computed_on_primary(self, choose):
+        """Test that a cached list matches the version it is stored under"""
+        sample_recipe(user=self.user)
+        aliases = []
+        get_queryset = RecipeViewSet.get_queryset
+
+        def get_queryset_recording(view):
+            aliases.append(routers.current_replica())
+            return get_queryset(view)
+
+        with patch.object(RecipeViewSet, 'get_queryset',
+                          get_queryset_recording):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+        choose.assert_called_once()
+        self.assertEqual(aliases, [None])
+
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
         recipe = sample_recipe(user=self.user)
@@ -171,6 +228,25 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test that tags of another user can't be linked"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        tag = sample_tag(user=other)
+        payload = {
+            'title': 'Avocado lime cheesecake',
+            'tags': [tag.id],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -224,6 +300,23 @@ class PrivateRecipeApiTest(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_update_unchanged_relations(self):
+        """Test that resending the same tags doesn't rewrite the links"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        link_id = Recipe.tags.through.objects.get(recipe=recipe).id
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'title': 'Curry', 'tags': [tag.id]}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [tag.id])
+        self.assertEqual(
+            Recipe.tags.through.objects.get(recipe=recipe).id, link_id
+        )
+
 
 class RecipeImageUploadTests(TestCase):
 
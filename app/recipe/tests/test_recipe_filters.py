@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import filters
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FilterParserTests(SimpleTestCase):
+
+    def test_precedence(self):
+        """Test that AND binds tighter than OR, and OR than commas"""
+        self.assertEqual(
+            filters.parse('(vegan AND quick) or dessert, NOT nuts'),
+            ('and', (
+                ('or', (
+                    ('and', (('term', None, 'vegan'),
+                             ('term', None, 'quick'))),
+                    ('term', None, 'dessert'),
+                )),
+                ('not', ('term', None, 'nuts')),
+            ))
+        )
+        self.assertEqual(
+            filters.parse('a OR b AND c'),
+            ('or', (('term', None, 'a'),
+                    ('and', (('term', None, 'b'), ('term', None, 'c')))))
+        )
+
+    def test_terms(self):
+        """Test ids, kinds and quoted names"""
+        self.assertEqual(
+            filters.parse('tag:3 AND ingredient:"olive oil"'),
+            ('and', (('term', 'tag', 3),
+                     ('term', 'ingredient', 'olive oil')))
+        )
+
+    def test_invalid(self):
+        """Test that malformed expressions are rejected"""
+        for text in ('(vegan', 'vegan AND', 'vegan)', 'shop:1', 'OR',
+                     '""', 'a ; b'):
+            with self.subTest(text=text):
+                with self.assertRaises(filters.FilterError):
+                    filters.parse(text)
+
+    def test_limits(self):
+        """Test that large or deep expressions are rejected"""
+        too_many = ' OR '.join(
+            str(i) for i in range(filters.MAX_TERMS + 1)
+        )
+        too_deep = '(' * filters.MAX_DEPTH + 'a' + ')' * filters.MAX_DEPTH
+        for text in (too_many, too_deep, 'a' * (filters.MAX_LENGTH + 1)):
+            with self.assertRaises(filters.FilterError):
+                filters.parse(text)
+
+
+class RecipeFilterApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dessert')
+        }
+        nuts = Ingredient.objects.create(user=self.user, name='Nuts')
+        self.recipes = {}
+        for title, tags, with_nuts in (
+                ('Salad', ('Vegan', 'Quick'), False),
+                ('Curry', ('Vegan',), False),
+                ('Brownie', ('Dessert', 'Quick'), True),
+                ('Sorbet', ('Dessert',), False)):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=1
+            )
+            recipe.tags.set(self.tags[name] for name in tags)
+            if with_nuts:
+                recipe.ingredients.add(nuts)
+            self.recipes[title] = recipe
+
+    def _titles(self, res):
+        return sorted(item['title'] for item in res.data)
+
+    def test_filter_expression(self):
+        """Test boolean expressions over tag and ingredient names"""
+        res = self.client.get(RECIPES_URL, {
+            'filter': '(vegan AND quick) OR dessert, NOT nuts',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._titles(res), ['Salad', 'Sorbet'])
+
+    def test_filter_by_id(self):
+        """Test kinds and ids"""
+        quick = self.tags['Quick'].id
+
+        res = self.client.get(RECIPES_URL, {
+            'filter': f'tag:{quick} AND NOT ingredient:nuts',
+        })
+
+        self.assertEqual(self._titles(res), ['Salad'])
+
+    def test_filter_uses_exists(self):
+        """Test that recipes matching several terms come back once"""
+        tags = ','.join(str(tag.id) for tag in self.tags.values())
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'tags': tags})
+
+        self.assertEqual(len(res.data), 4)
+        recipe_sql = next(
+            query['sql'] for query in queries
+            if 'FROM "core_recipe"' in query['sql']
+        )
+        self.assertIn('EXISTS', recipe_sql)
+        self.assertNotIn('JOIN', recipe_sql)
+
+    def test_filter_invalid(self):
+        """Test that a bad expression is a validation error"""
+        res = self.client.get(RECIPES_URL, {'filter': '(vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('filter', res.data)
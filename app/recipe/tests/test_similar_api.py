@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class PrivateSimilarApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(8)
+        ]
+        self.recipes = []
+        for count in (8, 7, 1):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Soup {count}', time_minutes=5,
+                price=1
+            )
+            recipe.ingredients.set(ingredients[:count])
+            self.recipes.append(recipe)
+
+    def test_similar(self):
+        """Test that the most similar recipe comes first"""
+        res = self.client.get(similar_url(self.recipes[0].id), {'k': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['id'], self.recipes[1].id)
+        self.assertEqual(len(res.data[0]['ingredients']), 7)
+        self.assertGreater(res.data[0]['similarity'], 0.6)
+
+    def test_similar_other_user(self):
+        """Test that recipes of other users are not found"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com', 'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(similar_url(self.recipes[0].id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_invalid_k(self):
+        """Test that k is validated"""
+        res = self.client.get(similar_url(self.recipes[0].id), {'k': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
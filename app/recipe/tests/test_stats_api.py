@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import caching
+from core.db import routers
+from core.models import Tag, Recipe
+
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+class PrivateStatsApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caching.clear()
+        # Primary pins of earlier tests' users
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        Tag.objects.create(user=self.user, name='Unused')
+        for price, minutes in ((1, 10), (2, 20), (3, 30), (4, 40)):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Soup', time_minutes=minutes,
+                price=price
+            )
+            recipe.tags.add(vegan)
+        recipe.tags.add(quick)
+
+    def test_stats(self):
+        """Test the distributions and most used tags"""
+        res = self.client.get(STATS_URL, {'bins': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 4)
+        price = res.data['price']
+        self.assertEqual((price['min'], price['max']), (1.0, 4.0))
+        self.assertEqual(price['mean'], 2.5)
+        self.assertEqual(price['percentiles']['p50'], 2.5)
+        self.assertEqual(sum(price['histogram']['counts']), 4)
+        self.assertEqual(len(price['histogram']['edges']), 4)
+        self.assertEqual(res.data['time_minutes']['max'], 40.0)
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['top_tags']],
+            [('Vegan', 4), ('Quick', 1)]
+        )
+
+    def test_stats_cached_until_data_changes(self):
+        """Test that repeated calls are served from the cache"""
+        self.client.get(STATS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['recipe_count'], 4)
+
+        Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price=8
+        )
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['recipe_count'], 5)
+
+    @override_settings(DATABASE_REPLICAS={'replica_1': 1})
+    @patch('core.db.routers.choose_replica', return_value='replica_1')
+    def test_stats_computed_on_primary(self, choose):
+        """Test that the data matches the version read from the primary"""
+        aliases = []
+
+        def compute(user_id, bins):
+            aliases.append(routers.current_replica())
+            return {}
+
+        with patch('recipe.stats.compute', compute):
+            self.client.get(STATS_URL)
+
+        choose.assert_called_once()
+        self.assertEqual(aliases, [None])
+
+    def test_stats_without_recipes(self):
+        """Test that a user without recipes gets empty statistics"""
+        user = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['price'])
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_invalid_bins(self):
+        """Test that the histogram size is validated"""
+        res = self.client.get(STATS_URL, {'bins': 'many'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -95,6 +95,7 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
+        tag1.refresh_from_db()
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
         self.assertIn(serializer1.data, res.data)
@@ -122,3 +123,24 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_tags_most_used_first(self):
+        """Test ordering tags by the number of recipes using them"""
+        rare = Tag.objects.create(user=self.user, name='Breakfast')
+        popular = Tag.objects.create(user=self.user, name='Abc')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=3.00,
+                user=self.user,
+            )
+            recipe.tags.add(popular)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'most_used': 1})
+
+        self.assertEqual(
+            [(tag['id'], tag['recipe_count']) for tag in res.data],
+            [(popular.id, 2), (rare.id, 1)]
+        )
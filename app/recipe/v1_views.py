@@ -2,6 +2,7 @@ from rest_framework import viewsets, mixins
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core.authentication import BatchAuthentication
 from core.models import Tag, Ingredient
 from recipe import serializers
 
@@ -19,7 +20,7 @@ class TagViewSet(viewsets.GenericViewSet,
         point implementing it. So, you can customize it by adding the
         mixins for what you want to do.
     """
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
     permission_classes = (IsAuthenticated, )
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
@@ -49,7 +50,7 @@ class IngredientViewSet(viewsets.GenericViewSet,
                         mixins.ListModelMixin,
                         mixins.CreateModelMixin):
     """Manage ingredients in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
     permission_classes = (IsAuthenticated,)
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
@@ -1,11 +1,23 @@
+import hashlib
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
+from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from core import caching, similarity, versioning
+from core.authentication import BatchAuthentication
+from core.db import routers
+from core.mixins import (
+    ConcurrencyLimitMixin, ProfiledViewMixin, ReplicaReadMixin,
+)
+from core.throttling import TokenBucketThrottle
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import changes, filters, pantry, serializers
+from recipe.stats import get_stats
 
 
 """
@@ -21,12 +33,17 @@ from recipe import serializers
 """
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ConcurrencyLimitMixin,
+                            ProfiledViewMixin,
+                            ReplicaReadMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'recipe_attrs'
 
     def get_queryset(self):
         """
@@ -41,12 +58,16 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', default=0))
         )
+        most_used = bool(
+            int(self.request.query_params.get('most_used', default=0))
+        )
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
+        ordering = ('-recipe_count', '-name') if most_used else ('-name',)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*ordering)
 
     def perform_create(self, serializer):
         """
@@ -71,12 +92,17 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConcurrencyLimitMixin,
+                    ProfiledViewMixin,
+                    ReplicaReadMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'recipes'
 
     def _params_to_ints(self, qs):
         """Convert a list of string id's to a list of integers"""
@@ -86,14 +112,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Retrieve the recipes for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        expression = self.request.query_params.get('filter')
         queryset = self.queryset
+        # EXISTS instead of joins, so a recipe matching several ids is
+        # not returned several times
+        conditions = []
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            conditions.append(filters.any_of('tag', tag_ids))
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
-        return queryset.filter(user=self.request.user)
+            conditions.append(filters.any_of('ingredient', ingredients_ids))
+        if expression:
+            try:
+                conditions.append(filters.parse(expression))
+            except filters.FilterError as exc:
+                raise ValidationError({'filter': str(exc)})
+        if conditions:
+            queryset = filters.apply(queryset, *conditions)
+        queryset = queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            # One query per relation instead of two per recipe
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+        return queryset
 
     def get_serializer_class(self):
         """
@@ -110,6 +151,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """
+            The list of each user and query string is cached with the
+            user's data version, see core.caching. The version is read
+            from the primary, so a missing list is computed there too.
+        """
+        params = hashlib.sha1(
+            repr(sorted(request.query_params.lists())).encode()
+        ).hexdigest()
+
+        def compute():
+            with routers.on_primary():
+                queryset = self.filter_queryset(self.get_queryset())
+                # A plain list, the serializer holds on to the request
+                return list(self.get_serializer(queryset, many=True).data)
+
+        return Response(caching.get_or_compute(
+            'recipe_list', f'recipe-list:{request.user.id}:{params}',
+            versioning.get_version(request.user.id), compute
+        ))
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
@@ -122,6 +184,87 @@ class RecipeViewSet(viewsets.ModelViewSet):
     # custom functions and define them as custom actions by using
     # the @action decorator.
 
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """
+            Distribution of the price and time of the user's recipes and
+            their most used tags. ?bins= sets the histogram size.
+        """
+        try:
+            bins = int(request.query_params.get('bins', 10))
+        except ValueError:
+            bins = 0
+        if not 1 <= bins <= 100:
+            return Response(
+                {'bins': 'Must be an integer between 1 and 100.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(get_stats(request.user.id, bins))
+
+    @action(methods=['GET'], detail=False)
+    def pantry(self, request):
+        """
+            What can I cook: the user's recipes using only the
+            ?ingredients= ids, then those missing one ingredient, with
+            the missing id. ?missing=0 leaves the latter out.
+        """
+        try:
+            ingredient_ids = self._params_to_ints(
+                request.query_params.get('ingredients', '')
+            )
+            missing_one = bool(int(request.query_params.get('missing', 1)))
+        except ValueError:
+            return Response(
+                {'ingredients': 'Must be a list of comma separated ids.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        covered, almost = pantry.get_index(request.user.id).search(
+            ingredient_ids, missing_one
+        )
+        missing = dict(almost)
+        recipes = Recipe.objects.prefetch_related(
+            'tags', 'ingredients'
+        ).in_bulk(covered + list(missing))
+        data = []
+        for recipe_id in covered + list(missing):
+            # Deleted since the index was built
+            if recipe_id in recipes:
+                item = self.get_serializer(recipes[recipe_id]).data
+                item['missing'] = (
+                    [missing[recipe_id]] if recipe_id in missing else []
+                )
+                data.append(item)
+        return Response(data)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """
+            The user's recipes sharing the most tags and ingredients with
+            this one, with their estimated Jaccard similarity. ?k= sets
+            how many.
+        """
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            k = 0
+        if not 1 <= k <= 50:
+            return Response(
+                {'k': 'Must be an integer between 1 and 50.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        matches = similarity.similar(self.get_object(), k)
+        recipes = Recipe.objects.prefetch_related(
+            'tags', 'ingredients'
+        ).in_bulk([recipe_id for recipe_id, _ in matches])
+        data = []
+        for recipe_id, score in matches:
+            # Deleted since the lookup
+            if recipe_id in recipes:
+                item = self.get_serializer(recipes[recipe_id]).data
+                item['similarity'] = score
+                data.append(item)
+        return Response(data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -142,3 +285,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class ChangesView(ConcurrencyLimitMixin,
+                  ProfiledViewMixin,
+                  ReplicaReadMixin,
+                  APIView):
+    """
+        Recipes, tags and ingredients of the user created, updated or
+        deleted since ?since=, the cursor returned by the previous call.
+        Without it everything is returned. Call again with the new cursor
+        while more is true.
+    """
+    authentication_classes = (BatchAuthentication, TokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'recipes'
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 100))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 500:
+            return Response(
+                {'limit': 'Must be an integer between 1 and 500.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            result = changes.changes(
+                request.user.id, request.query_params.get('since'), limit
+            )
+        except changes.CursorError as exc:
+            return Response(
+                {'since': str(exc)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(result)
@@ -0,0 +1,183 @@
+"""
+    Password verification and token issuance for the token endpoint.
+    With TOKEN_VERIFY_WORKERS set, the PBKDF2 check runs on a small
+    thread pool of its own (hashlib releases the GIL while hashing)
+    instead of in whichever request thread got the login. At most
+    TOKEN_VERIFY_QUEUE checks wait for a thread, further logins are
+    rejected at once with Saturated, so a burst of logins after an
+    outage cannot take up every thread and core of the process.
+    Passwords verified in the last TOKEN_VERIFIED_TTL seconds are
+    remembered by an HMAC of the user, stored hash and password, so
+    repeated logins skip the hashing, and changing the password forgets
+    them. Issued token keys are cached TOKEN_CACHE_TTL seconds in the
+    shared cache, which every process sees, and dropped from it as soon
+    as the token is deleted or replaced.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    check_password, identify_hasher, make_password,
+)
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.metrics import registry
+
+
+TOKEN_VERIFICATIONS = registry.counter(
+    'token_verifications_total',
+    'Password checks of the token endpoint, by outcome',
+)
+
+# Most verified passwords remembered by each process
+MAX_VERIFIED = 10000
+
+
+class Saturated(Exception):
+    """Every verification thread is busy and the queue is full"""
+
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+_dummy_hash = None
+
+
+def get_executor():
+    """Return the verification pool and the semaphore bounding its queue"""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.TOKEN_VERIFY_WORKERS, thread_name_prefix='token'
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.TOKEN_VERIFY_WORKERS + settings.TOKEN_VERIFY_QUEUE
+            )
+        return _executor, _slots
+
+
+def _digest(user, password):
+    message = f'{user.pk}:{user.password}:{password}'.encode()
+    return hmac.new(
+        settings.SECRET_KEY.encode(), message, hashlib.sha256
+    ).digest()
+
+
+def _remembered(digest):
+    with _verified_lock:
+        expires = _verified.get(digest)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del _verified[digest]
+            return False
+        return True
+
+
+def _remember(digest):
+    with _verified_lock:
+        _verified[digest] = time.monotonic() + settings.TOKEN_VERIFIED_TTL
+        _verified.move_to_end(digest)
+        while len(_verified) > MAX_VERIFIED:
+            _verified.popitem(last=False)
+
+
+def clear():
+    """Forget the verified passwords"""
+    with _verified_lock:
+        _verified.clear()
+
+
+def _check(password, encoded):
+    """Return whether password matches encoded, on the verification pool"""
+    executor, slots = get_executor()
+    if not slots.acquire(blocking=False):
+        TOKEN_VERIFICATIONS.inc(outcome='rejected')
+        raise Saturated()
+    try:
+        future = executor.submit(check_password, password, encoded)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def _needs_update(encoded):
+    try:
+        return identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return False
+
+
+def verify(user, password):
+    """Return whether password is the password of user"""
+    digest = _digest(user, password)
+    if settings.TOKEN_VERIFIED_TTL and _remembered(digest):
+        TOKEN_VERIFICATIONS.inc(outcome='remembered')
+        return True
+    if not _check(password, user.password):
+        TOKEN_VERIFICATIONS.inc(outcome='failed')
+        return False
+    TOKEN_VERIFICATIONS.inc(outcome='verified')
+    if _needs_update(user.password):
+        # Rehash with the current hasher, like User.check_password()
+        user.set_password(password)
+        user.save(update_fields=['password'])
+        digest = _digest(user, password)
+    if settings.TOKEN_VERIFIED_TTL:
+        _remember(digest)
+    return True
+
+
+def authenticate(email, password):
+    """
+        Return the active user with email and password, None otherwise.
+        The offloaded counterpart of django's authenticate() with the
+        ModelBackend, without the login signals.
+    """
+    global _dummy_hash
+    user_model = get_user_model()
+    try:
+        user = user_model._default_manager.get_by_natural_key(email)
+    except user_model.DoesNotExist:
+        # Hash anyway, so unknown emails take as long as wrong passwords
+        if _dummy_hash is None:
+            _dummy_hash = make_password('dummy')
+        _check(password, _dummy_hash)
+        return None
+    if verify(user, password) and user.is_active:
+        return user
+    return None
+
+
+def get_token_key(user):
+    """Return the key of the token of user, creating the token if needed"""
+    cache = caches['shared']
+    cache_key = f'token:{user.pk}'
+    key = cache.get(cache_key)
+    if key is None:
+        token, _ = Token.objects.get_or_create(user=user)
+        key = token.key
+        if settings.TOKEN_CACHE_TTL:
+            cache.set(cache_key, key, settings.TOKEN_CACHE_TTL)
+    return key
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    caches['shared'].delete(f'token:{instance.user_id}')
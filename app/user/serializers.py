@@ -1,7 +1,13 @@
+import io
+
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from core import provisioning
+from user import credentials
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
@@ -46,11 +52,14 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        if settings.TOKEN_VERIFY_WORKERS:
+            user = credentials.authenticate(email, password)
+        else:
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password,
+            )
         if not user:
             msg = _('Unable to authenticate with provided credentials')
             """
@@ -61,3 +70,20 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class ProvisionSerializer(serializers.Serializer):
+    """Serializer for a CSV file of users to create"""
+    file = serializers.FileField()
+
+    def validate_file(self, value):
+        """Return the users of the file"""
+        lines = io.TextIOWrapper(value, encoding='utf-8-sig', newline='')
+        try:
+            return provisioning.read_users(
+                lines, max_rows=settings.PROVISION_MAX_ROWS
+            )
+        except UnicodeDecodeError:
+            raise serializers.ValidationError('The file is not UTF-8')
+        except provisioning.ProvisioningError as error:
+            raise serializers.ValidationError(error.errors)
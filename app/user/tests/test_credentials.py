@@ -0,0 +1,121 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user import credentials
+
+
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(TOKEN_VERIFY_WORKERS=1, TOKEN_VERIFY_QUEUE=0,
+                   THROTTLE_BUCKETS={})
+class OffloadedTokenTests(TestCase):
+    """Test the token endpoint checking passwords on its own pool"""
+
+    def setUp(self):
+        patcher = patch.multiple(credentials, _executor=None, _slots=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(credentials.clear)
+        credentials.clear()
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com', 'testpass'
+        )
+        self.payload = {'email': 'test@mail.com', 'password': 'testpass'}
+
+    def test_token(self):
+        """Test issuing a token and refusing wrong credentials"""
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['token'], Token.objects.get(user=self.user).key
+        )
+
+        for payload in ({'email': 'test@mail.com', 'password': 'wrong'},
+                        {'email': 'other@mail.com', 'password': 'testpass'}):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inactive_user(self):
+        """Test that inactive users get no token"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_verified_password_remembered(self):
+        """Test that a second login skips hashing and the token query"""
+        self.client.post(TOKEN_URL, self.payload)
+
+        with patch('user.credentials._check') as check:
+            with self.assertNumQueries(1):
+                res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        check.assert_not_called()
+
+    def test_password_change_forgets(self):
+        """Test that the old password stops working at once"""
+        self.client.post(TOKEN_URL, self.payload)
+        self.user.set_password('newpass')
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_saturated(self):
+        """Test that logins over the queue limit are rejected at once"""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_check(password, encoded):
+            started.set()
+            release.wait(5)
+            return True
+
+        with patch('user.credentials.check_password', slow_check):
+            thread = threading.Thread(
+                target=credentials._check, args=('a', 'b')
+            )
+            thread.start()
+            started.wait(5)
+            try:
+                res = self.client.post(TOKEN_URL, self.payload)
+            finally:
+                release.set()
+                thread.join()
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(
+            self.client.post(TOKEN_URL, self.payload).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_deleted_token_forgotten(self):
+        """Test that a revoked token is not handed out again"""
+        first = self.client.post(TOKEN_URL, self.payload).data['token']
+        self.assertEqual(caches['shared'].get(f'token:{self.user.pk}'), first)
+
+        Token.objects.filter(user=self.user).delete()
+
+        self.assertIsNone(caches['shared'].get(f'token:{self.user.pk}'))
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertNotEqual(res.data['token'], first)
+        self.assertEqual(
+            res.data['token'], Token.objects.get(user=self.user).key
+        )
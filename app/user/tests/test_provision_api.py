@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job
+
+
+PROVISION_URL = reverse('user:provision')
+
+
+def csv_file(*rows):
+    content = '\n'.join(('email,password,name',) + rows)
+    return SimpleUploadedFile('users.csv', content.encode(), 'text/csv')
+
+
+@override_settings(PROVISION_WORKERS=1)
+class ProvisionApiTests(TestCase):
+    """Test the bulk user provisioning API"""
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings = override_settings(PROVISION_UPLOAD_DIR=upload_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@mail.com', 'password123'
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_admin_required(self):
+        """Test that regular users cannot provision users"""
+        user = get_user_model().objects.create_user(
+            'user@mail.com', 'password123'
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.post(
+            PROVISION_URL, {'file': csv_file('ana@mail.com,secret,Ana')}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(
+            get_user_model().objects.filter(email='ana@mail.com').exists()
+        )
+
+    def test_provision(self):
+        """Test users are created by a job, skipping taken emails"""
+        res = self.client.post(PROVISION_URL, {'file': csv_file(
+            'ana@mail.com,secret,Ana', 'admin@mail.com,secret,'
+        )})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['name'], 'provision_users')
+        job = Job.objects.get(id=res.data['id'])
+        self.assertNotIn('secret', job.payload)
+        self.assertFalse(
+            get_user_model().objects.filter(email='ana@mail.com').exists()
+        )
+
+        jobs.run(jobs.claim())
+
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.user, self.admin)
+        path = json.loads(job.payload)['path']
+        self.assertFalse(os.path.exists(path))
+        res = self.client.get(reverse('job:job-detail', args=[job.id]))
+        self.assertEqual(
+            res.data['result'], {'created': 1, 'skipped': ['admin@mail.com']}
+        )
+        user = get_user_model().objects.get(email='ana@mail.com')
+        self.assertTrue(user.check_password('secret'))
+
+    def test_invalid_file(self):
+        """Test that nothing is created from an invalid file"""
+        res = self.client.post(PROVISION_URL, {'file': csv_file(
+            'ana@mail.com,secret,Ana', 'bob@mail.com,,'
+        )})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['file'], ['Line 3: password too short'])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(PROVISION_MAX_ROWS=1)
+    def test_too_many_rows(self):
+        """Test that larger files are refused"""
+        res = self.client.post(PROVISION_URL, {'file': csv_file(
+            'ana@mail.com,secret,Ana', 'bob@mail.com,secret,'
+        )})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
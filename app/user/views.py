@@ -1,9 +1,20 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import generics, authentication, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core import jobs, provisioning
+from core.authentication import BatchAuthentication
+from core.mixins import ReplicaReadMixin
+from core.models import Job
+from core.throttling import TokenBucketThrottle
+from job.serializers import JobSerializer, status_url
+from user import credentials
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+                             ProvisionSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -11,6 +22,27 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
+class ProvisionUsersView(generics.GenericAPIView):
+    """
+        Create the users of an uploaded CSV file with email, password and
+        optionally name columns, admins only. Hashing the passwords takes
+        too long for a request, so a job is queued and its result lists
+        the emails already taken, which are skipped.
+    """
+    serializer_class = ProvisionSerializer
+    authentication_classes = (authentication.TokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        path = provisioning.save_upload(serializer.validated_data['file'])
+        job = jobs.enqueue('provision_users', user=request.user, path=path)
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
 class CreateTokenView(ObtainAuthToken):
     """
         Create a new auth token for user.
@@ -24,14 +56,63 @@ class CreateTokenView(ObtainAuthToken):
     """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = 'token'
+
+    def post(self, request, *args, **kwargs):
+        """
+            Return the token of the user, answers 503 when the password
+            checks are saturated, see user.credentials
+        """
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        try:
+            serializer.is_valid(raise_exception=True)
+        except credentials.Saturated:
+            return Response(
+                {'detail': 'Too many logins at once, retry later.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
+        user = serializer.validated_data['user']
+        return Response({'token': credentials.get_token_key(user)})
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin,
+                     generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        BatchAuthentication, authentication.TokenAuthentication,
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return auth user"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """
+            Queue the deletion of the account, large accounts take too
+            long to delete within the request. The account is deactivated
+            and its token revoked at once, so the job is followed at the
+            signed status_url of the response instead of /api/jobs/.
+            Concurrent requests queue a single job.
+        """
+        user = self.get_object()
+        with transaction.atomic():
+            # Lock the user, so concurrent requests queue a single job
+            get_user_model()._base_manager.select_for_update().filter(
+                id=user.id
+            ).update(is_active=False)
+            Token.objects.filter(user_id=user.id).delete()
+            job = Job.objects.filter(
+                name='delete_user', user=user,
+                status__in=(Job.QUEUED, Job.RUNNING)
+            ).order_by('id').first()
+            if job is None:
+                job = jobs.enqueue('delete_user', user=user, user_id=user.id)
+        data = JobSerializer(job).data
+        data['status_url'] = status_url(request, job)
+        return Response(data, status=status.HTTP_202_ACCEPTED)